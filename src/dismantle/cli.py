@@ -3,6 +3,72 @@
 import sys
 
 from dismantle import __version__
+from dismantle.package import Lockfile, export_bundle, import_bundle, pack
+
+
+def bundle_export(args: argparse.Namespace) -> int:
+    """Export the packages in a lockfile into a bundle."""
+    export_bundle(Lockfile(args.lockfile, frozen=True), args.bundle)
+    return 0
+
+
+def bundle_import(args: argparse.Namespace) -> int:
+    """Import the packages in a bundle into a directory."""
+    import_bundle(args.bundle, args.root, args.lockfile)
+    return 0
+
+
+def build_bundle_parser(subparsers) -> None:
+    """Build the arguments for the bundle command."""
+    bundle = subparsers.add_parser(
+        'bundle',
+        help='export or import an offline package bundle'
+    )
+    actions = bundle.add_subparsers(dest='action', required=True)
+    exporter = actions.add_parser('export', help='write a bundle')
+    exporter.add_argument('lockfile', help='lockfile of installed packages')
+    exporter.add_argument('bundle', help='bundle file to create')
+    exporter.set_defaults(func=bundle_export)
+    importer = actions.add_parser('import', help='install a bundle')
+    importer.add_argument('bundle', help='bundle file to install')
+    importer.add_argument('root', help='directory to install packages into')
+    importer.add_argument(
+        '--lockfile',
+        default=None,
+        help='lockfile to write (defaults to dismantle.lock in root)'
+    )
+    importer.set_defaults(func=bundle_import)
+
+
+def pack_package(args: argparse.Namespace) -> int:
+    """Build a package archive from a package directory."""
+    pack(args.src, args.dest, bytecode=args.bytecode, level=args.level)
+    return 0
+
+
+def build_pack_parser(subparsers) -> None:
+    """Build the arguments for the pack command."""
+    packer = subparsers.add_parser(
+        'pack',
+        help='build a zip, tar, tgz or tar.bgz package from a directory'
+    )
+    packer.add_argument('src', help='package directory to pack')
+    packer.add_argument(
+        'dest',
+        help='package file to create, the suffix selects the format'
+    )
+    packer.add_argument(
+        '--bytecode',
+        action='store_true',
+        help='include bytecode compiled by the running interpreter'
+    )
+    packer.add_argument(
+        '--level',
+        type=int,
+        default=9,
+        help='compression level for zip and tgz packages'
+    )
+    packer.set_defaults(func=pack_package)
 
 
 def build_parser():
@@ -11,6 +77,9 @@ def build_parser():
         'dismantle',
         description='Dismantle package management'
     )
+    subparsers = parser.add_subparsers(dest='command')
+    build_bundle_parser(subparsers)
+    build_pack_parser(subparsers)
     return parser
 
 
@@ -21,3 +90,7 @@ def main(args=None):
     app = '%(prog)s version ' + __version__
     parser.add_argument('-v', '--version', action='version', version=app)
     args = parser.parse_args(args)
+    if hasattr(args, 'func'):
+        return args.func(args)
+    parser.print_help()
+    return 0
@@ -5,12 +5,12 @@
 multiple classes each with a new provider.
 """
 
-# TODO: activate, deactivate, active
-
 __all__ = [
     'IExtension',
-    'Extensions'
+    'Extensions',
+    'LazyExtension'
 ]
 
 from dismantle.extension.extensions import Extensions
 from dismantle.extension.iextension import IExtension
+from dismantle.extension.lazy import LazyExtension
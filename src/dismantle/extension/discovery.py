@@ -0,0 +1,145 @@
+"""Cache the extensions discovered in installed packages.
+
+Discovering extensions walks the extensions directory of every package
+and scans every module for extension classes. The discovery cache
+records, per package, the extension modules found, the extension
+classes they define per category, and a stat fingerprint of the
+directories and modules which were walked. While the fingerprint of a
+package is unchanged the cached modules and classes are used instead of
+walking and scanning the package again.
+
+Lazily discovered modules are not imported at all. Their extension
+classes are found by parsing the module source instead.
+"""
+import ast
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+CACHE_VERSION = 2
+
+Fingerprint = Dict[str, Dict[str, Any]]
+
+
+def read_cache(path: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """Return the cached packages, or nothing for an invalid cache."""
+    try:
+        with open(str(path)) as cache:
+            data = json.load(cache)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+        return {}
+    packages = data.get('packages')
+    return packages if isinstance(packages, dict) else {}
+
+
+def write_cache(
+    path: Union[str, Path],
+    packages: Dict[str, Dict[str, Any]]
+) -> None:
+    """Atomically write the cached packages."""
+    path = Path(str(path))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, tmp = tempfile.mkstemp(prefix=f'.{path.name}.', dir=path.parent)
+    with os.fdopen(handle, 'w') as cache:
+        json.dump({'version': CACHE_VERSION, 'packages': packages}, cache)
+    os.replace(tmp, path)
+
+
+def archive_fingerprint(archive: Union[str, Path]) -> Fingerprint:
+    """Return the fingerprint of a package installed as an archive."""
+    stat = os.stat(str(archive))
+    return {'archive': {'': [stat.st_mtime_ns, stat.st_size]}}
+
+
+def walk_extensions(
+    root: Union[str, Path],
+    directory: str,
+    include: Tuple[str, ...],
+    exclude: Sequence[str]
+) -> Tuple[List[str], Fingerprint]:
+    """Find the extension modules of a package directory.
+
+    Returns the paths of the modules relative to the package and the
+    fingerprint of the walked directories and modules. A module added
+    or removed changes the modification time of its directory.
+    """
+    root = Path(str(root))
+    modules: List[str] = []
+    fingerprint: Fingerprint = {
+        'dirs': {'.': os.stat(root).st_mtime_ns},
+        'files': {}
+    }
+    if not (root / directory).is_dir():
+        return (modules, fingerprint)
+    for folder, dirs, files in os.walk(root / directory, topdown=True):
+        dirs[:] = sorted(d for d in dirs if d not in exclude)
+        relative = Path(folder).relative_to(root).as_posix()
+        fingerprint['dirs'][relative] = os.stat(folder).st_mtime_ns
+        for name in sorted(f for f in files if f.endswith(include)):
+            stat = os.stat(os.path.join(folder, name))
+            module = f'{relative}/{name}'
+            fingerprint['files'][module] = [stat.st_mtime_ns, stat.st_size]
+            modules.append(module)
+    return (modules, fingerprint)
+
+
+def fingerprint_matches(
+    root: Union[str, Path],
+    fingerprint: Fingerprint
+) -> bool:
+    """Check if a package still matches a recorded fingerprint."""
+    root = str(root)
+    try:
+        if 'archive' in fingerprint:
+            return archive_fingerprint(root) == fingerprint
+        dirs = {
+            name: os.stat(os.path.join(root, name)).st_mtime_ns
+            for name in fingerprint['dirs']
+        }
+        files = {}
+        for name in fingerprint['files']:
+            stat = os.stat(os.path.join(root, name))
+            files[name] = [stat.st_mtime_ns, stat.st_size]
+    except (OSError, KeyError, TypeError):
+        return False
+    return dirs == fingerprint['dirs'] and files == fingerprint['files']
+
+
+def _base_name(base: ast.expr) -> Optional[str]:
+    """Return the class name referenced by a base class expression."""
+    if isinstance(base, ast.Name):
+        return base.id
+    if isinstance(base, ast.Attribute):
+        return base.attr
+    return None
+
+
+def find_classes(source: bytes, types: Sequence[type]) -> Dict[str, List[str]]:
+    """Find the classes a module source defines extending the types.
+
+    Only classes defined at the top level of the module are found.
+    Bases are matched by name, so classes extending another extension
+    class defined earlier in the same module are found as well.
+    """
+    known: Dict[str, Set[str]] = {}
+    for extension_type in types:
+        known.setdefault(extension_type.__name__, set()).add(
+            extension_type._category
+        )
+    classes: Dict[str, List[str]] = {}
+    for node in ast.parse(source).body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        categories: Set[str] = set()
+        for base in node.bases:
+            categories |= known.get(_base_name(base) or '', set())
+        if not categories:
+            continue
+        known[node.name] = known.get(node.name, set()) | categories
+        for category in categories:
+            classes.setdefault(category, []).append(node.name)
+    return {category: sorted(names) for category, names in classes.items()}
@@ -2,58 +2,210 @@
 import importlib.util
 import os
 import sys
+import threading
+import zipfile
 from contextlib import suppress
-from pathlib import Path
+from functools import partial
+from pathlib import Path, PurePosixPath
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
 
+from dismantle.extension.discovery import (
+    Fingerprint,
+    archive_fingerprint,
+    find_classes,
+    fingerprint_matches,
+    read_cache,
+    walk_extensions,
+    write_cache
+)
 from dismantle.extension.iextension import IExtension
+from dismantle.extension.lazy import LazyExtension
+from dismantle.extension.loader import ZipSourceLoader
+
+# the package, the path and whether the package is an archive
+Module = Tuple[Any, str, bool]
 
 
 class Extensions:
     """Search through the installed packages and find extensions."""
 
-    def __init__(self, types, packages, prefix) -> None:
-        """Search through all provided extensions and register them."""
+    def __init__(
+        self,
+        types,
+        packages,
+        prefix,
+        cache=None,
+        lazy: bool = False
+    ) -> None:
+        """Search through all provided extensions and register them.
+
+        When a cache path is provided the modules and classes found in
+        each package are cached, and reused until the package changes.
+        Lazy extensions are found by parsing the source of each module
+        and are registered as proxies importing the module on first
+        use.
+        """
         self._packages = packages
         self._extensions = {}
         self._directory = 'extensions'
         self._prefix = prefix
         self._imports = {}
         self._exclude = (['__pycache__', '.git'])
-        self._include = ('.py', '.cpython-37.pyc')
+        tag = sys.implementation.cache_tag
+        self._include = ('.py', f'.{tag}.pyc') if tag else ('.py',)
+        self._cache = Path(str(cache)) if cache is not None else None
+        self._cached = read_cache(self._cache) if self._cache else {}
+        self._discovered: Dict[str, Dict] = {}
+        self._classes: Dict[str, Optional[Dict[str, List[str]]]] = {}
+        self._modules: Dict[str, Module] = {}
+        self._lazy = lazy
+        self._lock = threading.RLock()
 
         # check that the types are a subclass of IExtension
         if not all([issubclass(i, IExtension) for i in types]):
             raise ValueError('all exntesion types must extend IExtension')
         self._types = types
+        self._type_names = sorted(
+            f'{i.__module__}.{i.__qualname__}' for i in types
+        )
         for category in self._types:
             self._extensions[category._category] = {}
+        self._categories = {i: i._category for i in self._types}
+        self._lookup: Dict[type, Tuple[str, ...]] = {}
+        self._instances: Dict[str, IExtension] = {}
+        self._active: Dict[str, Dict[str, IExtension]] = {
+            category: {} for category in self._extensions
+        }
         self._find()
         self._register()
+        self._save()
 
     def _find(self) -> None:
         """Search through the packages and find all extensions."""
         for package in self._packages.values():
-            # check if the package has an init file
-            with suppress(KeyError):
-                root, paths, _ = next(os.walk(package._path))
-            # check if we have an extensions directory
-            if self._directory in paths:
-                for root, dirs, files in os.walk(
-                    os.path.join(root, self._directory),
-                    topdown=True
-                ):
-                    dirs[:] = [d for d in dirs if d not in self._exclude]
-                    files[:] = [f for f in files if f.endswith(self._include)]
-                    for name in files:
-                        path = Path(root, name)
-                        stem = os.path.splitext(path.stem)[0]
-                        prefix = f'{package.name}.extension.{stem}'
-                        self._imports[prefix] = self._load(path, prefix)
-                        self._imports[prefix].prefix = prefix
-
-    def _load(self, path: Path, prefix: str):
+            entry = self._cached.get(package.name)
+            if entry is not None and self._current(package, entry):
+                self._find_cached(package, entry)
+            else:
+                entry = self._walk(package)
+                self._add_entry(package, entry)
+            self._discovered[package.name] = entry
+
+    def _walk(self, package) -> Dict:
+        """Find the extension modules of a package."""
+        if os.path.isfile(str(package._path)):
+            return self._find_archive(package)
+        return self._find_directory(package)
+
+    def _current(self, package, entry: Dict) -> bool:
+        """Check if the cache entry of a package is still valid."""
+        return (
+            entry.get('path') == str(package._path)
+            and entry.get('types') == self._type_names
+            and entry.get('lazy', False) == self._lazy
+            and isinstance(entry.get('modules'), dict)
+            and fingerprint_matches(package._path, entry['fingerprint'])
+        )
+
+    def _entry(self, package, fingerprint: Fingerprint) -> Dict:
+        """Create the cache entry of a package."""
+        return {
+            'path': str(package._path),
+            'types': self._type_names,
+            'lazy': self._lazy,
+            'fingerprint': fingerprint,
+            'modules': {}
+        }
+
+    def _find_cached(self, package, entry: Dict) -> None:
+        """Load the extensions of a package recorded in the cache."""
+        for prefix, module in entry['modules'].items():
+            self._classes[prefix] = module.get('classes')
+        self._add_entry(package, entry)
+
+    def _find_directory(self, package) -> Dict:
+        """Find the extensions of a package installed as a directory."""
+        modules, fingerprint = walk_extensions(
+            package._path,
+            self._directory,
+            self._include,
+            self._exclude
+        )
+        entry = self._entry(package, fingerprint)
+        for name in modules:
+            stem = os.path.splitext(PurePosixPath(name).stem)[0]
+            prefix = f'{package.name}.extension.{stem}'
+            entry['modules'][prefix] = {'path': name}
+        return entry
+
+    def _find_archive(self, package) -> Dict:
+        """Find the extensions of a package installed as a zip file."""
+        archive = str(package._path)
+        entry = self._entry(package, archive_fingerprint(archive))
+        with zipfile.ZipFile(archive, 'r') as zip_ref:
+            names = zip_ref.namelist()
+        for name in names:
+            path = PurePosixPath(name)
+            if path.parts[0] != self._directory or name.endswith('/'):
+                continue
+            if set(path.parts) & set(self._exclude):
+                continue
+            if not name.endswith('.py'):
+                continue
+            stem = os.path.splitext(path.stem)[0]
+            prefix = f'{package.name}.extension.{stem}'
+            entry['modules'][prefix] = {'path': name}
+        return entry
+
+    def _add_entry(self, package, entry: Dict) -> None:
+        """Add the extension modules recorded in a package entry."""
+        archive = 'archive' in entry['fingerprint']
+        for prefix, module in entry['modules'].items():
+            self._add(package, prefix, module['path'], archive)
+
+    def _add(self, package, prefix: str, name: str, archive: bool) -> None:
+        """Add an extension module, importing it unless lazy."""
+        self._modules[prefix] = (package, name, archive)
+        if not self._lazy:
+            self._import(prefix)
+
+    def _source(self, prefix: str) -> Optional[bytes]:
+        """Return the python source of a module if it has any."""
+        package, name, archive = self._modules[prefix]
+        if not name.endswith('.py'):
+            return None
+        if archive:
+            with zipfile.ZipFile(str(package._path), 'r') as zip_ref:
+                return zip_ref.read(name)
+        return Path(package._path, name).read_bytes()
+
+    def _import(self, prefix: str):
+        """Import an extension module of a package."""
+        with self._lock:
+            if prefix in self._imports:
+                return self._imports[prefix]
+            return self._import_module(prefix)
+
+    def _import_module(self, prefix: str):
+        """Load an extension module and record it as imported."""
+        package, name, archive = self._modules[prefix]
+        if archive:
+            loader = ZipSourceLoader(str(package._path), name)
+            module = self._load(loader.get_filename(), prefix, loader)
+        else:
+            module = self._load(Path(package._path, name), prefix)
+        module.prefix = prefix
+        self._imports[prefix] = module
+        return module
+
+    def _load(self, path: Path, prefix: str, loader=None):
         """Python 3.5 and up."""
-        spec = importlib.util.spec_from_file_location(prefix, path)
+        spec = importlib.util.spec_from_file_location(
+            prefix,
+            path,
+            loader=loader
+        )
         module = importlib.util.module_from_spec(spec)
         sys.modules[prefix] = module
         try:
@@ -64,18 +216,300 @@ def _load(self, path: Path, prefix: str):
 
     def _register(self) -> None:
         """Register extensions."""
-        for i in self._imports.values():
-            for cls, cls_name in ((getattr(i, name), name) for name in dir(i)):
-                if isinstance(cls, type):
-                    for subclass in self._types:
-                        if issubclass(cls, subclass) and cls is not subclass:
-                            name = '.'.join([i.prefix, cls_name])
-                            self._extensions[subclass._category][name] = cls
+        for prefix in self._modules:
+            for category, found in self._module_extensions(prefix).items():
+                self._extensions[category].update(found)
+
+    def _module_extensions(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """Return the extensions of a module by category."""
+        classes = self._classes.get(prefix)
+        if classes is None:
+            classes = self._discover(prefix)
+            self._classes[prefix] = classes
+        found: Dict[str, Dict[str, Any]] = {}
+        for category, names in classes.items():
+            if category not in self._extensions:
+                continue
+            for cls_name in names:
+                cls = self._extension(prefix, category, cls_name)
+                if cls is not None:
+                    name = '.'.join([prefix, cls_name])
+                    found.setdefault(category, {})[name] = cls
+        return found
+
+    def _discover(self, prefix: str) -> Dict[str, List[str]]:
+        """Return the extension classes of a module by category.
+
+        Lazy modules are parsed rather than imported, unless they only
+        ship bytecode or can not be parsed.
+        """
+        if prefix not in self._imports:
+            source = self._source(prefix)
+            with suppress(SyntaxError, ValueError):
+                if source is not None:
+                    return find_classes(source, self._types)
+        return self._scan(self._import(prefix))
+
+    def _extension(self, prefix: str, category: str, cls_name: str):
+        """Return an extension class, or a proxy if not yet imported."""
+        if prefix not in self._imports:
+            return LazyExtension(
+                '.'.join([prefix, cls_name]),
+                category,
+                partial(self._resolve, prefix, cls_name)
+            )
+        cls = getattr(self._imports[prefix], cls_name, None)
+        return cls if isinstance(cls, type) else None
+
+    def _resolve(self, prefix: str, cls_name: str) -> type:
+        """Import a lazy extension module and return a class from it."""
+        cls = getattr(self._import(prefix), cls_name, None)
+        if not isinstance(cls, type):
+            message = f'{prefix} does not define {cls_name}'
+            raise ImportError(message)
+        return cls
+
+    def _scan(self, module) -> Dict[str, List[str]]:
+        """Return the names of the extension classes of a module.
+
+        Only classes defined by the module itself are considered, so
+        extension classes it imports are not registered twice.
+        """
+        classes: Dict[str, List[str]] = {}
+        for cls_name, cls in sorted(vars(module).items()):
+            if not isinstance(cls, type):
+                continue
+            if cls.__module__ != module.__name__:
+                continue
+            for category in self._inherits(cls):
+                classes.setdefault(category, []).append(cls_name)
+        return classes
+
+    def _inherits(self, cls: type) -> Tuple[str, ...]:
+        """Return the categories of the extension types a class extends.
+
+        The categories are looked up from the method resolution order of
+        the class, excluding the class itself, and cached per class.
+        """
+        if cls not in self._lookup:
+            categories = []
+            for base in cls.__mro__[1:]:
+                category = self._categories.get(base)
+                if category is not None and category not in categories:
+                    categories.append(category)
+            self._lookup[cls] = tuple(categories)
+        return self._lookup[cls]
+
+    def _save(self) -> None:
+        """Write the discovered packages to the cache when changed."""
+        if self._cache is None:
+            return
+        for entry in self._discovered.values():
+            for prefix, module in entry['modules'].items():
+                module['classes'] = self._classes.get(prefix)
+        if self._discovered != self._cached:
+            write_cache(self._cache, self._discovered)
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """Reload the extension modules changed since they were found.
+
+        Only packages whose fingerprint changed are walked again, and
+        only their added or modified modules are loaded again. Removed
+        modules are unloaded. The category mappings are updated in place
+        and the extensions of unchanged modules, and their instances,
+        are kept. Active extensions of a reloaded module are activated
+        again using an instance of the reloaded class.
+        """
+        with self._lock:
+            reloaded, removed = self._changes()
+            active = self._release(set(reloaded) | set(removed))
+            for prefix in removed:
+                self._unload(prefix)
+                self._modules.pop(prefix, None)
+            for prefix, (package, name, archive) in reloaded.items():
+                self._unload(prefix)
+                self._add(package, prefix, name, archive)
+            self._update_categories(set(reloaded))
+            self._reactivate(active)
+            self._save()
+        return {'reloaded': sorted(reloaded), 'removed': sorted(removed)}
+
+    def _changes(self) -> Tuple[Dict[str, Module], List[str]]:
+        """Find the modules added, changed or removed since found."""
+        reloaded: Dict[str, Module] = {}
+        removed: List[str] = []
+        for name in list(self._discovered):
+            if name not in self._packages:
+                removed.extend(self._discovered.pop(name)['modules'])
+        for package in self._packages.values():
+            old = self._discovered.get(package.name)
+            if old is not None and fingerprint_matches(
+                package._path,
+                old['fingerprint']
+            ):
+                continue
+            entry = self._walk(package)
+            self._discovered[package.name] = entry
+            reloaded.update(self._package_changes(package, old, entry))
+            if old is not None:
+                removed.extend(
+                    prefix for prefix in old['modules']
+                    if prefix not in entry['modules']
+                )
+        return (reloaded, removed)
+
+    def _package_changes(
+        self,
+        package,
+        old: Optional[Dict],
+        entry: Dict
+    ) -> Dict[str, Module]:
+        """Return the added or modified modules of a package."""
+        archive = 'archive' in entry['fingerprint']
+        return {
+            prefix: (package, module['path'], archive)
+            for prefix, module in entry['modules'].items()
+            if self._modified(prefix, old, entry)
+        }
+
+    def _modified(self, prefix: str, old: Optional[Dict], entry: Dict) -> bool:
+        """Check if a module changed between two package entries."""
+        if old is None or 'archive' in entry['fingerprint']:
+            return True
+        path = entry['modules'][prefix]['path']
+        if old['modules'].get(prefix, {}).get('path') != path:
+            return True
+        previous = old['fingerprint'].get('files', {}).get(path)
+        return previous != entry['fingerprint']['files'].get(path)
+
+    def _unload(self, prefix: str) -> None:
+        """Forget an extension module and the classes found in it."""
+        self._imports.pop(prefix, None)
+        self._classes.pop(prefix, None)
+        sys.modules.pop(prefix, None)
+        for cls in [i for i in self._lookup if i.__module__ == prefix]:
+            del self._lookup[cls]
+
+    def _release(self, prefixes: Set[str]) -> List[str]:
+        """Drop the instances of the extensions of some modules.
+
+        Returns the names of the released extensions which were active.
+        """
+        active = []
+        for name in list(self._instances):
+            if name.rsplit('.', 1)[0] not in prefixes:
+                continue
+            if self.is_active(name):
+                active.append(name)
+            self._instances.pop(name).deactivate()
+        return active
+
+    def _update_categories(self, reloaded: Set[str]) -> None:
+        """Update the categories in place for the reloaded modules.
+
+        The new mapping of each category is built before the live one
+        is touched, then only removed extensions are deleted and only
+        changed ones assigned, so readers never see a category empty.
+        """
+        fresh = {i: self._module_extensions(i) for i in reloaded}
+        for category, extensions in self._extensions.items():
+            kept: Dict[str, List[Tuple[str, Any]]] = {}
+            for name, cls in extensions.items():
+                prefix = name.rsplit('.', 1)[0]
+                kept.setdefault(prefix, []).append((name, cls))
+            updated: Dict[str, Any] = {}
+            for prefix in self._modules:
+                if prefix in fresh:
+                    updated.update(fresh[prefix].get(category, {}))
+                else:
+                    updated.update(kept.get(prefix, []))
+            self._apply(extensions, updated)
+
+    @staticmethod
+    def _apply(extensions: Dict[str, Any], updated: Dict[str, Any]) -> None:
+        """Change a live category mapping to match the updated one."""
+        for name in [i for i in extensions if i not in updated]:
+            del extensions[name]
+        for name, cls in updated.items():
+            if extensions.get(name) is not cls:
+                extensions[name] = cls
+
+    def _reactivate(self, names: List[str]) -> None:
+        """Activate released extensions again if still registered."""
+        for name in names:
+            for category, active in self._active.items():
+                if name not in self._extensions[category]:
+                    active.pop(name, None)
+            with suppress(ValueError):
+                self.activate(name)
 
     def category(self, category) -> list:
         """Return the list of extensions for a category."""
         return self._extensions[category]
 
+    def _categories_of(self, name: str) -> List[str]:
+        """Return the categories an extension is registered in."""
+        categories = [
+            category for category, extensions in self._extensions.items()
+            if name in extensions
+        ]
+        if not categories:
+            message = f'{name} is not a registered extension'
+            raise ValueError(message)
+        return categories
+
+    def instance(self, name: str) -> IExtension:
+        """Return the single instance of an extension.
+
+        The instance is created on first use, which imports the module
+        of a lazy extension.
+        """
+        with self._lock:
+            if name not in self._instances:
+                category = self._categories_of(name)[0]
+                self._instances[name] = self._extensions[category][name]()
+            return self._instances[name]
+
+    def activate(self, *names: str) -> None:
+        """Activate extensions, creating their instances if needed."""
+        with self._lock:
+            for name in names:
+                extension = self.instance(name)
+                extension.activate()
+                for category in self._categories_of(name):
+                    self._active[category][name] = extension
+
+    def deactivate(self, *names: str) -> None:
+        """Deactivate extensions, keeping their instances."""
+        with self._lock:
+            for name in names:
+                categories = self._categories_of(name)
+                extension = self._instances.get(name)
+                if extension is not None:
+                    extension.deactivate()
+                for category in categories:
+                    self._active[category].pop(name, None)
+
+    def activate_category(self, category: str) -> None:
+        """Activate every extension of a category."""
+        self.activate(*self._extensions[category])
+
+    def deactivate_category(self, category: str) -> None:
+        """Deactivate every active extension of a category."""
+        self.deactivate(*list(self._active[category]))
+
+    def active(self, category: str) -> Mapping[str, IExtension]:
+        """Return the active extension instances of a category.
+
+        The instances are returned in the order they were activated, as
+        a read only view which follows later activations.
+        """
+        return MappingProxyType(self._active[category])
+
+    def is_active(self, name: str) -> bool:
+        """Check if an extension is active."""
+        return any(name in active for active in self._active.values())
+
     @property
     def types(self) -> list:
         """Return the list of supported types."""
@@ -88,5 +522,8 @@ def extensions(self) -> dict:
 
     @property
     def imports(self) -> dict:
-        """Return the fill list of imports."""
+        """Return the fill list of imports.
+
+        Lazy extension modules are only listed once imported.
+        """
         return self._imports
@@ -0,0 +1,54 @@
+"""Stand in for extension classes until they are first used.
+
+Lazily discovered extensions are registered without importing their
+module. A lazy extension is registered in their place and imports the
+module holding the extension class when it is first instantiated or
+when one of its attributes is first accessed.
+"""
+import threading
+from typing import Any, Callable, Optional
+
+
+class LazyExtension:
+    """A proxy for an extension class which is imported on first use."""
+
+    def __init__(
+        self,
+        name: str,
+        category: str,
+        load: Callable[[], type]
+    ) -> None:
+        """Create a proxy loading the extension class using load."""
+        self._proxy_name = name
+        self._proxy_category = category
+        self._load = load
+        self._lock = threading.Lock()
+        self._cls: Optional[type] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Return true once the extension class has been imported."""
+        return self._cls is not None
+
+    def resolve(self) -> type:
+        """Import the module of the extension and return the class."""
+        if self._cls is None:
+            with self._lock:
+                if self._cls is None:
+                    self._cls = self._load()
+        return self._cls
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        """Instantiate the extension class."""
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        """Return an attribute of the extension class."""
+        if name.startswith('_proxy_') or name in ('_load', '_lock', '_cls'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        """Return the name of the proxied extension."""
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<LazyExtension {self._proxy_name} ({state})>'
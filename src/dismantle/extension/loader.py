@@ -0,0 +1,33 @@
+"""Load extension modules stored inside zip archives.
+
+Packages installed in place are kept as a single zip archive rather
+than being extracted. The loader reads the source of an extension
+module straight from the archive so the module can be imported without
+writing it to disk first.
+"""
+import importlib.abc
+import os
+import zipfile
+from pathlib import PurePosixPath
+from typing import Optional
+
+
+class ZipSourceLoader(importlib.abc.SourceLoader):
+    """Load python source from a member of a zip archive."""
+
+    def __init__(self, archive: str, member: str) -> None:
+        """Create a loader for a member of an archive."""
+        self._archive = str(archive)
+        self._member = member
+
+    def get_filename(self, fullname: Optional[str] = None) -> str:
+        """Return the path of the module within the archive."""
+        parts = PurePosixPath(self._member).parts
+        return os.path.join(self._archive, *parts)
+
+    def get_data(self, path: str) -> bytes:
+        """Read the source of the module from the archive."""
+        if path != self.get_filename():
+            raise FileNotFoundError(path)
+        with zipfile.ZipFile(self._archive, 'r') as archive:
+            return archive.read(self._member)
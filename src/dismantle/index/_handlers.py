@@ -4,6 +4,7 @@
 import json
 import logging
 import tempfile
+from functools import partial
 from hashlib import md5
 from os.path import expanduser
 from pathlib import Path
@@ -11,6 +12,14 @@
 
 import requests
 
+from dismantle.transport import (
+    Priority,
+    get_policy,
+    get_scheduler,
+    hedge,
+    request
+)
+
 log = logging.getLogger(__name__)
 
 
@@ -160,8 +169,7 @@ def find(self, value: str) -> Union[list, None]:
     def update(self) -> None:
         """Update the index file if its outdated."""
         self._updated = False
-        headers = {'If-None-Match': self._digest}
-        req = requests.get(self._index, headers=headers, allow_redirects=True)
+        req = self._request('GET')
         if req.status_code not in [200, 304]:
             raise FileNotFoundError(req.status_code)
         elif req.status_code == 200:
@@ -181,8 +189,7 @@ def outdated(self) -> bool:
         Execute a head request using the requests library to check that
         the ETag matches.
         """
-        headers = {'If-None-Match': self._digest}
-        req = requests.head(self._index, headers=headers, allow_redirects=True)
+        req = self._request('HEAD')
         if req.status_code not in [200, 304]:
             raise FileNotFoundError(req.status_code)
         elif req.status_code == 200:
@@ -190,6 +197,26 @@ def outdated(self) -> bool:
         else:
             return False
 
+    def _request(self, method: str) -> requests.Response:
+        """Send a conditional request for the index.
+
+        Index requests are scheduled ahead of package downloads, and
+        are hedged against slow responses when the transport policy
+        enables hedging.
+        """
+        headers = {'If-None-Match': self._digest}
+        call = partial(self._send, method, headers)
+        delay = get_policy().hedge
+        if delay is None:
+            return call(self._index)
+        return hedge(call, [self._index, self._index], delay)
+
+    @staticmethod
+    def _send(method: str, headers: Dict, url: str) -> requests.Response:
+        """Send a request through the download scheduler."""
+        call = partial(request, method, url, headers=headers)
+        return get_scheduler().submit(url, call, Priority.INDEX).result()
+
     @property
     def _digest(self) -> str:
         """Return the md5 digest of the currently cached index file."""
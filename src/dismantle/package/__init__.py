@@ -1,9 +1,18 @@
 """Creates a solution to handle multiple package formats."""
+from dismantle.package._batch import check_outdated
+from dismantle.package._bundle import export_bundle, import_bundle
+from dismantle.package._codecs import available_codecs, register_codec
+from dismantle.package._factory import PackageFactory
 from dismantle.package._formats import (
+    BgzfPackageFormat,
+    CompressedTarPackageFormat,
     DirectoryPackageFormat,
     PackageFormat,
     TarPackageFormat,
+    Tbz2PackageFormat,
     TgzPackageFormat,
+    TxzPackageFormat,
+    TzstPackageFormat,
     ZipPackageFormat
 )
 from dismantle.package._handlers import (
@@ -11,6 +20,13 @@
     LocalPackageHandler,
     PackageHandler
 )
+from dismantle.package._lazy import LazyArchive
+from dismantle.package._lockfile import Lockfile
+from dismantle.package._locking import FileLock
+from dismantle.package._manifest import verify_install, verify_installs
+from dismantle.package._mirrors import MirrorStats
+from dismantle.package._pack import pack
+from dismantle.package._remote import RemoteArchive
 
 __all__ = [
     'HttpPackageHandler',
@@ -20,5 +36,24 @@
     'LocalPackageHandler',
     'ZipPackageFormat',
     'TarPackageFormat',
-    'TgzPackageFormat'
+    'TgzPackageFormat',
+    'FileLock',
+    'MirrorStats',
+    'RemoteArchive',
+    'Lockfile',
+    'check_outdated',
+    'PackageFactory',
+    'export_bundle',
+    'import_bundle',
+    'LazyArchive',
+    'CompressedTarPackageFormat',
+    'TxzPackageFormat',
+    'Tbz2PackageFormat',
+    'TzstPackageFormat',
+    'register_codec',
+    'available_codecs',
+    'BgzfPackageFormat',
+    'pack',
+    'verify_install',
+    'verify_installs'
 ]
@@ -0,0 +1,58 @@
+"""Check many remote packages for updates concurrently.
+
+Calling the outdated property of each package makes one blocking HEAD
+request after another. The batch check sends the conditional HEAD
+requests from a thread pool sharing a pooled session. The requests run
+on a scheduler of their own, sized for the batch, which limits the
+number of requests in flight to each host, and the transport backs off
+when a host responds with a rate limit.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from dismantle.package._handlers import HttpPackageHandler
+from dismantle.transport import DownloadScheduler, request
+
+log = logging.getLogger(__name__)
+
+
+def check_outdated(
+    packages: Iterable[HttpPackageHandler],
+    workers: int = 16,
+    per_host: int = 4,
+    timeout: float = 10.0
+) -> Dict[str, Optional[bool]]:
+    """Check if each package is outdated using concurrent requests.
+
+    Returns a map of package names to true if a newer package is
+    available, false if the cached package is current, and None if
+    the check failed or timed out.
+    """
+    packages = list(packages)
+    scheduler = DownloadScheduler(workers=workers, per_host=per_host)
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        head = partial(request, 'HEAD', session=session, timeout=timeout)
+
+        def check(package: HttpPackageHandler) -> Optional[bool]:
+            try:
+                return package.check(head, scheduler)
+            except (requests.RequestException, FileNotFoundError) as e:
+                log.warning(f'Unable to check {package.name} ({e})')
+                return None
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+                results = list(executor.map(check, packages))
+        finally:
+            scheduler.shutdown()
+    return {
+        package.name: result for package, result in zip(packages, results)
+    }
@@ -0,0 +1,136 @@
+"""Read and write tar archives split into indexed gzip blocks.
+
+A single gzip stream can only be decompressed from start to end. This
+container compresses a tar archive as a series of independent gzip
+members, each holding whole tar members, followed by a gzip member
+holding a json index of the blocks and tar members, and a fixed size
+empty gzip member whose extra field records the offset of the index.
+
+Concatenated gzip members are still a valid gzip file, and the tar
+archive ends before the index, so the container can be read by the
+standard `gzip` and `tar` tools. Readers aware of the index can
+decompress the blocks in parallel or read a single member directly.
+"""
+import json
+import struct
+import tarfile
+import zlib
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+BLOCK_SIZE = 1 << 20
+INDEX_ID = b'DI'
+
+Index = Dict[str, Any]
+
+
+def _gzip_member(data: bytes, extra: bytes = b'') -> bytes:
+    """Compress data as a single gzip member."""
+    flags = 0x04 if extra else 0x00
+    header = b'\x1f\x8b\x08' + bytes([flags]) + b'\x00\x00\x00\x00\x00\xff'
+    if extra:
+        header += struct.pack('<H', len(extra)) + extra
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    trailer = struct.pack('<II', zlib.crc32(data), len(data) & 0xffffffff)
+    return header + body + trailer
+
+
+def _tail(offset: int) -> bytes:
+    """Return the empty gzip member recording the index offset."""
+    extra = INDEX_ID + struct.pack('<HQ', 8, offset)
+    return _gzip_member(b'', extra)
+
+
+TAIL_SIZE = len(_tail(0))
+
+
+def _boundaries(members: List[tarfile.TarInfo], block_size: int) -> List[int]:
+    """Return the offsets starting each block at a tar member."""
+    starts = [0]
+    for member in members:
+        if member.offset - starts[-1] >= block_size:
+            starts.append(member.offset)
+    return starts
+
+
+def write_bgzf(
+    src: Union[str, Path],
+    dest: Union[str, Path],
+    block_size: int = BLOCK_SIZE
+) -> Index:
+    """Compress a tar archive into indexed gzip blocks.
+
+    Blocks hold whole tar members and are closed once they reach the
+    block size, so a member larger than the block size gets a block of
+    its own. Returns the index written to the container.
+    """
+    with tarfile.open(str(src), 'r:') as tar_ref:
+        members = tar_ref.getmembers()
+    starts = _boundaries(members, block_size)
+    index: Index = {'blocks': [], 'members': {}}
+    with open(str(src), 'rb') as tar_file, open(str(dest), 'wb') as out:
+        ends = starts[1:] + [None]
+        for start, end in zip(starts, ends):
+            data = tar_file.read(end - start if end is not None else -1)
+            compressed = _gzip_member(data)
+            index['blocks'].append([out.tell(), len(compressed), len(data)])
+            out.write(compressed)
+        for member in members:
+            block = bisect_right(starts, member.offset) - 1
+            index['members'][member.name] = [
+                block,
+                member.offset_data - starts[block],
+                member.size,
+                member.type.decode('ascii', 'replace')
+            ]
+        offset = out.tell()
+        out.write(_gzip_member(json.dumps(index).encode('utf-8')))
+        out.write(_tail(offset))
+    return index
+
+
+def _inflate(data: bytes) -> bytes:
+    """Decompress a single gzip member."""
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+
+
+def read_index(archive: BinaryIO) -> Optional[Index]:
+    """Return the index of a container, or None if it has no index."""
+    archive.seek(0, 2)
+    size = archive.tell()
+    if size < TAIL_SIZE:
+        return None
+    archive.seek(size - TAIL_SIZE)
+    tail = archive.read(TAIL_SIZE)
+    if tail[:4] != b'\x1f\x8b\x08\x04' or tail[12:14] != INDEX_ID:
+        return None
+    offset = struct.unpack('<Q', tail[16:24])[0]
+    if offset >= size - TAIL_SIZE:
+        return None
+    archive.seek(offset)
+    try:
+        data = _inflate(archive.read(size - TAIL_SIZE - offset))
+        index = json.loads(data.decode('utf-8'))
+    except (zlib.error, ValueError):
+        return None
+    return index if isinstance(index, dict) else None
+
+
+def read_block(archive: BinaryIO, index: Index, block: int) -> bytes:
+    """Return the decompressed tar data of a block."""
+    offset, size, _ = index['blocks'][block]
+    archive.seek(offset)
+    return _inflate(archive.read(size))
+
+
+def read_member(archive: BinaryIO, index: Index, name: str) -> bytes:
+    """Return the contents of a regular file member."""
+    if name not in index['members']:
+        raise KeyError(name)
+    block, offset, size, kind = index['members'][name]
+    if kind not in ('0', '\x00', '7'):
+        message = f'{name} is not a regular file'
+        raise ValueError(message)
+    return read_block(archive, index, block)[offset:offset + size]
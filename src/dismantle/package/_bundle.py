@@ -0,0 +1,167 @@
+"""Export and import offline bundles of installed packages.
+
+A bundle is an uncompressed tar archive holding a lockfile as its first
+member followed by the installed tree of every locked package. Bundles
+allow packages to be installed where no network is available, such as
+air-gapped hosts or container image builds, using a single sequential
+read of the bundle.
+"""
+import io
+import json
+import logging
+import shutil
+import tarfile
+import tempfile
+import time
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional, Union
+
+from dismantle.package._lockfile import LOCKFILE_VERSION, Lockfile
+from dismantle.package._locking import promote
+
+log = logging.getLogger(__name__)
+
+BUNDLE_LOCKFILE = 'dismantle.lock'
+BUNDLE_PACKAGES = 'packages'
+
+
+def _exclude(member: tarfile.TarInfo) -> Optional[tarfile.TarInfo]:
+    """Exclude caches and version control files from a bundle."""
+    parts = PurePosixPath(member.name).parts
+    if '__pycache__' in parts or '.git' in parts:
+        return None
+    return member
+
+
+def export_bundle(
+    lockfile: Lockfile,
+    dest: Union[str, Path]
+) -> Path:
+    """Write every package in a lockfile into a single bundle."""
+    entries = {
+        name: {**entry, 'path': f'{BUNDLE_PACKAGES}/{name}'}
+        for name, entry in lockfile.packages().items()
+    }
+    data = json.dumps(
+        {'version': LOCKFILE_VERSION, 'packages': entries},
+        indent=2,
+        sort_keys=True
+    ).encode()
+    dest = Path(str(dest))
+    with tarfile.open(dest, 'w') as bundle:
+        info = tarfile.TarInfo(BUNDLE_LOCKFILE)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        bundle.addfile(info, io.BytesIO(data))
+        for name, entry in entries.items():
+            bundle.add(lockfile[name]['path'], entry['path'], filter=_exclude)
+    log.info(f'Exported {len(entries)} packages to {dest}')
+    return dest
+
+
+def _unsafe(path: PurePosixPath) -> bool:
+    """Check if a path could point outside the extraction directory."""
+    return path.is_absolute() or '..' in path.parts
+
+
+def _check_member(member: tarfile.TarInfo) -> None:
+    """Ensure a bundle member is extracted within the packages."""
+    path = PurePosixPath(member.name)
+    if _unsafe(path) or path.parts[0] != BUNDLE_PACKAGES:
+        message = f'unsafe path in bundle: {member.name}'
+        raise ValueError(message)
+    if member.issym() or member.islnk():
+        if _unsafe(PurePosixPath(member.linkname)):
+            message = f'unsafe link in bundle: {member.name}'
+            raise ValueError(message)
+    elif not (member.isfile() or member.isdir()):
+        message = f'unsupported member in bundle: {member.name}'
+        raise ValueError(message)
+
+
+def _check_name(name: str, entry: Dict) -> None:
+    """Ensure a locked package name is a plain or scoped name."""
+    parts = PurePosixPath(name).parts
+    plain = len(parts) == 1 and not parts[0].startswith('@')
+    scoped = len(parts) == 2 and parts[0].startswith('@')
+    if (
+        entry.get('name') != name
+        or '/'.join(parts) != name
+        or '\\' in name
+        or _unsafe(PurePosixPath(name))
+        or not (plain or scoped)
+    ):
+        message = f'unsafe package name in bundle: {name}'
+        raise ValueError(message)
+
+
+def _inside(base: Path, path: Path) -> bool:
+    """Check if a path resolves to a location below a base directory."""
+    try:
+        path.resolve().relative_to(base.resolve())
+    except ValueError:
+        return False
+    return True
+
+
+def _check_entry(name: str, entry: Dict, stage: Path, root: Path) -> None:
+    """Ensure a package is promoted from the stage into the root."""
+    _check_name(name, entry)
+    path = PurePosixPath(str(entry.get('path', '')))
+    if (
+        _unsafe(path)
+        or path.parts[:1] != (BUNDLE_PACKAGES,)
+        or not _inside(stage, stage / path)
+        or not _inside(root, root / name)
+    ):
+        message = f'unsafe package path in bundle: {name}'
+        raise ValueError(message)
+
+
+def _read_entries(stream: tarfile.TarFile) -> Dict:
+    """Read the lockfile stored at the start of a bundle."""
+    first = stream.next()
+    if first is None or first.name != BUNDLE_LOCKFILE:
+        message = 'invalid bundle, lockfile not found'
+        raise ValueError(message)
+    data = json.load(stream.extractfile(first))
+    if data.get('version') != LOCKFILE_VERSION:
+        message = 'unsupported lockfile version'
+        raise ValueError(message)
+    return data['packages']
+
+
+def import_bundle(
+    src: Union[str, Path],
+    root: Union[str, Path],
+    lockfile: Optional[Union[str, Path]] = None
+) -> Lockfile:
+    """Install every package in a bundle below the root directory.
+
+    The bundle is read once from start to end. Packages are extracted
+    into a staging directory and each one is promoted into place once
+    the whole bundle has been read. A lockfile describing the installed
+    packages is written to the lockfile path, or into the root.
+    """
+    root = Path(str(root))
+    root.mkdir(parents=True, exist_ok=True)
+    stage = Path(tempfile.mkdtemp(prefix='.bundle.', dir=str(root)))
+    try:
+        with tarfile.open(str(src), 'r|') as stream:
+            entries = _read_entries(stream)
+            for member in stream:
+                if member.name == BUNDLE_LOCKFILE:
+                    continue
+                _check_member(member)
+                stream.extract(member, str(stage))
+        for name, entry in entries.items():
+            _check_entry(name, entry, stage, root)
+        locked = Lockfile(lockfile or root / BUNDLE_LOCKFILE)
+        for name, entry in entries.items():
+            promote(stage / entry['path'], root / name)
+            locked.add({**entry, 'path': str(root / name)})
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+    locked.save()
+    log.info(f'Imported {len(entries)} packages into {root}')
+    return locked
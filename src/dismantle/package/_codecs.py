@@ -0,0 +1,51 @@
+"""Decompression codecs for compressed tar packages.
+
+A codec wraps a readable binary stream of compressed data in a stream
+of the decompressed data. The xz and bz2 codecs are provided by the
+standard library; zstd is registered when the optional zstandard
+package is installed (`pip install dismantle[zstd]`). Additional codecs
+can be registered to support further compression formats or faster
+decompression libraries.
+"""
+import bz2
+import lzma
+from typing import BinaryIO, Callable, Dict, List
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+Codec = Callable[[BinaryIO], BinaryIO]
+
+_codecs: Dict[str, Codec] = {}
+
+
+def register_codec(name: str, codec: Codec) -> None:
+    """Register a codec, replacing any codec of the same name."""
+    _codecs[name] = codec
+
+
+def get_codec(name: str) -> Codec:
+    """Return the codec registered under a name."""
+    if name not in _codecs:
+        message = f'unsupported compression codec {name}'
+        raise ValueError(message)
+    return _codecs[name]
+
+
+def available_codecs() -> List[str]:
+    """Return the names of the registered codecs."""
+    return sorted(_codecs)
+
+
+def _zstd(stream: BinaryIO) -> BinaryIO:
+    """Decompress a zstd stream, reading across every frame."""
+    decompressor = zstandard.ZstdDecompressor()
+    return decompressor.stream_reader(stream, read_across_frames=True)
+
+
+register_codec('xz', lambda stream: lzma.open(stream, 'rb'))
+register_codec('bz2', lambda stream: bz2.open(stream, 'rb'))
+if zstandard is not None:  # pragma: no cover
+    register_codec('zstd', _zstd)
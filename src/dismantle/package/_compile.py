@@ -0,0 +1,54 @@
+"""Compile the python code of installed packages to bytecode.
+
+Installed packages are compiled once, at install time, for the running
+interpreter, so their extensions and plugins are not compiled when they
+are first imported, even when the install tree is read only. Bytecode
+is validated against a hash of the module source rather than its
+modification time, so it stays valid when the tree is copied or
+extracted with new timestamps.
+"""
+import compileall
+import logging
+import py_compile
+import re
+from pathlib import Path
+from typing import Sequence, Union
+
+log = logging.getLogger(__name__)
+
+CODE_DIRECTORIES = ('extensions', 'plugins')
+
+# trees with fewer modules are compiled in process, as starting a pool
+# of processes takes longer than compiling them
+POOL_THRESHOLD = 32
+
+
+def compile_tree(
+    path: Union[str, Path],
+    directories: Sequence[str] = CODE_DIRECTORIES,
+    workers: int = 0
+) -> bool:
+    """Compile the code directories of an install to bytecode.
+
+    Modules are compiled by a pool of processes, using every core when
+    workers is 0. Returns false if any module could not be compiled.
+    """
+    folders = [
+        Path(str(path), directory) for directory in directories
+        if Path(str(path), directory).is_dir()
+    ]
+    modules = sum(len(list(folder.rglob('*.py'))) for folder in folders)
+    if modules < POOL_THRESHOLD:
+        workers = 1
+    success = True
+    for folder in folders:
+        success = compileall.compile_dir(
+            str(folder),
+            rx=re.compile(r'[/\\]\.git[/\\]'),
+            quiet=2,
+            workers=workers,
+            invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH
+        ) and success
+    if not success:
+        log.warning(f'Unable to compile every module in {path}')
+    return bool(success)
@@ -0,0 +1,156 @@
+"""Create package handlers from index entries.
+
+Rather than selecting a package handler and a list of formats for each
+package, the factory selects them from the source of an index entry.
+Sources sharing a scheme and suffix always resolve to the same handler
+and format, so the selection is cached in a dispatch table and the
+handler is created with the single matching format.
+"""
+import logging
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Mapping, Optional, Tuple, Type, Union
+from urllib.parse import urlparse
+
+from dismantle.package._formats import (
+    BgzfPackageFormat,
+    DirectoryPackageFormat,
+    PackageFormat,
+    TarPackageFormat,
+    Tbz2PackageFormat,
+    TgzPackageFormat,
+    TxzPackageFormat,
+    TzstPackageFormat,
+    ZipPackageFormat
+)
+from dismantle.package._handlers import (
+    HttpPackageHandler,
+    LocalPackageHandler,
+    PackageHandler
+)
+
+log = logging.getLogger(__name__)
+
+Handlers = List[Type[PackageHandler]]
+Formats = List[Type[PackageFormat]]
+Selection = Tuple[Type[PackageHandler], Optional[Type[PackageFormat]]]
+
+
+class PackageFactory:
+    """Select and create package handlers for index entries."""
+
+    def __init__(
+        self,
+        handlers: Optional[Handlers] = None,
+        formats: Optional[Formats] = None,
+        root: Optional[Union[str, Path]] = None
+    ) -> None:
+        """Create a factory supporting the given handlers and formats.
+
+        Relative local sources are resolved against the root directory.
+        """
+        if handlers is None:
+            handlers = [HttpPackageHandler, LocalPackageHandler]
+        if formats is None:
+            formats = [
+                DirectoryPackageFormat,
+                ZipPackageFormat,
+                TarPackageFormat,
+                TgzPackageFormat,
+                TxzPackageFormat,
+                Tbz2PackageFormat,
+                TzstPackageFormat,
+                BgzfPackageFormat
+            ]
+        self._handlers = list(handlers)
+        self._formats = list(formats)
+        self._root = Path(str(root)) if root is not None else None
+        self._dispatch: Dict[Tuple[str, str], Selection] = {}
+
+    def add_handler(self, handler: Type[PackageHandler]) -> None:
+        """Add a handler, giving it priority over existing handlers."""
+        self._handlers.insert(0, handler)
+        self._dispatch.clear()
+
+    def add_format(self, package_format: Type[PackageFormat]) -> None:
+        """Add a format, giving it priority over existing formats."""
+        self._formats.insert(0, package_format)
+        self._dispatch.clear()
+
+    @staticmethod
+    def key(src: str) -> Tuple[str, str]:
+        """Return the dispatch table key for a source."""
+        parts = urlparse(src)
+        scheme = parts.scheme if len(parts.scheme) > 1 else 'file'
+        path = parts.path if scheme != 'file' or parts.scheme else src
+        return (scheme, ''.join(PurePosixPath(path).suffixes))
+
+    def source(self, entry: Mapping) -> Union[str, List[str]]:
+        """Return the source of an index entry.
+
+        Entries can provide a list of mirrors, a single source url, or
+        the path of a local package.
+        """
+        src = entry.get('mirrors') or entry.get('src') or entry.get('path')
+        if not src:
+            message = f'no source provided for {entry.get("name")}'
+            raise ValueError(message)
+        if isinstance(src, (list, tuple)):
+            return [str(mirror) for mirror in src]
+        src = str(src)
+        if self._root is not None and self.key(src)[0] == 'file':
+            path = Path(src[7:] if src[:7] == 'file://' else src)
+            src = str(self._root / path) if not path.is_absolute() else src
+        return src
+
+    def _resolve(self, src: str) -> Selection:
+        """Find the first handler and format understanding a source."""
+        for handler in self._handlers:
+            if not handler.grasps(src):
+                continue
+            for package_format in self._formats:
+                if package_format.grasps(src):
+                    return (handler, package_format)
+            if not self.key(src)[1]:
+                # the handler detects the format of sources without a
+                # suffix from the package contents
+                return (handler, None)
+        message = f'unable to process source format for {src}'
+        raise FileNotFoundError(message)
+
+    def select(self, src: str) -> Selection:
+        """Return the handler and format for a source."""
+        key = self.key(src)
+        if key not in self._dispatch:
+            self._dispatch[key] = self._resolve(src)
+        return self._dispatch[key]
+
+    def _candidates(
+        self,
+        package_format: Optional[Type[PackageFormat]]
+    ) -> Formats:
+        """Return the formats a handler is created with."""
+        return [package_format] if package_format else list(self._formats)
+
+    def create(self, entry: Mapping) -> PackageHandler:
+        """Create a package handler for an index entry."""
+        src = self.source(entry)
+        first = src[0] if isinstance(src, list) else src
+        handler, package_format = self.select(first)
+        try:
+            formats = self._candidates(package_format)
+            package = handler(entry['name'], src, formats)
+        except (FileNotFoundError, ValueError):
+            # a cached selection only holds for sources that exist, so
+            # resolve again to report why this source is unsupported
+            handler, package_format = self._resolve(first)
+            formats = self._candidates(package_format)
+            package = handler(entry['name'], src, formats)
+        package.update_meta(entry)
+        return package
+
+    def create_all(self, index: Mapping) -> Dict[str, PackageHandler]:
+        """Create package handlers for every entry of an index."""
+        entries = index.packages() if hasattr(index, 'packages') else index
+        return {
+            name: self.create(entry) for name, entry in entries.items()
+        }
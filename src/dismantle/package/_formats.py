@@ -1,9 +1,131 @@
 import abc
+import gzip
+import io
+import lzma
+import os
 import shutil
 import tarfile
+import tempfile
 import zipfile
-from pathlib import Path
-from typing import Union
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+from typing import (
+    BinaryIO,
+    Callable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union
+)
+
+from dismantle.package._bgzf import (
+    BLOCK_SIZE,
+    Index,
+    read_block,
+    read_index,
+    read_member,
+    write_bgzf
+)
+from dismantle.package._codecs import get_codec
+from dismantle.package._manifest import Changes, ManifestUpdate
+
+Patterns = Optional[Sequence[str]]
+
+
+def selected(
+    name: str,
+    include: Patterns = None,
+    exclude: Patterns = None
+) -> bool:
+    """Check if an archive member is selected by the patterns.
+
+    Patterns are matched against the posix path of the member and each
+    of its parent directories, so a pattern matching a directory also
+    matches everything below it. Without include patterns every member
+    is included.
+    """
+    path = PurePosixPath(name)
+    names = [str(path)] + [str(parent) for parent in path.parents][:-1]
+
+    def matches(patterns: Sequence[str]) -> bool:
+        return any(
+            fnmatchcase(candidate, pattern.rstrip('/'))
+            for pattern in patterns
+            for candidate in names
+        )
+    if include is not None and not matches(include):
+        return False
+    return not (exclude and matches(exclude))
+
+
+def tar_members(
+    archive: tarfile.TarFile,
+    include: Patterns = None,
+    exclude: Patterns = None
+) -> Optional[List[tarfile.TarInfo]]:
+    """Return the tar members selected by the patterns."""
+    if include is None and not exclude:
+        return None
+    return [
+        member for member in archive.getmembers()
+        if selected(member.name, include, exclude)
+    ]
+
+
+def extract_tar_stream(
+    stream: BinaryIO,
+    dest: Union[str, Path],
+    mode: str,
+    include: Patterns = None,
+    exclude: Patterns = None
+) -> None:
+    """Extract a tar archive from a stream as it is read.
+
+    The stream is read once from start to end, so a download can be
+    extracted while it is still being received.
+    """
+    dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
+    try:
+        with tarfile.open(fileobj=stream, mode=mode) as tar_ref:
+            for member in tar_ref:
+                if selected(member.name, include, exclude):
+                    tar_ref.extract(member, str(dest))
+    except (tarfile.TarError, EOFError) as e:
+        message = f'invalid tar stream ({e})'
+        raise ValueError(message)
+
+
+def update_tar_stream(
+    stream: BinaryIO,
+    dest: Union[str, Path],
+    mode: str,
+    include: Patterns = None,
+    exclude: Patterns = None
+) -> Changes:
+    """Update an install in place from a tar archive stream.
+
+    Only members whose size or modification time differ from the
+    install manifest are extracted, and members missing from the
+    archive are removed.
+    """
+    dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
+    update = ManifestUpdate(dest)
+    try:
+        with tarfile.open(fileobj=stream, mode=mode) as tar_ref:
+            for member in tar_ref:
+                if not selected(member.name, include, exclude):
+                    continue
+                key = [member.size, int(member.mtime)]
+                if update.changed(member.name, key, member.isdir()):
+                    tar_ref.extract(member, str(dest))
+    except (tarfile.TarError, EOFError) as e:
+        message = f'invalid tar stream ({e})'
+        raise ValueError(message)
+    return update.finish()
 
 
 class PackageFormat(metaclass=abc.ABCMeta):
@@ -23,8 +145,13 @@ def verify(signature: str) -> bool:
 
     @staticmethod
     @abc.abstractmethod
-    def extract(src: Union[str, Path], dest: Union[str, Path]) -> bool:
-        """Verify a packages hash with the provided signature."""
+    def extract(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> bool:
+        """Extract the members selected by the patterns."""
         ...
 
 
@@ -41,7 +168,12 @@ def grasps(path: Union[str, Path]) -> bool:
             return False
 
     @staticmethod
-    def extract(src: Union[str, Path], dest: Union[str, Path]) -> None:
+    def extract(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
         """Use the formatter to process any movement related actions."""
         src = str(src)[7:] if str(src)[:7] == 'file://' else src
         dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
@@ -53,9 +185,33 @@ def extract(src: Union[str, Path], dest: Union[str, Path]) -> None:
             shutil.copytree(
                 src,
                 dest,
-                ignore=shutil.ignore_patterns('.git', '__pycache__')
+                ignore=DirectoryPackageFormat._ignore(src, include, exclude)
             )
 
+    @staticmethod
+    def _ignore(
+        src: Union[str, Path],
+        include: Patterns,
+        exclude: Patterns
+    ) -> Callable[[str, List[str]], Set[str]]:
+        """Return a copytree ignore function applying the patterns.
+
+        Include patterns are only applied to files, so directories are
+        copied unless they are excluded.
+        """
+        defaults = shutil.ignore_patterns('.git', '__pycache__')
+
+        def ignore(folder: str, names: List[str]) -> Set[str]:
+            ignored = set(defaults(folder, names))
+            relative = Path(folder).relative_to(src)
+            for name in names:
+                member = (relative / name).as_posix()
+                patterns = None if Path(folder, name).is_dir() else include
+                if not selected(member, patterns, exclude):
+                    ignored.add(name)
+            return ignored
+        return ignore
+
 
 class ZipPackageFormat(PackageFormat):
     """A package format compressed as a zip file."""
@@ -69,22 +225,151 @@ def grasps(path: Union[str, Path]) -> bool:
             return False
         return True
 
+    # number of threads used to extract when none are requested, None
+    # extracts on a single thread
+    workers: Optional[int] = None
+
     @staticmethod
-    def extract(src: Union[str, Path], dest: Union[str, Path]) -> None:
-        """Extract the zipfile to the cache location."""
+    def extract(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None,
+        *,
+        workers: Optional[int] = None
+    ) -> None:
+        """Extract the zipfile to the cache location.
+
+        With more than one worker the members are split into contiguous
+        chunks of similar compressed size, and each chunk is extracted
+        in archive order by a thread using its own zipfile handle.
+        """
         src = str(src)[7:] if str(src)[:7] == 'file://' else src
         dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
         src = Path(src)
         dest_path = Path(dest)
+        workers = workers if workers is not None else ZipPackageFormat.workers
 
         if not ZipPackageFormat.grasps(src):
             message = 'formatter only supports zip files'
             raise ValueError(message)
-        if not src.is_file() or not zipfile.is_zipfile(src):
+        try:
+            zip_ref = zipfile.ZipFile(src, 'r')
+        except (zipfile.BadZipFile, OSError):
+            message = 'invalid zip file'
+            raise ValueError(message)
+        with zip_ref:
+            members = [
+                member for member in zip_ref.infolist()
+                if selected(member.filename, include, exclude)
+            ]
+            try:
+                if not workers or workers < 2:
+                    zip_ref.extractall(dest_path, members)
+                    return
+                ZipPackageFormat._extract_parallel(
+                    src,
+                    dest_path,
+                    members,
+                    workers
+                )
+            except (zipfile.BadZipFile, EOFError, zlib.error) as e:
+                message = f'invalid zip file ({e})'
+                raise ValueError(message)
+
+    @staticmethod
+    def update(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> Changes:
+        """Update an install in place from the zipfile.
+
+        Only members whose size or CRC-32 differ from the install
+        manifest are extracted, and members missing from the archive
+        are removed.
+        """
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
+        if not ZipPackageFormat.grasps(src):
+            message = 'formatter only supports zip files'
+            raise ValueError(message)
+        try:
+            zip_ref = zipfile.ZipFile(src, 'r')
+        except (zipfile.BadZipFile, OSError):
+            message = 'invalid zip file'
+            raise ValueError(message)
+        update = ManifestUpdate(dest)
+        with zip_ref:
+            for member in zip_ref.infolist():
+                if not selected(member.filename, include, exclude):
+                    continue
+                key = [member.file_size, member.CRC]
+                if update.changed(member.filename, key, member.is_dir()):
+                    zip_ref.extract(member, dest)
+        return update.finish()
+
+    @staticmethod
+    def place(src: Union[str, Path], dest: Union[str, Path]) -> None:
+        """Atomically copy the zipfile to dest for an in place install.
+
+        Packages installed in place stay a single zip file, so they are
+        read from the archive rather than from extracted files.
+        """
+        src = Path(str(src)[7:] if str(src)[:7] == 'file://' else src)
+        dest = Path(str(dest)[7:] if str(dest)[:7] == 'file://' else dest)
+        try:
+            zipfile.ZipFile(src, 'r').close()
+        except (zipfile.BadZipFile, OSError):
             message = 'invalid zip file'
             raise ValueError(message)
-        with zipfile.ZipFile(src, 'r') as zip_ref:
-            zip_ref.extractall(dest_path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        handle, tmp = tempfile.mkstemp(
+            prefix=f'.{dest.name}.',
+            dir=str(dest.parent)
+        )
+        os.close(handle)
+        try:
+            shutil.copyfile(src, tmp)
+            if dest.is_dir():
+                shutil.rmtree(dest)
+            os.replace(tmp, dest)
+        except OSError:
+            os.unlink(tmp)
+            raise
+
+    @staticmethod
+    def _extract_parallel(
+        src: Path,
+        dest: Path,
+        members: List[zipfile.ZipInfo],
+        workers: int
+    ) -> None:
+        """Extract zip members using a pool of threads."""
+        # create directories up front so workers never race to make them
+        for member in members:
+            path = PurePosixPath(member.filename)
+            if path.is_absolute() or '..' in path.parts:
+                continue
+            folder = path if member.is_dir() else path.parent
+            (dest / folder).mkdir(parents=True, exist_ok=True)
+        files = [member for member in members if not member.is_dir()]
+        total = sum(member.compress_size for member in files) or 1
+        chunks: List[List[zipfile.ZipInfo]] = [[] for _ in range(workers)]
+        done = 0
+        for member in files:
+            chunks[min(done * workers // total, workers - 1)].append(member)
+            done += member.compress_size
+
+        def extract_chunk(chunk: List[zipfile.ZipInfo]) -> None:
+            with zipfile.ZipFile(src, 'r') as zip_ref:
+                for member in chunk:
+                    zip_ref.extract(member, dest)
+
+        chunks = [chunk for chunk in chunks if chunk]
+        with ThreadPoolExecutor(max_workers=max(len(chunks), 1)) as pool:
+            list(pool.map(extract_chunk, chunks))
 
 
 class TarPackageFormat(PackageFormat):
@@ -101,7 +386,12 @@ def grasps(path: Union[str, Path]) -> bool:
         return True
 
     @staticmethod
-    def extract(src: Union[str, Path], dest: Union[str, Path]) -> None:
+    def extract(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
         """Extract the tarfile to the cache location."""
         src = str(src)[7:] if str(src)[:7] == 'file://' else src
         dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
@@ -111,11 +401,50 @@ def extract(src: Union[str, Path], dest: Union[str, Path]) -> None:
         if not TarPackageFormat.grasps(src_path):
             message = 'formatter only supports tar files'
             raise ValueError(message)
-        if not src_path.is_file() or not tarfile.is_tarfile(src_path):
+        try:
+            tar_ref = tarfile.open(src_path, 'r')
+        except (tarfile.TarError, OSError):
+            message = 'invalid tar file'
+            raise ValueError(message)
+        with tar_ref:
+            try:
+                tar_ref.extractall(
+                    dest_path,
+                    tar_members(tar_ref, include, exclude)
+                )
+            except (tarfile.TarError, EOFError) as e:
+                message = f'invalid tar file ({e})'
+                raise ValueError(message)
+
+    @staticmethod
+    def extract_stream(
+        stream: BinaryIO,
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
+        """Extract the tarfile from a stream as it is read."""
+        extract_tar_stream(stream, dest, 'r|', include, exclude)
+
+    @staticmethod
+    def update(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> Changes:
+        """Update an install in place from the tarfile."""
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        if not TarPackageFormat.grasps(src):
+            message = 'formatter only supports tar files'
+            raise ValueError(message)
+        try:
+            tar_file = open(src, 'rb')
+        except OSError:
             message = 'invalid tar file'
             raise ValueError(message)
-        with tarfile.open(src_path, 'r') as tar_ref:
-            tar_ref.extractall(dest_path)
+        with tar_file:
+            return update_tar_stream(tar_file, dest, 'r|', include, exclude)
 
 
 class TgzPackageFormat(PackageFormat):
@@ -132,7 +461,12 @@ def grasps(path: Union[str, Path]) -> bool:
         return True
 
     @staticmethod
-    def extract(src: Union[str, Path], dest: Union[str, Path]) -> None:
+    def extract(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
         """Extract the tarfile to the cache location."""
         src = str(src)[7:] if str(src)[:7] == 'file://' else src
         dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
@@ -142,8 +476,306 @@ def extract(src: Union[str, Path], dest: Union[str, Path]) -> None:
         if not TgzPackageFormat.grasps(src_path):
             message = 'formatter only supports tar.gz files'
             raise ValueError(message)
-        if not src_path.is_file() or not tarfile.is_tarfile(src_path):
+        try:
+            tgz_ref = tarfile.open(src_path, 'r')
+        except (tarfile.TarError, OSError):
+            message = 'invalid tgz file'
+            raise ValueError(message)
+        with tgz_ref:
+            try:
+                tgz_ref.extractall(
+                    dest_path,
+                    tar_members(tgz_ref, include, exclude)
+                )
+            except (tarfile.TarError, EOFError, zlib.error) as e:
+                message = f'invalid tgz file ({e})'
+                raise ValueError(message)
+
+    @staticmethod
+    def extract_stream(
+        stream: BinaryIO,
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
+        """Extract the tarfile from a stream as it is read."""
+        extract_tar_stream(stream, dest, 'r|gz', include, exclude)
+
+    @staticmethod
+    def update(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> Changes:
+        """Update an install in place from the tarfile."""
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        if not TgzPackageFormat.grasps(src):
+            message = 'formatter only supports tar.gz files'
+            raise ValueError(message)
+        try:
+            tgz_file = open(src, 'rb')
+        except OSError:
             message = 'invalid tgz file'
             raise ValueError(message)
-        with tarfile.open(src_path, 'r') as tgz_ref:
-            tgz_ref.extractall(dest_path)
+        with tgz_file:
+            return update_tar_stream(tgz_file, dest, 'r|gz', include, exclude)
+
+
+class BgzfPackageFormat(PackageFormat):
+    """A package format using a tar file split into gzip blocks.
+
+    The blocks of an indexed archive are decompressed in parallel and
+    single members are read without decompressing the whole archive.
+    Archives without an index are extracted as a plain tar.gz file.
+    """
+
+    # number of threads used to extract when none are requested, None
+    # uses the thread pool default
+    workers: Optional[int] = None
+
+    @staticmethod
+    def grasps(path: Union[str, Path]) -> bool:
+        """Check if the path uses the tar.bgz suffix."""
+        path = str(path)[7:] if str(path)[:7] == 'file://' else path
+        return ''.join(Path(path).suffixes) == '.tar.bgz'
+
+    @staticmethod
+    def compress(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        block_size: int = BLOCK_SIZE
+    ) -> None:
+        """Compress an uncompressed tar file into an indexed archive."""
+        write_bgzf(src, dest, block_size)
+
+    @staticmethod
+    def extract(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None,
+        *,
+        workers: Optional[int] = None
+    ) -> None:
+        """Extract the blocks of the archive using a pool of threads."""
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        dest = str(dest)[7:] if str(dest)[:7] == 'file://' else dest
+        if not BgzfPackageFormat.grasps(src):
+            message = 'formatter only supports tar.bgz files'
+            raise ValueError(message)
+        workers = workers if workers is not None else BgzfPackageFormat.workers
+        try:
+            with open(src, 'rb') as archive:
+                index = read_index(archive)
+            if index is None:
+                with tarfile.open(src, 'r:gz') as tar_ref:
+                    tar_ref.extractall(
+                        dest,
+                        tar_members(tar_ref, include, exclude)
+                    )
+                return
+            BgzfPackageFormat._extract_blocks(
+                src,
+                Path(dest),
+                index,
+                workers,
+                include,
+                exclude
+            )
+        except (tarfile.TarError, zlib.error, OSError, EOFError) as e:
+            message = f'invalid bgz file ({e})'
+            raise ValueError(message)
+
+    @staticmethod
+    def _extract_blocks(
+        src: Union[str, Path],
+        dest: Path,
+        index: Index,
+        workers: Optional[int],
+        include: Patterns,
+        exclude: Patterns
+    ) -> None:
+        """Extract the tar members of each block on its own thread."""
+        # create directories up front so blocks never race to make them
+        for name, (_, _, _, kind) in index['members'].items():
+            path = PurePosixPath(name)
+            if path.is_absolute() or '..' in path.parts:
+                continue
+            if selected(name, include, exclude):
+                (dest / (path if kind == '5' else path.parent)).mkdir(
+                    parents=True,
+                    exist_ok=True
+                )
+
+        def extract_block(block: int) -> None:
+            with open(src, 'rb') as archive:
+                data = read_block(archive, index, block)
+            with tarfile.open(fileobj=io.BytesIO(data), mode='r:') as tar_ref:
+                tar_ref.extractall(
+                    dest,
+                    tar_members(tar_ref, include, exclude)
+                )
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(extract_block, range(len(index['blocks']))))
+
+    @staticmethod
+    def read(src: Union[str, Path], name: str) -> bytes:
+        """Read a single file from the archive.
+
+        Only the block holding the file is decompressed when the archive
+        has an index.
+        """
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        name = str(PurePosixPath(name))
+        try:
+            with open(src, 'rb') as archive:
+                index = read_index(archive)
+                if index is not None:
+                    return read_member(archive, index, name)
+            with tarfile.open(src, 'r:gz') as tar_ref:
+                member = tar_ref.extractfile(name)
+                if member is None:
+                    message = f'{name} is not a regular file'
+                    raise ValueError(message)
+                return member.read()
+        except KeyError:
+            message = f'{name} not found in package archive'
+            raise FileNotFoundError(message)
+        except (tarfile.TarError, zlib.error, EOFError) as e:
+            message = f'invalid bgz file ({e})'
+            raise ValueError(message)
+
+    @staticmethod
+    def extract_stream(
+        stream: BinaryIO,
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
+        """Extract the archive from a stream as it is read."""
+        with gzip.GzipFile(fileobj=stream, mode='rb') as body:
+            extract_tar_stream(body, dest, 'r|', include, exclude)
+
+    @staticmethod
+    def update(
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> Changes:
+        """Update an install in place from the archive."""
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        if not BgzfPackageFormat.grasps(src):
+            message = 'formatter only supports tar.bgz files'
+            raise ValueError(message)
+        try:
+            with open(src, 'rb') as archive, gzip.GzipFile(
+                fileobj=archive,
+                mode='rb'
+            ) as body:
+                return update_tar_stream(body, dest, 'r|', include, exclude)
+        except (OSError, EOFError, zlib.error) as e:
+            message = f'invalid bgz file ({e})'
+            raise ValueError(message)
+
+
+class CompressedTarPackageFormat(PackageFormat):
+    """A tar package format decompressed using a registered codec.
+
+    Subclasses name the codec and the suffixes they grasp, so formats
+    for additional compression codecs only need to declare both.
+    """
+
+    codec: str = ''
+    suffixes: Tuple[str, ...] = ()
+
+    @classmethod
+    def grasps(cls, path: Union[str, Path]) -> bool:
+        """Check if the path uses one of the format suffixes."""
+        path = str(path)[7:] if str(path)[:7] == 'file://' else path
+        return ''.join(Path(path).suffixes) in cls.suffixes
+
+    @classmethod
+    def extract(
+        cls,
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
+        """Extract the compressed tarfile to the cache location."""
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        src_path = Path(src)
+
+        if not cls.grasps(src_path):
+            message = f'formatter only supports {cls.suffixes[0]} files'
+            raise ValueError(message)
+        if not src_path.is_file():
+            message = f'invalid {cls.codec} file'
+            raise ValueError(message)
+        try:
+            with open(src_path, 'rb') as compressed:
+                cls.extract_stream(compressed, dest, include, exclude)
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            message = f'invalid {cls.codec} file ({e})'
+            raise ValueError(message)
+
+    @classmethod
+    def extract_stream(
+        cls,
+        stream: BinaryIO,
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> None:
+        """Extract the compressed tarfile from a stream."""
+        codec = get_codec(cls.codec)
+        with codec(stream) as body:
+            extract_tar_stream(body, dest, 'r|', include, exclude)
+
+    @classmethod
+    def update(
+        cls,
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None,
+        exclude: Patterns = None
+    ) -> Changes:
+        """Update an install in place from the compressed tarfile."""
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        if not cls.grasps(src):
+            message = f'formatter only supports {cls.suffixes[0]} files'
+            raise ValueError(message)
+        codec = get_codec(cls.codec)
+        try:
+            with open(src, 'rb') as compressed, codec(compressed) as body:
+                return update_tar_stream(body, dest, 'r|', include, exclude)
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            message = f'invalid {cls.codec} file ({e})'
+            raise ValueError(message)
+
+
+class TxzPackageFormat(CompressedTarPackageFormat):
+    """A package format using an xz compressed tar file."""
+
+    codec = 'xz'
+    suffixes = ('.tar.xz', '.txz')
+
+
+class Tbz2PackageFormat(CompressedTarPackageFormat):
+    """A package format using a bzip2 compressed tar file."""
+
+    codec = 'bz2'
+    suffixes = ('.tar.bz2', '.tbz2', '.tbz')
+
+
+class TzstPackageFormat(CompressedTarPackageFormat):
+    """A package format using a zstd compressed tar file.
+
+    Requires the optional zstandard package.
+    """
+
+    codec = 'zstd'
+    suffixes = ('.tar.zst', '.tzst')
@@ -13,25 +13,80 @@
 import atexit
 import json
 import logging
+import os
 import shutil
 import tempfile
+import time
+import zipfile
+from contextlib import suppress
+from functools import partial
 from hashlib import md5
 from json.decoder import JSONDecodeError
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union
+)
 from urllib.parse import urlparse
 
 import requests
 
+from dismantle.package._compile import compile_tree
 from dismantle.package._formats import (
     DirectoryPackageFormat,
     PackageFormat,
     ZipPackageFormat
 )
+from dismantle.package._locking import FileLock, lock_path, staging, stamp
+from dismantle.package._manifest import (
+    read_manifest,
+    record_files,
+    verify_install
+)
+from dismantle.package._mirrors import stats
+from dismantle.package._remote import RangeFile, RemoteArchive
+from dismantle.package._sniff import (
+    HEADER_SIZE,
+    SUFFIXES,
+    detect_format,
+    sniff
+)
+from dismantle.package._stream import HashingReader
+from dismantle.transport import (
+    DownloadScheduler,
+    Priority,
+    get_policy,
+    get_scheduler,
+    hedge,
+    request
+)
 
 log = logging.getLogger(__name__)
 
 Formats = Optional[List[PackageFormat]]
+Result = TypeVar('Result')
+
+
+def _link(src: str, dest: str) -> None:
+    """Hard link a file, copying it where links are not supported."""
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _verify_tree(path: Optional[Union[str, Path]]) -> bool:
+    """Verify an installed tree if a manifest was recorded for it."""
+    if not path or 'files' not in read_manifest(path):
+        return True
+    report = verify_install(path)
+    return not (report['missing'] or report['modified'])
 
 
 class PackageHandler(metaclass=abc.ABCMeta):
@@ -84,6 +139,10 @@ def verify(self, signature: str) -> bool:
         """Verify a packages hash with the provided signature."""
         ...
 
+    def update_meta(self, meta: Mapping) -> None:
+        """Merge meta data, such as an index entry, into the package."""
+        self._meta = {**self._meta, **meta}
+
 
 class LocalPackageHandler(PackageHandler):
     """Directory package structure."""
@@ -92,13 +151,19 @@ def __init__(
         self,
         name: str,
         src: Union[str, Path],
-        formats: Optional[Formats] = None
+        formats: Optional[Formats] = None,
+        bytecode: bool = True
     ) -> None:
-        """Initialise the package."""
+        """Initialise the package.
+
+        Packages copied to an install path are compiled to bytecode
+        unless bytecode is disabled.
+        """
         self._meta = {}
         self._meta['name'] = name
         self._path = None
         self._installed = False
+        self._bytecode = bytecode
         self._src = str(src)[7:] if str(src)[:7] == 'file://' else src
         if formats is None:
             formats = [DirectoryPackageFormat]
@@ -120,6 +185,16 @@ def path(self) -> str:
         """Return the path the package is installed into."""
         return str(self._path)
 
+    @property
+    def sources(self) -> List[str]:
+        """Return the locations the package is installed from."""
+        return [str(self._src)]
+
+    @property
+    def artifact(self) -> Path:
+        """Return the local file or directory the package comes from."""
+        return Path(str(self._src))
+
     def __getattr__(self, name):
         """Return metadata.
 
@@ -160,10 +235,24 @@ def install(
         path = str(path)[7:] if str(path)[:7] == 'file://' else path
         self._path = path if path else self._src
         self._format.extract(self._src, self._path)
+        if self._path != self._src:
+            if self._bytecode:
+                compile_tree(self._path)
+            record_files(self._path)
         self._meta = {**self._meta, **self._load_metadata(self._path)}
         self._installed = True
         return True
 
+    def adopt(self, path: Union[str, Path]) -> bool:
+        """Mark the package as installed in an existing tree.
+
+        Nothing is copied, the metadata is read from the tree.
+        """
+        self._meta = {**self._meta, **self._load_metadata(path)}
+        self._path = str(path)
+        self._installed = True
+        return True
+
     def uninstall(self) -> bool:
         """Uninstall the package."""
         if self._path != self._src:
@@ -173,11 +262,15 @@ def uninstall(self) -> bool:
         return True
 
     def verify(self, digest: Optional[str] = None) -> bool:
-        """Verify the package hasn't been tampered with."""
-        if digest is None:
-            return True
-        message = 'the local package handler does not support verification'
-        raise ValueError(message)
+        """Verify the package hasn't been tampered with.
+
+        Packages copied to an install path are checked against the
+        files recorded in their manifest when they were installed.
+        """
+        if digest is not None:
+            message = 'the local package handler does not support verification'
+            raise ValueError(message)
+        return _verify_tree(self._path)
 
     def _load_metadata(self, path: Union[str, Path]):
         """Load the package.json file into memory."""
@@ -215,36 +308,123 @@ class HttpPackageHandler(PackageHandler):
     def __init__(
         self,
         name: str,
-        src: Union[str, Path],
-        formats: Formats = None
+        src: Union[str, Path, Sequence[str]],
+        formats: Formats = None,
+        hedge: Optional[float] = None,
+        priority: int = Priority.NORMAL,
+        in_place: bool = False,
+        streaming: bool = False,
+        incremental: bool = False,
+        bytecode: bool = True
     ):
-        """Initialise the package."""
+        """Initialise the package.
+
+        The source can be a single url or a list of mirror urls serving
+        the same package. Setting hedge to a delay in seconds sends HEAD
+        checks to the next mirror when the preferred mirror has not
+        responded within the delay. The priority is the class requests
+        for the package are scheduled with. Zip packages installed in
+        place are kept as a single archive at the install path. Tar
+        packages can be streamed, extracting the download as it is
+        received. Incremental installs update an existing install in
+        place, writing only the files that changed. Extracted packages
+        are compiled to bytecode unless bytecode is disabled.
+        """
         self._meta = {}
         self._meta['name'] = name
         self._path = None
         self._installed = False
         self._updated = False
-        self._src = src
+        if isinstance(src, (list, tuple)):
+            self._mirrors = [str(mirror) for mirror in src]
+        else:
+            self._mirrors = [str(src)]
+        self._src = self._mirrors[0] if self._mirrors else ''
+        self._hedge = hedge
+        self._priority = priority
 
         tmp_cache = tempfile.TemporaryDirectory()
         cache_dir = Path(tmp_cache.name)
         atexit.register(tmp_cache.cleanup)
 
-        parts = urlparse(str(src))
+        parts = urlparse(str(self._src))
         ext = ''.join(Path(parts.path).suffixes)
         self._cache = Path(cache_dir / Path(name + ext))
-        if not HttpPackageHandler.grasps(src):
+        if not self._mirrors or not all(map(self.grasps, self._mirrors)):
             message = 'invalid handler format'
             raise ValueError(message)
         if formats is None:
             formats = [ZipPackageFormat]
+        self._formats = list(formats)
+        self._format = self._select_format(self._formats)
+        self._selected = self._format
+        self._cache_path = self._cache
+        self._in_place = in_place
+        self._streaming = streaming
+        self._incremental = incremental
+        self._bytecode = bytecode
+        self._check_mode(streaming)
+        self._streamed = False
+        self._cache_digest: Optional[str] = None
+
+    def _select_format(self, formats: List) -> Optional[PackageFormat]:
+        """Return the format grasping the source.
+
+        The format of a source without a suffix is detected from the
+        package once it has been downloaded.
+        """
         for current_format in formats:
             if current_format.grasps(self._src):
+                return current_format
+        if formats and not Path(urlparse(self._src).path).suffix:
+            return None
+        message = 'a valid source is required'
+        raise FileNotFoundError(message)
+
+    def _use_format(self, header: Optional[bytes] = None) -> None:
+        """Select the format detected from the header of the package.
+
+        Without a header the format is detected from the cached package,
+        which is renamed to use the suffix of the detected format.
+        """
+        if header is None:
+            detected = detect_format(self._cache, self._digest)
+        else:
+            detected = sniff(header)
+        for current_format in self._formats:
+            if detected is not None and issubclass(current_format, detected):
                 self._format = current_format
                 break
         else:
-            message = 'a valid source is required'
-            raise FileNotFoundError(message)
+            message = 'unable to detect the package format'
+            raise ValueError(message)
+        suffixed = self._cache.with_name(self._cache.name + SUFFIXES[detected])
+        if self._cache.exists():
+            os.replace(self._cache, suffixed)
+        self._cache = suffixed
+        self._check_mode(False)
+
+    def _check_mode(self, streaming: bool) -> None:
+        """Ensure the package format supports the install mode.
+
+        Streaming is only checked up front, as a detected format that
+        can not be streamed is extracted from the cache instead.
+        """
+        modes = [self._in_place, self._streaming, self._incremental]
+        if sum(modes) > 1:
+            message = 'install modes can not be combined'
+            raise ValueError(message)
+        if self._format is None:
+            return
+        if self._in_place and self._format is not ZipPackageFormat:
+            message = 'in place installs only support zip packages'
+            raise ValueError(message)
+        if streaming and not hasattr(self._format, 'extract_stream'):
+            message = 'streaming installs only support tar packages'
+            raise ValueError(message)
+        if self._incremental and not hasattr(self._format, 'update'):
+            message = 'incremental installs only support archive packages'
+            raise ValueError(message)
 
     @property
     def name(self) -> str:
@@ -271,36 +451,253 @@ def grasps(path: Union[str, Path]) -> bool:
             return False
         return True
 
-    def _fetch_and_extract(self):
+    @property
+    def mirrors(self) -> List[str]:
+        """Return the mirrors ordered from most to least preferred."""
+        return stats.rank(self._mirrors)
+
+    @property
+    def path(self) -> str:
+        """Return the path the package is installed into."""
+        return str(self._path)
+
+    @property
+    def sources(self) -> List[str]:
+        """Return the mirrors in the order they were provided."""
+        return list(self._mirrors)
+
+    @property
+    def artifact(self) -> Path:
+        """Return the cached download of the package.
+
+        The cache only exists once the package has been downloaded.
+        """
+        return self._cache
+
+    def _send(self, method: Callable, url: str) -> requests.Response:
+        """Send a conditional request to a mirror and record it."""
         headers = {'If-None-Match': self._digest}
-        req = requests.get(
-            str(self._src),
-            headers=headers,
-            allow_redirects=True
-        )
-        if req.status_code not in [200, 304]:
-            raise FileNotFoundError(req.status_code)
-        elif req.status_code == 200:
+        start = time.monotonic()
+        try:
+            req = method(url, headers=headers, allow_redirects=True)
+        except requests.RequestException:
+            stats.record(url, time.monotonic() - start, False)
+            raise
+        success = req.status_code in [200, 304]
+        stats.record(url, time.monotonic() - start, success)
+        return req
+
+    def _download(
+        self,
+        url: str,
+        stage: Optional[Path] = None
+    ) -> requests.Response:
+        """Download the package from a mirror into the cache.
+
+        The body is streamed through the download scheduler so it is
+        read within the bandwidth cap, and the cache is replaced only
+        once the whole body has been received. When a staging directory
+        is provided the body is also extracted into it as it arrives.
+        """
+        req = self._send(partial(request, 'GET', stream=True), url)
+        with req:
+            if req.status_code != 200:
+                return req
             # Make sure parent folder of the cache exists
             self._cache.parents[0].mkdir(0o777, parents=True, exist_ok=True)
             log.info(f'Creating dir {self._cache.parents[0]} to hold cache')
             # Write the package raw bytes into a single cache file
-            with open(self._cache, 'wb') as cached_package:
-                cached_package.write(req.content)
+            partial_cache = self._cache.with_name(f'{self._cache.name}.part')
+            with open(partial_cache, 'wb') as cached_package:
+                chunks = get_scheduler().stream(req)
+                body = HashingReader(chunks, cached_package)
+                self._streamed = stage is not None and self._extract_stream(
+                    body,
+                    stage
+                )
+                body.drain()
+            os.replace(partial_cache, self._cache)
+            self._cache_digest = body.hexdigest()
+        return req
+
+    def _extract_stream(self, body: HashingReader, stage: Path) -> bool:
+        """Extract a body into the stage, emptying it on failure.
+
+        Returns false when the detected format can not be streamed, so
+        the package is extracted from the cache once it is received.
+        """
+        if self._format is None:
+            self._use_format(body.peek(HEADER_SIZE))
+        if not hasattr(self._format, 'extract_stream'):
+            return False
+        try:
+            self._format.extract_stream(body, stage)
+        except Exception:
+            self._empty(stage)
+            raise
+        return True
+
+    @staticmethod
+    def _empty(stage: Path) -> None:
+        """Remove the files a failed mirror left in the stage."""
+        shutil.rmtree(stage, ignore_errors=True)
+        stage.mkdir()
+
+    def _discard(self) -> None:
+        """Forget the package cached from a mirror that failed.
+
+        The format detected from the package is forgotten as well, as
+        the next mirror may serve the package using another format.
+        """
+        with suppress(OSError):
+            self._cache.unlink()
+        self._cache = self._cache_path
+        self._cache_digest = None
+        self._format = self._selected
+
+    def _attempt(
+        self,
+        send: Callable[[str], requests.Response],
+        url: str,
+        scheduler: Optional[DownloadScheduler] = None
+    ) -> requests.Response:
+        """Schedule a request to a mirror and check the response."""
+        scheduler = scheduler or get_scheduler()
+        call = partial(send, url)
+        req = scheduler.submit(url, call, self._priority).result()
+        if req.status_code not in [200, 304]:
+            raise FileNotFoundError(req.status_code)
+        return req
+
+    def _open_remote(self, url: str) -> RangeFile:
+        """Open a mirror for range requests and record the result."""
+        start = time.monotonic()
+        try:
+            remote = RangeFile(url)
+        except (requests.RequestException, FileNotFoundError):
+            stats.record(url, time.monotonic() - start, False)
+            raise
+        stats.record(url, time.monotonic() - start, True)
+        return remote
+
+    def _failover(self, call: Callable[[str], Result]) -> Result:
+        """Call each mirror in turn until one succeeds."""
+        error: Optional[Exception] = None
+        for url in self.mirrors:
+            start = time.monotonic()
+            try:
+                return call(url)
+            except (requests.RequestException, FileNotFoundError) as e:
+                error = e
+            except ValueError as e:
+                # a corrupt package is a failed transfer from the mirror
+                stats.record(url, time.monotonic() - start, False)
+                self._discard()
+                error = e
+            log.warning(f'Mirror {url} failed for {self._src} ({error})')
+        raise error or FileNotFoundError(self._src)
+
+    def _dispatch(self, call: Callable[[str], Result]) -> Result:
+        """Call the mirrors, hedging small requests when enabled."""
+        delay = self._hedge if self._hedge is not None else get_policy().hedge
+        if delay is None:
+            return self._failover(call)
+        mirrors = self.mirrors
+        return hedge(call, mirrors if len(mirrors) > 1 else mirrors * 2, delay)
+
+    def _fetch_and_extract(self):
+        if self._streaming:
+            self._fetch_streaming()
+            return
+        self._failover(self._fetch_mirror)
+
+    def _fetch_mirror(self, url: str) -> requests.Response:
+        """Download the package from a mirror and extract it."""
+        req = self._attempt(self._download, url)
+        if req.status_code == 200:
             self._updated = True
-        self._format.extract(self._cache, self._path or '')
+        if self._format is None:
+            self._use_format()
+        if self._in_place:
+            ZipPackageFormat.place(self._cache, self._path or '')
+        else:
+            self._extract()
+        return req
 
-    def install(self, path: str, version: Optional[str] = None) -> bool:
-        """Install the current package to the given path.
+    def _extract(self) -> None:
+        """Extract the cached package into a staging directory.
 
-        If there's already a package in path we'll only fetch if the
-        version is different.
+        Incremental installs copy an install holding a manifest into
+        the stage, and only write the members which changed.
+        """
+        path = self._path or ''
+        with staging(path) as stage:
+            if self._incremental:
+                if 'members' in read_manifest(path):
+                    self._seed(Path(path), stage)
+                self._format.update(self._cache, stage)
+            else:
+                self._format.extract(self._cache, stage)
+            self._prepare(stage, not self._incremental)
+
+    @staticmethod
+    def _seed(path: Path, stage: Path) -> None:
+        """Link the files of an existing install into an empty stage.
+
+        Files are hard linked rather than copied, so seeding costs the
+        same whatever the size of the package. Updates unlink changed
+        files before writing them, leaving the linked install intact.
+        """
+        stage.rmdir()
+        shutil.copytree(
+            str(path),
+            str(stage),
+            symlinks=True,
+            copy_function=_link
+        )
+
+    def _prepare(self, stage: Path, check: bool = True) -> None:
+        """Compile and record an extracted package before promotion.
+
+        Extracted files are checked against the manifest shipped in the
+        package, when it has one, unless the stage was updated.
         """
-        fetch_required = True
+        if self._bytecode:
+            compile_tree(stage)
+        record_files(stage, check=check)
+
+    def _fetch_streaming(self) -> None:
+        """Download and extract the package in a single pass."""
+        with staging(self._path or '') as stage:
+            self._failover(partial(self._stream_mirror, stage))
+            self._prepare(stage)
+
+    def _stream_mirror(self, stage: Path, url: str) -> requests.Response:
+        """Download and extract the package from a mirror.
+
+        Packages which could not be streamed are extracted from the
+        cache once they have been received.
+        """
+        download = partial(self._download, stage=stage)
+        req = self._attempt(download, url)
+        if req.status_code == 200:
+            self._updated = True
+        if req.status_code != 200 or not self._streamed:
+            if self._format is None:
+                self._use_format()
+            try:
+                self._format.extract(self._cache, stage)
+            except ValueError:
+                self._empty(stage)
+                raise
+        return req
+
+    def _fetch_required(self, path: Union[str, Path]) -> bool:
+        """Check if the package installed in path must be fetched."""
         try:
-            existing_pkg_metadata = self._load_metadata(Path(path))
+            existing_pkg_metadata = self._load_metadata(Path(str(path)))
             if existing_pkg_metadata['version'] == self._meta['version']:
-                fetch_required = False
+                return False
         except ValueError:
             # Ignore _load_metadata errors
             pass
@@ -310,17 +707,38 @@ def install(self, path: str, version: Optional[str] = None) -> bool:
         except KeyError:
             # ignore if `_meta` is empty
             pass
+        return True
+
+    def install(self, path: str, version: Optional[str] = None) -> bool:
+        """Install the current package to the given path.
 
+        If there's already a package in path we'll only fetch if the
+        version is different. Installs of the same path are serialised
+        across processes; a process that waited for another install of
+        the path to complete reuses the result instead of fetching.
+        """
         self._path = path
         self._updated = False
 
-        if fetch_required:
-            self._fetch_and_extract()
+        seen = stamp(path)
+        with FileLock(lock_path(path)):
+            if self._fetch_required(path) and stamp(path) == seen:
+                self._fetch_and_extract()
 
         self._meta = {**self._meta, **self._load_metadata(Path(self._path))}
         self._installed = True
         return True
 
+    def adopt(self, path: Union[str, Path]) -> bool:
+        """Mark the package as installed in an existing tree.
+
+        Nothing is fetched, the metadata is read from the tree.
+        """
+        self._meta = {**self._meta, **self._load_metadata(Path(str(path)))}
+        self._path = str(path)
+        self._installed = True
+        return True
+
     def uninstall(self) -> bool:
         """Uninstall the package."""
         if self._path != self._src:
@@ -330,36 +748,57 @@ def uninstall(self) -> bool:
         return True
 
     def verify(self, digest: Optional[str] = None) -> bool:
-        """Verify the package hasn't been tampered with."""
-        if digest is None:
-            return True
-        message = 'the http package handler does not support verification'
-        raise ValueError(message)
+        """Verify the package hasn't been tampered with.
+
+        Installed trees are checked against the files recorded in their
+        manifest when the package was installed.
+        """
+        if digest is not None:
+            message = 'the http package handler does not support verification'
+            raise ValueError(message)
+        return _verify_tree(self._path)
 
     def _load_metadata(self, path: Path):
-        """Load the package.json file into memory."""
+        """Load the package.json file into memory.
+
+        Packages installed in place read the file from their archive.
+        """
         try:
+            if path.is_file():
+                with zipfile.ZipFile(path, 'r') as archive:
+                    return self._check_metadata(
+                        json.loads(archive.read('package.json'))
+                    )
             with open(path / 'package.json') as package:
-                meta = json.load(package)
-                if 'name' not in meta:
-                    message = 'meta file missing name value'
-                    raise ValueError(message)
-                if self._meta['name'] != meta['name']:
-                    message = 'meta name does not match provided package name'
-                    raise ValueError(message)
-                if 'version' not in meta:
-                    message = 'meta file missing version value'
-                    raise ValueError(message)
-                return meta
-        except JSONDecodeError:
+                return self._check_metadata(json.load(package))
+        except (JSONDecodeError, zipfile.BadZipFile):
             message = 'invalid package file format'
             raise ValueError(message)
+        except KeyError:
+            message = 'package.json not found in package archive'
+            raise FileNotFoundError(message)
+
+    def _check_metadata(self, meta: Dict) -> Dict:
+        """Ensure package meta data matches the package."""
+        if 'name' not in meta:
+            message = 'meta file missing name value'
+            raise ValueError(message)
+        if self._meta['name'] != meta['name']:
+            message = 'meta name does not match provided package name'
+            raise ValueError(message)
+        if 'version' not in meta:
+            message = 'meta file missing version value'
+            raise ValueError(message)
+        return meta
 
     @staticmethod
     def _remove_files(path: Path) -> None:
         """Recursively remove the path and all its sub items."""
         try:
-            shutil.rmtree(path)
+            if path.is_file():
+                path.unlink()
+            else:
+                shutil.rmtree(path)
         except OSError:
             FileNotFoundError('unable to remove files')
 
@@ -369,19 +808,46 @@ def outdated(self) -> bool:
 
         To check that the ETag matches.
         """
-        headers = {'If-None-Match': self._digest}
-        req = requests.head(
-            str(self._src or ''),
-            headers=headers,
-            allow_redirects=True
-        )
+        head = partial(self._send, partial(request, 'HEAD'))
+        req = self._dispatch(partial(self._attempt, head))
+        return req.status_code == 200
 
-        if req.status_code not in [200, 304]:
-            raise FileNotFoundError(req.status_code)
-        elif req.status_code == 200:
-            return True
-        else:
-            return False
+    def check(
+        self,
+        method: Optional[Callable] = None,
+        scheduler: Optional[DownloadScheduler] = None
+    ) -> bool:
+        """Send a conditional head request to each mirror in turn.
+
+        Returns true when a newer package is available. The request is
+        sent using method, which takes the url and keyword arguments of
+        the request, and run on the scheduler, or the shared scheduler
+        when none is given.
+        """
+        head = partial(self._send, method or partial(request, 'HEAD'))
+        req = self._failover(partial(
+            self._attempt,
+            head,
+            scheduler=scheduler
+        ))
+        return req.status_code == 200
+
+    def inspect(self) -> RemoteArchive:
+        """Open the remote package without downloading it.
+
+        Only the central directory of the zip archive is downloaded when
+        the package is opened, members are fetched using range requests
+        as they are read.
+        """
+        if self._format is not ZipPackageFormat:
+            message = 'remote inspection only supports zip packages'
+            raise ValueError(message)
+        return RemoteArchive(self._dispatch(self._open_remote))
+
+    def fetch_metadata(self) -> Dict:
+        """Read the package.json file of the remote package."""
+        with self.inspect() as archive:
+            return self._check_metadata(archive.meta)
 
     @property
     def _digest(self) -> str:
@@ -389,6 +855,8 @@ def _digest(self) -> str:
         digest = md5()
         if not self._cache.exists():
             return digest.hexdigest()
+        if self._cache_digest is not None:
+            return self._cache_digest
         with open(self._cache, 'rb') as cached_package:
             for block in iter(lambda: cached_package.read(65536), b''):
                 digest.update(block)
@@ -0,0 +1,157 @@
+"""Extract the members of a package archive on first access.
+
+Packages shipping large assets spend most of their install time writing
+files which are rarely read. A lazy archive extracts only the members
+selected by include patterns up front, such as the package.json file
+and the code directories, and extracts every other member the first
+time its path is requested.
+"""
+import tarfile
+import threading
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Dict, List, Set, Tuple, Union
+
+from dismantle.package._formats import Patterns, ZipPackageFormat, selected
+from dismantle.package._sniff import detect_format
+
+Archive = Union[zipfile.ZipFile, tarfile.TarFile]
+Member = Union[zipfile.ZipInfo, tarfile.TarInfo]
+
+
+class LazyArchive:
+    """A filesystem like accessor over a zip or tar package archive."""
+
+    def __init__(
+        self,
+        src: Union[str, Path],
+        dest: Union[str, Path],
+        include: Patterns = None
+    ) -> None:
+        """Open an archive, extracting included members into dest."""
+        src = str(src)[7:] if str(src)[:7] == 'file://' else src
+        self._src = Path(src)
+        self._dest = Path(str(dest))
+        self._lock = threading.Lock()
+        self._extracted: Set[str] = set()
+        self._archive, self._members = self._open(self._src)
+        if include is not None:
+            with self._lock:
+                for name in self.names():
+                    if selected(name, include):
+                        self._extract(name)
+
+    @staticmethod
+    def _open(src: Path) -> Tuple[Archive, Dict[str, Member]]:
+        """Open an archive and index its members by name."""
+        archive: Archive
+        detected = detect_format(src) if src.is_file() else None
+        try:
+            if detected is ZipPackageFormat:
+                archive = zipfile.ZipFile(src, 'r')
+                infos = {info.filename: info for info in archive.infolist()}
+            else:
+                archive = tarfile.open(src, 'r')
+                infos = {info.name: info for info in archive.getmembers()}
+        except (zipfile.BadZipFile, tarfile.TarError, OSError):
+            message = 'invalid package archive'
+            raise ValueError(message)
+        members: Dict[str, Member] = {
+            str(PurePosixPath(name)): info for name, info in infos.items()
+        }
+        return (archive, members)
+
+    def __enter__(self) -> 'LazyArchive':
+        """Use the archive as a context manager."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close the archive when leaving the context."""
+        self.close()
+
+    def __contains__(self, name: object) -> bool:
+        """Check if the archive holds a member."""
+        return self.exists(str(name))
+
+    @property
+    def dest(self) -> Path:
+        """Return the directory members are extracted into."""
+        return self._dest
+
+    @property
+    def extracted(self) -> List[str]:
+        """Return the names of the members extracted so far."""
+        return sorted(self._extracted)
+
+    def names(self) -> List[str]:
+        """Return the names of every member in archive order."""
+        return list(self._members)
+
+    def exists(self, name: str) -> bool:
+        """Check if a file or directory exists within the archive."""
+        name = str(PurePosixPath(name))
+        return name in self._members or bool(self._below(name))
+
+    def is_dir(self, name: str) -> bool:
+        """Check if a name is a directory within the archive."""
+        name = str(PurePosixPath(name))
+        member = self._members.get(name)
+        if isinstance(member, tarfile.TarInfo):
+            return member.isdir()
+        if member is not None:
+            return member.is_dir()
+        return bool(self._below(name))
+
+    def path(self, name: str) -> Path:
+        """Return the extracted path of a member, extracting on demand.
+
+        Requesting a directory extracts everything below it.
+        """
+        name = str(PurePosixPath(name))
+        names = [name] if name in self._members else []
+        names += self._below(name)
+        if not names:
+            message = f'{name} not found in {self._src}'
+            raise FileNotFoundError(message)
+        with self._lock:
+            for member in names:
+                self._extract(member)
+        return self._dest / name
+
+    def open(self, name: str, mode: str = 'r', **kwargs) -> IO:
+        """Open a member for reading, extracting it if required."""
+        if mode not in ['r', 'rb', 'rt']:
+            message = 'lazy archives can only be opened for reading'
+            raise ValueError(message)
+        return open(self.path(name), mode, **kwargs)
+
+    def read_bytes(self, name: str) -> bytes:
+        """Return the contents of a member as bytes."""
+        return self.path(name).read_bytes()
+
+    def read_text(self, name: str, encoding: str = 'utf-8') -> str:
+        """Return the contents of a member as text."""
+        return self.path(name).read_text(encoding=encoding)
+
+    def close(self) -> None:
+        """Close the underlying archive."""
+        self._archive.close()
+
+    def _below(self, name: str) -> List[str]:
+        """Return the members stored below a directory."""
+        prefix = '' if name == '.' else f'{name}/'
+        return [
+            member for member in self._members
+            if member.startswith(prefix) and member != name
+        ]
+
+    def _extract(self, name: str) -> None:
+        """Extract a single member unless it was already extracted."""
+        if name in self._extracted:
+            return
+        path = PurePosixPath(name)
+        if path.is_absolute() or '..' in path.parts:
+            message = f'unsafe path in archive: {name}'
+            raise ValueError(message)
+        self._archive.extract(self._members[name], str(self._dest))
+        self._extracted.add(name)
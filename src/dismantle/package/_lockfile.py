@@ -0,0 +1,176 @@
+"""Record the exact resolved set of installed packages.
+
+A lockfile stores the name, version, source, digest, and install path
+of every installed package, along with a stat fingerprint of each
+installed tree. When the trees on disk still match the lockfile,
+packages are adopted using only local stat calls and the metadata
+already on disk, so startup makes no network requests at all. A frozen
+lockfile refuses to fall back to installing packages.
+"""
+import json
+import logging
+import os
+import tempfile
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from dismantle.package._handlers import PackageHandler
+
+log = logging.getLogger(__name__)
+
+LOCKFILE_VERSION = 1
+
+
+def file_digest(path: Union[str, Path]) -> Optional[str]:
+    """Return the sha256 digest of a file if it exists."""
+    digest = sha256()
+    try:
+        with open(str(path), 'rb') as source:
+            for block in iter(lambda: source.read(65536), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return f'sha256:{digest.hexdigest()}'
+
+
+def tree_stat(path: Union[str, Path]) -> Optional[List[int]]:
+    """Return a stat fingerprint of an installed package tree.
+
+    Packages installed in place are fingerprinted using their archive.
+    """
+    try:
+        tree = os.stat(str(path))
+        if os.path.isfile(str(path)):
+            return [tree.st_mtime_ns, tree.st_size, tree.st_ino]
+        meta = os.stat(os.path.join(str(path), 'package.json'))
+    except OSError:
+        return None
+    return [tree.st_mtime_ns, meta.st_size, meta.st_mtime_ns]
+
+
+class Lockfile:
+    """A json lockfile describing the installed packages."""
+
+    def __init__(self, path: Union[str, Path], frozen: bool = False) -> None:
+        """Load the lockfile if it exists."""
+        self._path = Path(str(path))
+        self._frozen = frozen
+        self._entries: Dict[str, Dict] = {}
+        if self._path.exists():
+            with open(self._path) as lockfile:
+                data = json.load(lockfile)
+            if data.get('version') != LOCKFILE_VERSION:
+                message = 'unsupported lockfile version'
+                raise ValueError(message)
+            self._entries = data['packages']
+        elif frozen:
+            message = 'lockfile not found'
+            raise FileNotFoundError(message)
+
+    def __getitem__(self, name: str) -> Any:
+        """Return the lockfile entry of a package."""
+        return self._entries[name]
+
+    def __len__(self) -> int:
+        """Return the number of locked packages."""
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator:
+        """Return the names of the locked packages."""
+        return iter(self._entries)
+
+    def __contains__(self, name: object) -> bool:
+        """Check if a package is locked."""
+        return name in self._entries
+
+    @property
+    def path(self) -> Path:
+        """Return the location of the lockfile."""
+        return self._path
+
+    @property
+    def frozen(self) -> bool:
+        """Return true if packages must match the lockfile."""
+        return self._frozen
+
+    def packages(self) -> Dict:
+        """Return the locked packages in the same form as an index."""
+        return self._entries
+
+    def record(self, package: PackageHandler) -> Dict:
+        """Add or update the entry of an installed package."""
+        if not package.installed:
+            message = 'only installed packages can be locked'
+            raise ValueError(message)
+        sources = package.sources
+        digest = file_digest(package.artifact)
+        if digest is None and not os.path.isdir(str(package.artifact)):
+            # never carry a digest over, the artifact may have changed
+            log.warning(f'Unable to compute the digest of {package.name}')
+        entry = {
+            'name': package.name,
+            'version': package.version,
+            'src': sources if len(sources) > 1 else sources[0],
+            'digest': digest,
+            'path': package.path,
+        }
+        return self.add(entry)
+
+    def add(self, entry: Dict) -> Dict:
+        """Add an entry for a tree installed at the entry path."""
+        path = os.path.abspath(str(entry['path']))
+        entry = {**entry, 'path': path, 'stat': tree_stat(path)}
+        self._entries[entry['name']] = entry
+        return entry
+
+    def matches(self, name: str, version: Optional[str] = None) -> bool:
+        """Check an installed tree against the lockfile using stat."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return False
+        if version is not None and version != entry['version']:
+            return False
+        return entry['stat'] is not None and (
+            tree_stat(entry['path']) == entry['stat']
+        )
+
+    def install(
+        self,
+        package: PackageHandler,
+        path: Optional[Union[str, Path]] = None
+    ) -> bool:
+        """Install a package, adopting the locked tree if it matches.
+
+        Frozen lockfiles ignore the version requested by the package
+        and raise if the installed tree no longer matches.
+        """
+        name = package.name
+        version = None if self._frozen else getattr(package, 'version', None)
+        if self.matches(name, version):
+            package.adopt(self._entries[name]['path'])
+            log.debug(f'Adopted {name} from lockfile')
+            return True
+        if self._frozen:
+            message = f'{name} does not match the lockfile'
+            raise ValueError(message)
+        path = path or self._entries.get(name, {}).get('path')
+        if path is None:
+            message = f'no install path provided for {name}'
+            raise ValueError(message)
+        package.install(path)
+        self.record(package)
+        return True
+
+    def save(self) -> None:
+        """Atomically write the lockfile to disk."""
+        data = {'version': LOCKFILE_VERSION, 'packages': self._entries}
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        handle, tmp = tempfile.mkstemp(
+            prefix=f'.{self._path.name}.',
+            dir=str(self._path.parent)
+        )
+        with os.fdopen(handle, 'w') as lockfile:
+            json.dump(data, lockfile, indent=2, sort_keys=True)
+            lockfile.write('\n')
+        os.replace(tmp, self._path)
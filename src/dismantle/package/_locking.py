@@ -0,0 +1,201 @@
+"""Cross-process locking and staged installation helpers.
+
+Installing a package into a live directory is not atomic. Multiple
+processes installing the same package at once would each download the
+package and then race to extract it into the same directory. The
+helpers provided here serialise installs of a target using an advisory
+file lock and extract into a staging directory next to the target
+which is promoted into place using a rename.
+
+Lock files are kept in a shared directory within the system temporary
+directory rather than next to the target, so a failed install never
+leaves lock files or empty directories inside an install root.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path
+from secrets import token_hex
+from typing import Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
+
+Stamp = Optional[Tuple[int, int]]
+
+
+class FileLock:
+    """An advisory lock held on a file shared between processes."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        timeout: Optional[float] = None,
+        interval: float = 0.05
+    ) -> None:
+        """Create a lock using the given lock file path."""
+        self._path = Path(str(path))
+        self._timeout = timeout
+        self._interval = interval
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        """Return true if the lock is currently held by this object."""
+        return self._fd is not None
+
+    def acquire(self) -> None:
+        """Acquire the lock, waiting for other holders to release it."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o666)
+        start = time.monotonic()
+        while not self._try_lock(fd):
+            waited = time.monotonic() - start
+            if self._timeout is not None and waited >= self._timeout:
+                os.close(fd)
+                message = f'timeout waiting for lock {self._path}'
+                raise TimeoutError(message)
+            time.sleep(self._interval)
+        self._fd = fd
+
+    def release(self) -> None:
+        """Release the lock if it is held."""
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:  # pragma: no cover
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+    @staticmethod
+    def _try_lock(fd: int) -> bool:
+        """Attempt to take the lock without blocking."""
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:  # pragma: no cover
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def __enter__(self) -> 'FileLock':
+        """Acquire the lock when entering a context."""
+        self.acquire()
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Release the lock when leaving a context."""
+        self.release()
+
+
+def lock_path(target: Union[str, Path]) -> Path:
+    """Return the path of the lock file guarding an install target."""
+    key = sha256(os.path.abspath(str(target)).encode()).hexdigest()
+    return Path(tempfile.gettempdir(), 'dismantle-locks', f'{key}.lock')
+
+
+def stamp(target: Union[str, Path]) -> Stamp:
+    """Return an identifier for the tree currently installed at target.
+
+    A promoted staging directory replaces the target directory, so the
+    inode and modification time change whenever an install completes.
+    """
+    try:
+        stat = os.stat(str(target))
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+@contextmanager
+def staging(target: Union[str, Path]) -> Iterator[Path]:
+    """Provide a staging directory to be promoted over the target.
+
+    The staging directory is created next to the target so the final
+    rename never crosses a filesystem. If the block or the promotion
+    raises, the staging directory is removed and the target is left
+    untouched. Staging and retired directories left behind by an
+    interrupted install are removed first, so the lock guarding the
+    target must be held.
+    """
+    target = Path(str(target))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    sweep(target)
+    stage = _make_stage(target)
+    try:
+        yield stage
+        promote(stage, target)
+    except BaseException:
+        shutil.rmtree(stage, ignore_errors=True)
+        raise
+
+
+def sweep(target: Union[str, Path]) -> None:
+    """Remove staging and retired directories left next to a target."""
+    target = Path(str(target))
+    for suffix in ('staging', 'retired'):
+        for path in target.parent.glob(f'.{target.name}.*.{suffix}'):
+            log.info(f'Removing stale directory {path}')
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _make_stage(target: Path) -> Path:
+    """Create an empty staging directory next to the target.
+
+    The directory is created with the default mode of the process, so
+    the promoted tree gets the same permissions as a plain directory.
+    """
+    while True:
+        stage = target.parent / f'.{target.name}.{token_hex(4)}.staging'
+        try:
+            os.mkdir(stage, 0o777)
+        except FileExistsError:
+            continue
+        return stage
+
+
+def promote(stage: Union[str, Path], target: Union[str, Path]) -> None:
+    """Move a fully written staging directory into the target location.
+
+    An existing target is first renamed aside and then replaced by the
+    new tree, so readers never observe a partially written tree. The
+    two renames are not atomic as a pair: between them the target does
+    not exist, and a reader opening it in that window sees a missing
+    install rather than either tree. The retired tree is removed once
+    the new tree is live. If the new tree can not be moved into place
+    the existing target is restored.
+    """
+    stage = Path(str(stage))
+    target = Path(str(target))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    retired = None
+    if target.exists():
+        retired = Path(tempfile.mkdtemp(
+            prefix=f'.{target.name}.',
+            suffix='.retired',
+            dir=str(target.parent)
+        ))
+        os.rmdir(retired)
+        os.replace(target, retired)
+    try:
+        os.replace(stage, target)
+    except OSError:
+        if retired is not None:
+            os.replace(retired, target)
+        raise
+    log.info(f'Promoted staged install {stage} to {target}')
+    if retired is not None:
+        shutil.rmtree(retired, ignore_errors=True)
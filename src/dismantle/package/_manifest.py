@@ -0,0 +1,290 @@
+"""Track the files of an install directory in a manifest.
+
+Every update in place records the size and checksum (zip) or size and
+modification time (tar) of each extracted member in a manifest stored
+in the install directory. The next update compares the members of the
+new archive with the manifest, writes only the members that changed,
+and removes the members that are no longer part of the package.
+
+Installs also record the size, modification time, and sha256 hash of
+every installed file. Verification compares the stat data of each file
+with the manifest and only hashes the files whose stat data changed,
+so installed trees can be audited without reading every file.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+MANIFEST_NAME = '.dismantle-manifest.json'
+CHUNK_SIZE = 1 << 20
+
+Changes = Dict[str, List[str]]
+Report = Dict[str, List[str]]
+
+
+def read_manifest(dest: Union[str, Path]) -> Dict[str, Any]:
+    """Return the manifest of an install directory if it exists."""
+    try:
+        with open(Path(str(dest), MANIFEST_NAME)) as manifest:
+            data = json.load(manifest)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_manifest(dest: Union[str, Path], data: Dict[str, Any]) -> None:
+    """Atomically write the manifest of an install directory."""
+    dest = Path(str(dest))
+    dest.mkdir(parents=True, exist_ok=True)
+    handle, tmp = tempfile.mkstemp(prefix=f'{MANIFEST_NAME}.', dir=str(dest))
+    with os.fdopen(handle, 'w') as manifest:
+        json.dump(data, manifest, indent=2, sort_keys=True)
+        manifest.write('\n')
+    os.replace(tmp, dest / MANIFEST_NAME)
+
+
+class ManifestUpdate:
+    """Decide which archive members an update in place must write."""
+
+    def __init__(self, dest: Union[str, Path]) -> None:
+        """Load the manifest recorded by the previous update."""
+        self._dest = Path(str(dest))
+        self._manifest = read_manifest(self._dest)
+        self._previous: Dict[str, List[int]] = self._manifest.get(
+            'members',
+            {}
+        )
+        self._current: Dict[str, List[int]] = {}
+        self._written: List[str] = []
+
+    def changed(self, name: str, key: List[int], is_dir: bool) -> bool:
+        """Record a member, returning true if it must be written.
+
+        A member is unchanged when the manifest holds the same key and
+        the installed file still has the recorded size. Members that
+        would be written outside of the install directory are skipped.
+        A changed file is unlinked before it is written, so an install
+        seeded with hard links never writes through to the files it
+        shares with the previous install.
+        """
+        name = str(PurePosixPath(name))
+        if name == MANIFEST_NAME or not self._inside(name):
+            return False
+        self._current[name] = key
+        path = self._dest / name
+        if self._previous.get(name) == key:
+            if is_dir and path.is_dir():
+                return False
+            if path.is_file() and path.stat().st_size == key[0]:
+                return False
+        if not is_dir and (path.is_file() or path.is_symlink()):
+            path.unlink()
+        self._written.append(name)
+        return True
+
+    def finish(self) -> Changes:
+        """Remove deleted members and record the new manifest."""
+        # directories still holding current members are kept even when
+        # the archive no longer lists them
+        kept = set(self._current) | {
+            str(parent)
+            for name in self._current
+            for parent in PurePosixPath(name).parents
+        }
+        removed = sorted(
+            name for name in set(self._previous) - kept
+            if self._inside(name)
+        )
+        # children sort after their parents, so remove in reverse order
+        for name in reversed(removed):
+            path = self._dest / name
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists() or path.is_symlink():
+                path.unlink()
+        self._prune(removed, kept)
+        self._manifest['members'] = self._current
+        write_manifest(self._dest, self._manifest)
+        return {'written': self._written, 'removed': removed}
+
+    def _prune(self, removed: List[str], kept: Set[str]) -> None:
+        """Remove directories left empty by the removed members."""
+        folders = {
+            str(parent)
+            for name in removed
+            for parent in PurePosixPath(name).parents
+        } - kept
+        for folder in sorted(folders, reverse=True):
+            with suppress(OSError):
+                (self._dest / folder).rmdir()
+
+    @staticmethod
+    def _inside(name: str) -> bool:
+        """Check if a member name stays within the install directory."""
+        path = PurePosixPath(name)
+        return not path.is_absolute() and '..' not in path.parts
+
+
+def _hash(path: Path) -> Optional[str]:
+    """Return the sha256 digest of a file, or None if unreadable."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as source:
+            for chunk in iter(partial(source.read, CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _walk(dest: Path) -> List[str]:
+    """Return the posix paths of the files in an install directory.
+
+    Bytecode caches are skipped as python validates them itself.
+    """
+    names = []
+    for folder, dirs, files in os.walk(dest):
+        dirs[:] = [name for name in dirs if name != '__pycache__']
+        for name in files:
+            relative = Path(folder, name).relative_to(dest).as_posix()
+            if relative != MANIFEST_NAME:
+                names.append(relative)
+    return sorted(names)
+
+
+def record_files(
+    dest: Union[str, Path],
+    workers: Optional[int] = None,
+    check: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    """Record the size, mtime, and sha256 of every installed file.
+
+    Hashes of files whose stat data matches the previous manifest are
+    reused, other files are hashed using a pool of threads. With check
+    set, the files must match the sizes and hashes listed by the
+    previous manifest, such as the manifest shipped in a package.
+    """
+    dest = Path(str(dest))
+    manifest = read_manifest(dest)
+    previous = manifest.get('files', {})
+    files: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for name in _walk(dest):
+        stat = (dest / name).stat()
+        entry = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        known = previous.get(name, {})
+        unchanged = all(known.get(key) == entry[key] for key in entry)
+        if unchanged and known.get('sha256'):
+            entry['sha256'] = known['sha256']
+        else:
+            pending.append(name)
+        files[name] = entry
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = pool.map(_hash, [dest / name for name in pending])
+        for name, digest in zip(pending, digests):
+            files[name]['sha256'] = digest
+    if check:
+        _check_files(previous, files)
+    manifest['files'] = files
+    write_manifest(dest, manifest)
+    return files
+
+
+def _check_files(
+    expected: Dict[str, Dict[str, Any]],
+    files: Dict[str, Dict[str, Any]]
+) -> None:
+    """Ensure the recorded files match the files a manifest lists.
+
+    Bytecode caches are skipped as they are not recorded.
+    """
+    mismatched = sorted(
+        name for name, entry in expected.items()
+        if '__pycache__' not in PurePosixPath(name).parts and (
+            name not in files
+            or files[name]['size'] != entry.get('size')
+            or files[name]['sha256'] != entry.get('sha256')
+        )
+    )
+    if mismatched:
+        message = f'files do not match the manifest: {", ".join(mismatched)}'
+        raise ValueError(message)
+
+
+def _check_stats(
+    dest: Path,
+    report: Report,
+    deep: bool
+) -> List[Tuple[str, Path, str]]:
+    """Check the stat data of the recorded files of an install.
+
+    Returns the files which have to be hashed to be verified.
+    """
+    manifest = read_manifest(dest)
+    if 'files' not in manifest:
+        report['missing'].append(MANIFEST_NAME)
+        return []
+    suspicious = []
+    for name, entry in manifest['files'].items():
+        try:
+            stat = (dest / name).stat()
+        except OSError:
+            report['missing'].append(name)
+            continue
+        if stat.st_size != entry.get('size'):
+            report['modified'].append(name)
+        elif deep or stat.st_mtime_ns != entry.get('mtime'):
+            suspicious.append((name, dest / name, entry.get('sha256')))
+    return suspicious
+
+
+def verify_installs(
+    paths: Iterable[Union[str, Path]],
+    workers: Optional[int] = None,
+    deep: bool = False
+) -> Dict[str, Report]:
+    """Verify installed trees against their manifests.
+
+    Files whose size changed are reported as modified without being
+    read. Files whose modification time changed, or every file when
+    deep is set, are hashed using a pool of threads shared across all
+    the installs. Each report lists the missing and modified files.
+    """
+    reports: Dict[str, Report] = {}
+    suspicious = []
+    for path in paths:
+        report: Report = {'missing': [], 'modified': []}
+        reports[str(path)] = report
+        for name, file_path, digest in _check_stats(
+            Path(str(path)),
+            report,
+            deep
+        ):
+            suspicious.append((report, name, file_path, digest))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = pool.map(_hash, [item[2] for item in suspicious])
+        for (report, name, _, expected), digest in zip(suspicious, digests):
+            if digest is None:
+                report['missing'].append(name)
+            elif digest != expected:
+                report['modified'].append(name)
+    for report in reports.values():
+        report['missing'].sort()
+        report['modified'].sort()
+    return reports
+
+
+def verify_install(
+    path: Union[str, Path],
+    workers: Optional[int] = None,
+    deep: bool = False
+) -> Report:
+    """Verify an installed tree against its manifest."""
+    return verify_installs([path], workers, deep)[str(path)]
@@ -0,0 +1,99 @@
+"""Mirror health tracking and selection.
+
+A package can be made available from multiple mirrors. The statistics
+kept here record an exponentially weighted moving average (EWMA) of the
+latency and error rate of every host contacted during the lifetime of
+the process, which is used to send each request to the fastest healthy
+mirror first and to fail over to the next mirror when a request fails.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+
+class HostStats:
+    """Latency and error statistics for a single mirror host."""
+
+    def __init__(self, alpha: float, cooldown: float) -> None:
+        """Create an empty set of statistics."""
+        self._alpha = alpha
+        self._cooldown = cooldown
+        self.latency: Optional[float] = None
+        self.errors: float = 0.0
+        self.failed_at: float = 0.0
+
+    def record(self, elapsed: float, success: bool) -> None:
+        """Add the outcome of a request to the moving averages."""
+        alpha = self._alpha
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency = alpha * elapsed + (1 - alpha) * self.latency
+        self.errors = alpha * (not success) + (1 - alpha) * self.errors
+        if not success:
+            self.failed_at = time.monotonic()
+
+    @property
+    def healthy(self) -> bool:
+        """Check if the host has not been failing recently."""
+        recent = time.monotonic() - self.failed_at < self._cooldown
+        return not (recent and self.errors >= 0.5)
+
+    @property
+    def score(self) -> float:
+        """Return the expected cost of a request, lower is better."""
+        return (self.latency or 0.0) * (1 + 4 * self.errors)
+
+
+class MirrorStats:
+    """Process wide registry of mirror host statistics."""
+
+    def __init__(self, alpha: float = 0.3, cooldown: float = 30.0) -> None:
+        """Create the registry using the given smoothing parameters."""
+        self._alpha = alpha
+        self._cooldown = cooldown
+        self._hosts: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        """Return the key the statistics of a url are stored under."""
+        parts = urlparse(str(url))
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def get(self, url: str) -> HostStats:
+        """Return the statistics for the host serving a url."""
+        key = self.host(url)
+        with self._lock:
+            if key not in self._hosts:
+                self._hosts[key] = HostStats(self._alpha, self._cooldown)
+            return self._hosts[key]
+
+    def record(self, url: str, elapsed: float, success: bool) -> None:
+        """Record the outcome of a request made to a url."""
+        stats = self.get(url)
+        with self._lock:
+            stats.record(elapsed, success)
+
+    def rank(self, urls: Sequence[str]) -> List[str]:
+        """Order urls from the most to the least preferred mirror.
+
+        Healthy mirrors are ordered by their score, unhealthy mirrors
+        are kept as a last resort. Mirrors that have not been contacted
+        yet score zero so every mirror is tried at least once, and ties
+        keep the order the mirrors were provided in.
+        """
+        def key(item):
+            position, url = item
+            stats = self.get(url)
+            return (not stats.healthy, stats.score, position)
+        return [url for _, url in sorted(enumerate(urls), key=key)]
+
+    def reset(self) -> None:
+        """Forget all of the recorded statistics."""
+        with self._lock:
+            self._hosts.clear()
+
+
+stats = MirrorStats()
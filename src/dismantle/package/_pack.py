@@ -0,0 +1,280 @@
+"""Build package archives from a package directory.
+
+Packages are written in a fixed order: the package.json file first,
+followed by python code, then every other asset, and finally an install
+manifest listing the size and sha256 hash of every packed file. Readers
+that only need the metadata or the code of a package can stop reading
+early. The manifest uses the format of the manifests recorded in
+install trees, so installers check the extracted files against it.
+Files are streamed into the archive and hashed as they are written.
+Caches and version control files are never packed, and python modules
+can optionally be shipped with bytecode compiled by the running
+interpreter.
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import py_compile
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, List, Tuple, Union
+
+from dismantle.package._formats import BgzfPackageFormat
+from dismantle.package._manifest import CHUNK_SIZE, MANIFEST_NAME
+
+log = logging.getLogger(__name__)
+
+PACKAGE_FILE = 'package.json'
+CODE_SUFFIXES = ('.py', '.pyi', '.pyc')
+EXCLUDED = ('__pycache__', '.git')
+
+Entry = Tuple[str, Path, float]
+Add = Callable[[str, BinaryIO, int, float], None]
+Writer = Callable[[Path, List[Entry], int], None]
+
+
+class _HashingFile:
+    """Read a file while hashing the data read from it."""
+
+    def __init__(self, source: BinaryIO) -> None:
+        """Wrap an open binary file."""
+        self._source = source
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Read and hash data from the file."""
+        data = self._source.read(size)
+        self._digest.update(data)
+        self._size += len(data)
+        return data
+
+    def entry(self) -> Dict[str, Any]:
+        """Return the manifest entry of the data read so far."""
+        return {'sha256': self._digest.hexdigest(), 'size': self._size}
+
+
+def _check_package(src: Path) -> Dict:
+    """Load and validate the package.json file of a directory."""
+    try:
+        with open(src / PACKAGE_FILE) as package:
+            meta = json.load(package)
+    except FileNotFoundError:
+        message = 'package.json not found in package directory'
+        raise FileNotFoundError(message)
+    except ValueError:
+        message = 'invalid package file format'
+        raise ValueError(message)
+    if not isinstance(meta, dict):
+        message = 'invalid package file format'
+        raise ValueError(message)
+    for key in ('name', 'version'):
+        if not isinstance(meta.get(key), str) or not meta[key]:
+            message = f'meta file missing {key} value'
+            raise ValueError(message)
+    return meta
+
+
+def _files(src: Path, dest: Path) -> List[str]:
+    """Return the posix paths of the files to pack."""
+    names = []
+    for folder, dirs, files in os.walk(src):
+        dirs[:] = sorted(name for name in dirs if name not in EXCLUDED)
+        for name in files:
+            path = Path(folder, name)
+            relative = path.relative_to(src).as_posix()
+            if relative == MANIFEST_NAME:
+                message = f'{MANIFEST_NAME} is reserved for the manifest'
+                raise ValueError(message)
+            if relative == PACKAGE_FILE or path == dest:
+                continue
+            if not _stale_bytecode(path):
+                names.append(relative)
+    return names
+
+
+def _stale_bytecode(path: Path) -> bool:
+    """Check if a file is bytecode shipped beside its module source.
+
+    Sourceless modules, holding only bytecode, are packed as code.
+    """
+    module = path.name.split('.')[0]
+    return path.suffix == '.pyc' and path.with_name(f'{module}.py').exists()
+
+
+def _is_asset(name: str) -> bool:
+    """Check if a file is an asset rather than python code."""
+    return PurePosixPath(name).suffix not in CODE_SUFFIXES
+
+
+def _entry(src: Path, name: str) -> Entry:
+    """Return the name, path and modification time of a file."""
+    path = src / name
+    return (name, path, path.stat().st_mtime)
+
+
+def _bytecode(src: Path, name: str, tmp: Path) -> Entry:
+    """Compile a module to bytecode validated by a source hash."""
+    cached = PurePosixPath(importlib.util.cache_from_source(name))
+    cfile = tmp / cached
+    try:
+        py_compile.compile(
+            str(src / name),
+            cfile=str(cfile),
+            dfile=name,
+            doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH
+        )
+    except py_compile.PyCompileError:
+        message = f'unable to compile {name}'
+        raise ValueError(message)
+    return (cached.as_posix(), cfile, (src / name).stat().st_mtime)
+
+
+def _entries(src: Path, dest: Path, bytecode: bool, tmp: Path) -> List[Entry]:
+    """Return the name and path of each packed file, in pack order.
+
+    Bytecode is compiled into the temporary directory.
+    """
+    files = []
+    for name in _files(src, dest):
+        files.append(_entry(src, name))
+        if bytecode and name.endswith('.py'):
+            files.append(_bytecode(src, name, tmp))
+    files.sort(key=lambda entry: (_is_asset(entry[0]), entry[0]))
+    return [_entry(src, PACKAGE_FILE)] + files
+
+
+def _add_members(entries: List[Entry], add: Add) -> None:
+    """Stream every file into an archive, followed by the manifest."""
+    files = {}
+    for name, path, mtime in entries:
+        with open(path, 'rb') as source:
+            reader = _HashingFile(source)
+            add(name, reader, os.fstat(source.fileno()).st_size, mtime)
+        files[name] = reader.entry()
+    data = json.dumps({'files': files}, indent=2, sort_keys=True).encode()
+    add(MANIFEST_NAME, io.BytesIO(data), len(data), entries[0][2])
+
+
+def _add_zip(
+    archive: zipfile.ZipFile,
+    level: int,
+    name: str,
+    source: BinaryIO,
+    size: int,
+    mtime: float
+) -> None:
+    """Stream a member into a zip file."""
+    date_time = max(time.localtime(mtime)[:6], (1980, 1, 1, 0, 0, 0))
+    info = zipfile.ZipInfo(name, date_time=date_time)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    # the size selects zip64 records for large members up front
+    info.file_size = size
+    # members opened for writing ignore the level of the archive
+    info._compresslevel = level
+    with archive.open(info, 'w') as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+
+def _write_zip(dest: Path, entries: List[Entry], level: int) -> None:
+    """Write the members into a zip file."""
+    with zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED) as archive:
+        _add_members(entries, partial(_add_zip, archive, level))
+
+
+def _add_tar(
+    archive: tarfile.TarFile,
+    name: str,
+    source: BinaryIO,
+    size: int,
+    mtime: float
+) -> None:
+    """Stream a member into a tar file."""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    archive.addfile(info, source)
+
+
+def _write_tar(
+    dest: Path,
+    entries: List[Entry],
+    level: int = 9,
+    mode: str = 'w'
+) -> None:
+    """Write the members into a tar file."""
+    options = {'compresslevel': level} if mode == 'w:gz' else {}
+    with tarfile.open(dest, mode, **options) as archive:
+        _add_members(entries, partial(_add_tar, archive))
+
+
+def _write_bgzf(dest: Path, entries: List[Entry], level: int) -> None:
+    """Write the members into an indexed tar.bgz file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tar_path = Path(tmp, 'package.tar')
+        _write_tar(tar_path, entries)
+        BgzfPackageFormat.compress(tar_path, dest)
+
+
+def _writer(dest: Path) -> Writer:
+    """Return the writer for the archive format of the dest suffix."""
+    suffixes = ''.join(dest.suffixes[-2:])
+    if dest.suffix == '.zip':
+        return _write_zip
+    if dest.suffix == '.tar':
+        return partial(_write_tar, mode='w')
+    if dest.suffix == '.tgz' or suffixes == '.tar.gz':
+        return partial(_write_tar, mode='w:gz')
+    if suffixes == '.tar.bgz':
+        return _write_bgzf
+    message = 'packages can only be packed as zip, tar, tgz or bgz files'
+    raise ValueError(message)
+
+
+def pack(
+    src: Union[str, Path],
+    dest: Union[str, Path],
+    bytecode: bool = False,
+    level: int = 9
+) -> Path:
+    """Build a package archive from a package directory.
+
+    The archive format is chosen from the suffix of dest. With bytecode
+    enabled every module is also compiled into its __pycache__ folder,
+    validated against the hash of the module source.
+    """
+    src = Path(str(src)[7:] if str(src)[:7] == 'file://' else str(src))
+    src = src.absolute()
+    dest = Path(str(dest)).absolute()
+    if not src.is_dir():
+        message = 'packages can only be packed from a directory'
+        raise FileNotFoundError(message)
+    write = _writer(dest)
+    meta = _check_package(src)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    handle, tmp = tempfile.mkstemp(
+        prefix=f'.{dest.name}.',
+        dir=str(dest.parent)
+    )
+    os.close(handle)
+    try:
+        with tempfile.TemporaryDirectory() as compiled:
+            entries = _entries(src, dest, bytecode, Path(compiled))
+            write(Path(tmp), entries, level)
+        os.replace(tmp, dest)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    log.info(f'Packed {meta["name"]} {meta["version"]} into {dest}')
+    return dest
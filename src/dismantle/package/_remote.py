@@ -0,0 +1,174 @@
+"""Inspect remote zip packages without downloading them.
+
+A zip archive keeps a central directory at the end of the file listing
+every member together with its size and offset. Reading the central
+directory and individual members using HTTP range requests allows the
+metadata, file list, and sizes of a remote package to be read for a
+few kilobytes instead of downloading and extracting the full archive.
+"""
+import io
+import json
+import logging
+import re
+import zipfile
+from json.decoder import JSONDecodeError
+from typing import Dict, List, Optional, Tuple
+
+from dismantle.transport import request
+
+log = logging.getLogger(__name__)
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+
+class RangeFile(io.RawIOBase):
+    """A seekable read only file backed by http range requests.
+
+    Fetched spans are cached, and every request reads at least a block
+    so the many small reads made while parsing an archive are served
+    from memory. Servers that ignore the range header and return the
+    full content are supported by caching the whole body.
+    """
+
+    def __init__(self, url: str, block_size: int = 16384) -> None:
+        """Open the url and read the final block of the file."""
+        super().__init__()
+        self._url = url
+        self._block_size = block_size
+        self._spans: List[Tuple[int, bytes]] = []
+        self._pos = 0
+        self._size = 0
+        self.received = 0
+        self._fetch(f'-{block_size}')
+
+    @property
+    def url(self) -> str:
+        """Return the url the file is read from."""
+        return self._url
+
+    @property
+    def size(self) -> int:
+        """Return the total size of the remote file."""
+        return self._size
+
+    def _fetch(self, byte_range: str) -> None:
+        """Request a byte range and add it to the cached spans."""
+        headers = {'Range': f'bytes={byte_range}'}
+        req = request('GET', self._url, headers=headers)
+        if req.status_code == 416 and not self._spans:
+            # the file is smaller than the suffix range requested
+            req = request('GET', self._url)
+        if req.status_code == 206:
+            match = CONTENT_RANGE.match(req.headers.get('Content-Range', ''))
+            if match is None:
+                message = 'invalid content range returned'
+                raise ValueError(message)
+            start = int(match.group(1))
+            self._size = int(match.group(3))
+        elif req.status_code == 200:
+            log.warning(f'Range requests not supported by {self._url}')
+            start = 0
+            self._size = len(req.content)
+        else:
+            raise FileNotFoundError(req.status_code)
+        self.received += len(req.content)
+        self._spans.append((start, req.content))
+
+    def _cached(self, start: int, end: int) -> Optional[bytes]:
+        """Return the bytes between start and end if already cached."""
+        for offset, data in self._spans:
+            if offset <= start and end <= offset + len(data):
+                return data[start - offset:end - offset]
+        return None
+
+    def readable(self) -> bool:
+        """Return true as the file can be read."""
+        return True
+
+    def seekable(self) -> bool:
+        """Return true as the file supports random access."""
+        return True
+
+    def tell(self) -> int:
+        """Return the current position within the file."""
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move the current position within the file."""
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            message = 'negative seek position'
+            raise OSError(message)
+        self._pos = offset
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        """Read bytes from the current position into a buffer."""
+        end = min(self._pos + len(buffer), self._size)
+        if end <= self._pos:
+            return 0
+        data = self._cached(self._pos, end)
+        if data is None:
+            last = min(max(end, self._pos + self._block_size), self._size)
+            self._fetch(f'{self._pos}-{last - 1}')
+            data = self._cached(self._pos, end) or b''
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class RemoteArchive:
+    """Read the members of a remote zip package on demand."""
+
+    def __init__(self, remote: RangeFile) -> None:
+        """Read the central directory of the remote archive."""
+        self._remote = remote
+        try:
+            self._zip = zipfile.ZipFile(io.BufferedReader(remote))
+        except zipfile.BadZipFile:
+            message = 'invalid zip file'
+            raise ValueError(message)
+
+    @property
+    def received(self) -> int:
+        """Return the number of bytes downloaded so far."""
+        return self._remote.received
+
+    @property
+    def files(self) -> Dict[str, int]:
+        """Return the uncompressed size of every file in the archive."""
+        return {
+            info.filename: info.file_size
+            for info in self._zip.infolist() if not info.is_dir()
+        }
+
+    @property
+    def meta(self) -> Dict:
+        """Return the contents of the package.json file."""
+        try:
+            return json.loads(self.read('package.json'))
+        except KeyError:
+            message = 'package.json not found in archive'
+            raise FileNotFoundError(message)
+        except JSONDecodeError:
+            message = 'invalid package file format'
+            raise ValueError(message)
+
+    def read(self, name: str) -> bytes:
+        """Download and return the contents of a single member."""
+        return self._zip.read(name)
+
+    def close(self) -> None:
+        """Close the archive."""
+        self._zip.close()
+
+    def __enter__(self) -> 'RemoteArchive':
+        """Return the archive when entering a context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close the archive when leaving a context."""
+        self.close()
@@ -0,0 +1,69 @@
+"""Detect the format of a package from the first bytes of the archive.
+
+Sources without a file suffix, such as `/download?id=42`, can not be
+matched to a package format by name. The format of those packages is
+detected once they have been received using the magic bytes found at
+the start of the archive. Detection results are cached per archive
+digest so an unchanged archive is only sniffed once per process.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from dismantle.package._formats import (
+    PackageFormat,
+    TarPackageFormat,
+    Tbz2PackageFormat,
+    TgzPackageFormat,
+    TxzPackageFormat,
+    TzstPackageFormat,
+    ZipPackageFormat
+)
+
+HEADER_SIZE = 512
+
+MAGIC: List[Tuple[int, bytes, Type[PackageFormat]]] = [
+    (0, b'PK\x03\x04', ZipPackageFormat),
+    (0, b'PK\x05\x06', ZipPackageFormat),
+    (0, b'\x1f\x8b', TgzPackageFormat),
+    (0, b'\xfd7zXZ\x00', TxzPackageFormat),
+    (0, b'BZh', Tbz2PackageFormat),
+    (0, b'\x28\xb5\x2f\xfd', TzstPackageFormat),
+    (257, b'ustar', TarPackageFormat),
+]
+
+SUFFIXES: Dict[Type[PackageFormat], str] = {
+    ZipPackageFormat: '.zip',
+    TgzPackageFormat: '.tgz',
+    TxzPackageFormat: '.txz',
+    Tbz2PackageFormat: '.tbz2',
+    TzstPackageFormat: '.tzst',
+    TarPackageFormat: '.tar',
+}
+
+_detected: Dict[str, Optional[Type[PackageFormat]]] = {}
+
+
+def sniff(header: bytes) -> Optional[Type[PackageFormat]]:
+    """Return the package format matching the header of an archive."""
+    for offset, magic, package_format in MAGIC:
+        if header[offset:offset + len(magic)] == magic:
+            return package_format
+    return None
+
+
+def detect_format(
+    path: Union[str, Path],
+    digest: Optional[str] = None
+) -> Optional[Type[PackageFormat]]:
+    """Return the package format of an archive file.
+
+    Only the header of the archive is read. When the digest of the
+    archive is provided the result is cached under the digest.
+    """
+    if digest is not None and digest in _detected:
+        return _detected[digest]
+    with open(str(path), 'rb') as archive:
+        detected = sniff(archive.read(HEADER_SIZE))
+    if digest is not None:
+        _detected[digest] = detected
+    return detected
@@ -0,0 +1,71 @@
+"""Read a download as a file while hashing and caching it.
+
+Streaming installs hand the body of a response straight to a package
+format as it is received. The reader wraps the chunks of the body as a
+readable file, hashing every chunk and copying it to the cache on the
+way through, so the package is downloaded, cached, and extracted in a
+single pass.
+"""
+import io
+from hashlib import md5
+from typing import BinaryIO, Iterable, Optional
+
+
+class HashingReader(io.RawIOBase):
+    """A readable file over chunks that hashes and tees each chunk."""
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        sink: Optional[BinaryIO] = None
+    ) -> None:
+        """Wrap the chunks, copying each one to the sink if provided."""
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._sink = sink
+        self._buffer = b''
+        self._hash = md5()  # noqa: S324
+        self.received = 0
+
+    def readable(self) -> bool:
+        """Return true as the reader can be read from."""
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Fill the buffer with the next bytes of the body."""
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = self._consume(chunk)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def peek(self, size: int) -> bytes:
+        """Return up to size bytes of the body without consuming it."""
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += self._consume(chunk)
+        return self._buffer[:size]
+
+    def drain(self) -> None:
+        """Hash and tee the rest of the body without returning it."""
+        self._buffer = b''
+        for chunk in self._chunks:
+            self._consume(chunk)
+
+    def hexdigest(self) -> str:
+        """Return the md5 digest of the chunks received so far."""
+        return self._hash.hexdigest()
+
+    def _consume(self, chunk: bytes) -> bytes:
+        """Hash a chunk and copy it to the sink."""
+        self._hash.update(chunk)
+        self.received += len(chunk)
+        if self._sink is not None:
+            self._sink.write(chunk)
+        return chunk
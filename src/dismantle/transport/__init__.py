@@ -0,0 +1,30 @@
+"""Provides the http transport shared by indexes and packages."""
+from dismantle.transport._http import (
+    HttpPolicy,
+    RetryBudget,
+    configure,
+    get_policy,
+    hedge,
+    request
+)
+from dismantle.transport._scheduler import (
+    DownloadScheduler,
+    Priority,
+    TokenBucket,
+    configure_scheduler,
+    get_scheduler
+)
+
+__all__ = [
+    'DownloadScheduler',
+    'HttpPolicy',
+    'Priority',
+    'RetryBudget',
+    'TokenBucket',
+    'configure',
+    'configure_scheduler',
+    'get_policy',
+    'get_scheduler',
+    'hedge',
+    'request'
+]
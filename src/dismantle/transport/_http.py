@@ -0,0 +1,196 @@
+"""Timeouts, retries, and hedging for http requests.
+
+Every http request made by dismantle is sent through the request
+function provided here. Requests are sent with connect and read
+timeouts so a hung server can not block indefinitely, and transient
+failures are retried using exponential backoff with full jitter. The
+retries are limited by a process wide retry budget so an outage does
+not multiply the load placed on the servers involved.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+import requests
+
+log = logging.getLogger(__name__)
+
+Result = TypeVar('Result')
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class RetryBudget:
+    """Limit retries to a fraction of the requests sent.
+
+    Every request adds ratio tokens to the budget and every retry
+    spends a whole token, so at most ratio retries are made per request
+    once the initial reserve of tokens has been spent.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0) -> None:
+        """Create a budget with a reserve of tokens."""
+        self._ratio = ratio
+        self._reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """Return the number of retries currently available."""
+        return self._tokens
+
+    def deposit(self) -> None:
+        """Add tokens to the budget for a new request."""
+        with self._lock:
+            self._tokens = min(self._tokens + self._ratio, self._reserve)
+
+    def withdraw(self) -> bool:
+        """Spend a token on a retry if one is available."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class HttpPolicy:
+    """Timeouts and retry behaviour applied to http requests."""
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.1,
+        backoff_max: float = 10.0,
+        budget: Optional[RetryBudget] = None,
+        hedge: Optional[float] = None
+    ) -> None:
+        """Create a policy.
+
+        Hedge is the delay in seconds before a duplicate of a small
+        request is sent, or None to disable hedging.
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.budget = budget if budget is not None else RetryBudget()
+        self.hedge = hedge
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """Return the connect and read timeouts used by requests."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def delay(self, attempt: int, minimum: float = 0.0) -> float:
+        """Return a jittered backoff delay for a retry attempt."""
+        ceiling = min(self.backoff_max, self.backoff * 2 ** attempt)
+        jitter = random.uniform(0, ceiling)  # noqa: S311
+        return min(max(jitter, minimum), self.backoff_max)
+
+    def retry(self, attempt: int) -> bool:
+        """Check if another attempt may be made."""
+        return attempt < self.retries and self.budget.withdraw()
+
+
+_policy = HttpPolicy()
+
+
+def get_policy() -> HttpPolicy:
+    """Return the policy applied to requests by default."""
+    return _policy
+
+
+def configure(**kwargs) -> HttpPolicy:
+    """Replace the default policy with one using the given settings."""
+    global _policy
+    _policy = HttpPolicy(**kwargs)
+    return _policy
+
+
+def _retry_after(req: requests.Response) -> float:
+    """Return the delay a server asked for before retrying."""
+    try:
+        return float(req.headers.get('Retry-After', 0))
+    except ValueError:
+        return 0.0
+
+
+def request(
+    method: str,
+    url: str,
+    session: Optional[requests.Session] = None,
+    policy: Optional[HttpPolicy] = None,
+    **kwargs
+) -> requests.Response:
+    """Send a request, retrying transient failures.
+
+    Connection errors, timeouts, and retryable status codes are retried
+    while the policy allows it. The final response is returned as is,
+    leaving the status code to be checked by the caller.
+    """
+    policy = policy or _policy
+    kwargs.setdefault('timeout', policy.timeout)
+    kwargs.setdefault('allow_redirects', True)
+    send = session.request if session is not None else requests.request
+    policy.budget.deposit()
+    attempt = 0
+    while True:
+        wait = 0.0
+        try:
+            req = send(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not policy.retry(attempt):
+                raise
+            log.debug(f'Retrying {method} {url} ({e})')
+        else:
+            if req.status_code not in RETRY_STATUS:
+                return req
+            if not policy.retry(attempt):
+                return req
+            wait = _retry_after(req)
+            # release the connection to the pool before waiting
+            req.close()
+            log.debug(f'Retrying {method} {url} ({req.status_code})')
+        time.sleep(policy.delay(attempt, wait))
+        attempt += 1
+
+
+def hedge(
+    call: Callable[[str], Result],
+    urls: Sequence[str],
+    delay: float
+) -> Result:
+    """Call the first url and hedge with the next if it is too slow.
+
+    The next url is requested whenever no response has been received
+    within delay seconds, or as soon as an outstanding request fails.
+    The first successful result is returned, and the last error is
+    raised if every url fails. Passing the same url more than once
+    hedges a request against a single server.
+    """
+    pending: List[Future] = []
+    remaining = list(urls)
+    error: Optional[BaseException] = None
+    executor = ThreadPoolExecutor(max_workers=max(len(remaining), 1))
+    try:
+        while remaining or pending:
+            if remaining:
+                pending.append(executor.submit(call, remaining.pop(0)))
+            timeout = delay if remaining else None
+            done, _ = wait_futures(pending, timeout, FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+    finally:
+        executor.shutdown(wait=False)
+    raise error or ValueError('no urls provided')
@@ -0,0 +1,235 @@
+"""Coordinate downloads made by every index and package.
+
+Rather than every install hitting the network independently, requests
+are submitted to a process wide scheduler. The scheduler runs the most
+urgent request first, limits the number of requests in flight to each
+host, and throttles the bytes read from response bodies so concurrent
+downloads share a bandwidth cap instead of saturating the uplink.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+log = logging.getLogger(__name__)
+
+Job = Tuple[int, int, str, Callable, Future]
+
+
+class Priority(IntEnum):
+    """Scheduling classes, lower values are run first."""
+
+    INDEX = 0
+    CRITICAL = 1
+    NORMAL = 2
+    BACKGROUND = 3
+
+
+class TokenBucket:
+    """Limit a flow of bytes to a rate with an allowed burst."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        """Create a full bucket refilled at rate bytes per second."""
+        self._rate = rate
+        self._burst = burst if burst is not None else rate
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        """Take tokens from the bucket, sleeping while in debt."""
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self._updated) * self._rate
+            self._tokens = min(self._burst, self._tokens + refill)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class DownloadScheduler:
+    """Run requests by priority within host and bandwidth limits."""
+
+    def __init__(
+        self,
+        workers: int = 8,
+        per_host: int = 4,
+        bandwidth: Optional[float] = None,
+        window: float = 10.0
+    ) -> None:
+        """Create a scheduler.
+
+        Bandwidth is the combined cap in bytes per second of response
+        bodies read through the scheduler, or None for no cap.
+        Throughput is measured over the last window seconds.
+        """
+        self._workers = max(workers, 1)
+        self._per_host = max(per_host, 1)
+        self._bucket = TokenBucket(bandwidth) if bandwidth else None
+        self._window = window
+        self._queue: List[Job] = []
+        self._order = itertools.count()
+        self._active: Dict[str, int] = {}
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._bytes = 0
+        self._recent: Deque[Tuple[float, int]] = deque()
+
+    @staticmethod
+    def host(url: str) -> str:
+        """Return the host a url is limited by."""
+        parts = urlparse(str(url))
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def submit(
+        self,
+        url: str,
+        call: Callable,
+        priority: int = Priority.NORMAL
+    ) -> Future:
+        """Queue a call making a request to url.
+
+        The call is run without arguments once a slot for the host of
+        the url is available and no more urgent call is waiting.
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                message = 'the download scheduler has been shut down'
+                raise ValueError(message)
+            job = (int(priority), next(self._order), self.host(url))
+            heapq.heappush(self._queue, (*job, call, future))
+            if not self._idle and len(self._threads) < self._workers:
+                self._start_worker()
+            self._condition.notify()
+        return future
+
+    def _start_worker(self) -> None:
+        """Start another worker thread."""
+        thread = threading.Thread(
+            target=self._work,
+            name=f'dismantle-download-{len(self._threads)}',
+            daemon=True
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _take(self) -> Optional[Job]:
+        """Remove the most urgent job whose host has a free slot."""
+        for job in sorted(self._queue):
+            if self._active.get(job[2], 0) < self._per_host:
+                self._queue.remove(job)
+                heapq.heapify(self._queue)
+                self._active[job[2]] = self._active.get(job[2], 0) + 1
+                return job
+        return None
+
+    def _wait(self) -> Optional[Job]:
+        """Block until a job can be run or the scheduler is closed."""
+        with self._condition:
+            job = self._take()
+            while job is None and not self._closed:
+                self._idle += 1
+                self._condition.wait()
+                self._idle -= 1
+                job = self._take()
+            return job
+
+    def _work(self) -> None:
+        """Run jobs until the scheduler is shut down."""
+        job = self._wait()
+        while job is not None:
+            _, _, host, call, future = job
+            try:
+                if future.set_running_or_notify_cancel():
+                    self._run(call, future)
+            finally:
+                with self._condition:
+                    self._active[host] -= 1
+                    self._condition.notify_all()
+            job = self._wait()
+
+    @staticmethod
+    def _run(call: Callable, future: Future) -> None:
+        """Run a call and store the outcome in its future."""
+        try:
+            future.set_result(call())
+        except Exception as e:
+            future.set_exception(e)
+
+    def stream(
+        self,
+        req: requests.Response,
+        chunk_size: int = 65536
+    ) -> Iterator[bytes]:
+        """Read a streamed response body within the bandwidth cap."""
+        for chunk in req.iter_content(chunk_size):
+            self._record(len(chunk))
+            if self._bucket is not None:
+                self._bucket.consume(len(chunk))
+            yield chunk
+
+    def _record(self, size: int) -> None:
+        """Add bytes read to the throughput statistics."""
+        now = time.monotonic()
+        with self._condition:
+            self._bytes += size
+            self._recent.append((now, size))
+            while self._recent and now - self._recent[0][0] > self._window:
+                self._recent.popleft()
+
+    def stats(self) -> Dict[str, float]:
+        """Return the queue depth, requests in flight, and throughput.
+
+        Throughput is the bytes per second read over the window.
+        """
+        with self._condition:
+            now = time.monotonic()
+            recent = sum(
+                size for when, size in self._recent
+                if now - when <= self._window
+            )
+            return {
+                'queued': len(self._queue),
+                'in_flight': sum(self._active.values()),
+                'bytes': self._bytes,
+                'throughput': recent / self._window,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting calls once the queued calls have run."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+_scheduler = DownloadScheduler()
+
+
+def get_scheduler() -> DownloadScheduler:
+    """Return the scheduler shared by every download."""
+    return _scheduler
+
+
+def configure_scheduler(**kwargs) -> DownloadScheduler:
+    """Replace the shared scheduler with one using the given limits."""
+    global _scheduler
+    previous = _scheduler
+    _scheduler = DownloadScheduler(**kwargs)
+    previous.shutdown(wait=False)
+    return _scheduler
@@ -1,9 +1,28 @@
 """Configure PyTest."""
+import io
 import shutil
+import tarfile
+import zipfile
 from pathlib import Path
+from typing import Callable, Dict, Optional, Union
 
 import pytest
 
+Files = Dict[str, Optional[Union[str, bytes]]]
+
+PACKAGE: Files = {
+    'package.json': '{}',
+    'extensions/one.py': 'one = 1\n',
+}
+
+MODES = {
+    '.tar': 'w',
+    '.tgz': 'w:gz',
+    '.tar.gz': 'w:gz',
+    '.tar.xz': 'w:xz',
+    '.tar.bz2': 'w:bz2',
+}
+
 
 @pytest.fixture()
 def datadir(tmpdir: Path, request):
@@ -27,3 +46,70 @@ def datadir(tmpdir: Path, request):
 def httpserver_listen_address():
     """Use port 9090 for testing."""
     return ('127.0.0.1', 9090)
+
+
+@pytest.fixture()
+def build(tmp_path: Path) -> Callable[..., Path]:
+    """Provide a factory writing a package into the temporary directory.
+
+    The files map member names to their contents, or None for a
+    directory. A name ending in .zip, or in a tar suffix, or a tarfile
+    mode writes an archive holding the members in order. Any other
+    name is written as a directory tree, by default the temporary
+    directory itself.
+    """
+    def factory(
+        files: Optional[Files] = None,
+        name: str = '.',
+        mode: Optional[str] = None
+    ) -> Path:
+        path = tmp_path / name
+        members = {
+            member: data.encode() if isinstance(data, str) else data
+            for member, data in (PACKAGE if files is None else files).items()
+        }
+        suffix = ''.join(path.suffixes)
+        if suffix == '.zip' and mode is None:
+            _build_zip(path, members)
+        elif mode is not None or suffix in MODES:
+            _build_tar(path, members, mode or MODES[suffix])
+        else:
+            _build_tree(path, members)
+        return path
+    return factory
+
+
+def _build_tree(path: Path, members: Dict[str, Optional[bytes]]) -> None:
+    for member, data in members.items():
+        target = path / member
+        if data is None:
+            target.mkdir(parents=True, exist_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+
+
+def _build_zip(path: Path, members: Dict[str, Optional[bytes]]) -> None:
+    with zipfile.ZipFile(path, 'w') as archive:
+        for member, data in members.items():
+            if data is None:
+                archive.writestr(f'{member}/', b'')
+            else:
+                archive.writestr(member, data)
+
+
+def _build_tar(
+    path: Path,
+    members: Dict[str, Optional[bytes]],
+    mode: str
+) -> None:
+    with tarfile.open(path, mode) as archive:
+        for member, data in members.items():
+            info = tarfile.TarInfo(member)
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                archive.addfile(info)
+            else:
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
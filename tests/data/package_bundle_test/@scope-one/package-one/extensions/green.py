@@ -0,0 +1 @@
+GREEN = True
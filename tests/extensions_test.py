@@ -1,10 +1,16 @@
 """Test loading extensions."""
+import py_compile
 import sys
+import zipfile
 from pathlib import Path
+from typing import List
 
-from dismantle.extension import Extensions
+import pytest
+from pytest_httpserver import HTTPServer
+
+from dismantle.extension import Extensions, LazyExtension
 from dismantle.index import JsonFileIndexHandler
-from dismantle.package import LocalPackageHandler
+from dismantle.package import HttpPackageHandler, LocalPackageHandler
 
 
 def test_success(datadir: Path) -> None:
@@ -104,3 +110,405 @@ def test_prefix_generation(datadir: Path) -> None:
         '@scope-one/package-one.extension.another',
         '@scope-one/package-one.extension.lot.of.dot.you'
     ].sort() == list(xpac._imports.keys()).sort()
+
+
+def test_in_place_archive(httpserver: HTTPServer, datadir: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+    from tests.GreetingExtension import GreetingExtension
+
+    name = '@scope-one/package-one'
+    archive = Path(datadir / 'package-one.zip')
+    source = Path(datadir / name)
+    with zipfile.ZipFile(archive, 'w') as zip_ref:
+        for path in sorted(source.rglob('*')):
+            zip_ref.write(path, path.relative_to(source).as_posix())
+    httpserver.expect_request('/package.zip').respond_with_data(
+        archive.read_bytes()
+    )
+    src = httpserver.url_for('/package.zip')
+    package = HttpPackageHandler(name, src, in_place=True)
+    package.install(datadir / 'installed.zip')
+    ext_types = [ColorExtension, GreetingExtension]
+    extensions = Extensions(ext_types, {name: package}, 'd_')
+    assert list(extensions.category('color').keys()) == [
+        '@scope-one/package-one.extension.green.GreenColorExtension'
+    ]
+    module = extensions.imports['@scope-one/package-one.extension.green']
+    assert module.__file__.startswith(str(datadir / 'installed.zip'))
+
+
+def _local_packages(datadir: Path) -> dict:
+    index = JsonFileIndexHandler(str(datadir / 'index.json'))
+    packages = {}
+    for pkg_meta in index:
+        meta = index[pkg_meta]
+        package = LocalPackageHandler(meta['name'], datadir / meta['path'])
+        package._meta = {**package._meta, **meta}
+        package.install()
+        packages[package.name] = package
+    return packages
+
+
+def test_discovery_cache(
+    datadir: Path,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from dismantle.extension import extensions as module
+    from tests.ColorExtension import ColorExtension
+    from tests.GreetingExtension import GreetingExtension
+
+    ext_types = [ColorExtension, GreetingExtension]
+    cache = Path(datadir / 'cache' / 'extensions.json')
+    packages = _local_packages(datadir)
+    first = Extensions(ext_types, packages, 'd_', cache=cache)
+    assert cache.exists() is True
+    written = cache.stat().st_mtime_ns
+
+    def walk(*args, **kwargs):
+        raise AssertionError('cached packages must not be walked')
+    monkeypatch.setattr(module, 'walk_extensions', walk)
+    second = Extensions(ext_types, packages, 'd_', cache=cache)
+    assert list(second.category('color')) == list(first.category('color'))
+    assert list(second.imports) == list(first.imports)
+    assert cache.stat().st_mtime_ns == written
+
+
+def test_discovery_cache_invalidated(datadir: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    cache = Path(datadir / 'extensions.json')
+    packages = _local_packages(datadir)
+    Extensions([ColorExtension], packages, 'd_', cache=cache)
+    green = Path(
+        datadir / '@scope-one' / 'package-one' / 'extensions' / 'green.py'
+    )
+    green.write_text(green.read_text().replace(
+        'GreenColorExtension',
+        'LimeColorExtension'
+    ))
+    extensions = Extensions([ColorExtension], packages, 'd_', cache=cache)
+    assert '@scope-one/package-one.extension.green.LimeColorExtension' in (
+        extensions.category('color')
+    )
+
+
+def test_discovery_cache_types(datadir: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+    from tests.GreetingExtension import GreetingExtension
+
+    cache = Path(datadir / 'extensions.json')
+    packages = _local_packages(datadir)
+    Extensions([ColorExtension], packages, 'd_', cache=cache)
+    extensions = Extensions(
+        [ColorExtension, GreetingExtension],
+        packages,
+        'd_',
+        cache=cache
+    )
+    assert len(extensions.category('greeting')) > 0
+
+
+def _lazy_package(path: Path) -> LocalPackageHandler:
+    (path / 'extensions').mkdir(parents=True)
+    (path / 'package.json').write_text(
+        '{"name": "@scope-lazy/package", "version": "0.0.1"}'
+    )
+    (path / 'extensions' / 'purple.py').write_text(
+        'import tests.ColorExtension as colors\n'
+        '\n'
+        '\n'
+        'class PurpleColorExtension(colors.ColorExtension):\n'
+        '    _name = "purple"\n'
+        '\n'
+        '\n'
+        'class DarkPurpleColorExtension(PurpleColorExtension):\n'
+        '    _name = "dark purple"\n'
+    )
+    (path / 'extensions' / 'broken.py').write_text(
+        'import missing_dependency\n'
+        'from tests.ColorExtension import ColorExtension\n'
+        '\n'
+        '\n'
+        'class BrokenColorExtension(ColorExtension):\n'
+        '    pass\n'
+    )
+    package = LocalPackageHandler('@scope-lazy/package', path)
+    package.install()
+    return package
+
+
+def test_lazy(tmp_path: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    package = _lazy_package(tmp_path / 'package')
+    extensions = Extensions(
+        [ColorExtension],
+        {package.name: package},
+        'd_',
+        lazy=True
+    )
+    color = extensions.category('color')
+    assert sorted(color) == [
+        '@scope-lazy/package.extension.broken.BrokenColorExtension',
+        '@scope-lazy/package.extension.purple.DarkPurpleColorExtension',
+        '@scope-lazy/package.extension.purple.PurpleColorExtension'
+    ]
+    assert extensions.imports == {}
+    proxy = color['@scope-lazy/package.extension.purple.PurpleColorExtension']
+    assert isinstance(proxy, LazyExtension) is True
+    assert proxy.loaded is False
+    assert proxy._name == 'purple'
+    assert proxy.loaded is True
+    assert list(extensions.imports) == ['@scope-lazy/package.extension.purple']
+    instance = proxy()
+    assert isinstance(instance, ColorExtension) is True
+    assert instance.name == 'purple'
+    broken = color['@scope-lazy/package.extension.broken.BrokenColorExtension']
+    with pytest.raises(ModuleNotFoundError):
+        broken()
+
+
+def test_lazy_cache(tmp_path: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    package = _lazy_package(tmp_path / 'package')
+    cache = tmp_path / 'extensions.json'
+    packages = {package.name: package}
+    Extensions([ColorExtension], packages, 'd_', cache=cache, lazy=True)
+    extensions = Extensions(
+        [ColorExtension],
+        packages,
+        'd_',
+        cache=cache,
+        lazy=True
+    )
+    assert len(extensions.category('color')) == 3
+    assert extensions.imports == {}
+
+
+def test_sourceless_cache_tag(tmp_path: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    path = tmp_path / 'package'
+    (path / 'extensions').mkdir(parents=True)
+    (path / 'package.json').write_text(
+        '{"name": "@scope-bin/package", "version": "0.0.1"}'
+    )
+    source = tmp_path / 'cyan.py'
+    source.write_text(
+        'from tests.ColorExtension import ColorExtension\n'
+        '\n'
+        '\n'
+        'class CyanColorExtension(ColorExtension):\n'
+        '    _name = "cyan"\n'
+    )
+    tag = sys.implementation.cache_tag
+    py_compile.compile(
+        str(source),
+        cfile=str(path / 'extensions' / f'cyan.{tag}.pyc'),
+        doraise=True
+    )
+    package = LocalPackageHandler('@scope-bin/package', path)
+    package.install()
+    extensions = Extensions([ColorExtension], {package.name: package}, 'd_')
+    assert list(extensions.category('color')) == [
+        '@scope-bin/package.extension.cyan.CyanColorExtension'
+    ]
+
+
+def test_register_defined_classes(tmp_path: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+    from tests.GreetingExtension import GreetingExtension
+
+    path = tmp_path / 'package'
+    (path / 'extensions').mkdir(parents=True)
+    (path / 'package.json').write_text(
+        '{"name": "@scope-mro/package", "version": "0.0.1"}'
+    )
+    (path / 'extensions' / 'mixed.py').write_text(
+        'from tests.ColorExtension import ColorExtension\n'
+        'from tests.GreetingExtension import GreetingExtension\n'
+        '\n'
+        'Imported = type(\n'
+        '    "Imported",\n'
+        '    (ColorExtension,),\n'
+        '    {"__module__": "elsewhere"}\n'
+        ')\n'
+        '\n'
+        '\n'
+        'class Base(ColorExtension):\n'
+        '    pass\n'
+        '\n'
+        '\n'
+        'class Both(Base, GreetingExtension):\n'
+        '    pass\n'
+    )
+    package = LocalPackageHandler('@scope-mro/package', path)
+    package.install()
+    extensions = Extensions(
+        [ColorExtension, GreetingExtension],
+        {package.name: package},
+        'd_'
+    )
+    prefix = '@scope-mro/package.extension.mixed'
+    assert list(extensions.category('color')) == [
+        f'{prefix}.Base',
+        f'{prefix}.Both'
+    ]
+    assert list(extensions.category('greeting')) == [f'{prefix}.Both']
+
+
+def test_activation(datadir: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    packages = _local_packages(datadir)
+    extensions = Extensions([ColorExtension], packages, 'd_')
+    green = '@scope-one/package-one.extension.green.GreenColorExtension'
+    blue = '@scope-one/package-three.extension.blue.BlueColorExtension'
+    assert extensions.is_active(blue) is False
+    extensions.activate(blue, green)
+    active = extensions.active('color')
+    assert list(active) == [blue, green]
+    assert active[blue] is extensions.instance(blue)
+    assert active[blue].active is True
+    extensions.deactivate(blue)
+    assert list(active) == [green]
+    assert extensions.is_active(blue) is False
+    assert extensions.instance(blue).active is False
+    extensions.activate(blue)
+    assert list(active) == [green, blue]
+    with pytest.raises(ValueError):
+        extensions.activate('@scope-one/missing.extension.Missing')
+
+
+def test_activate_category(datadir: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+    from tests.GreetingExtension import GreetingExtension
+
+    packages = _local_packages(datadir)
+    extensions = Extensions(
+        [ColorExtension, GreetingExtension],
+        packages,
+        'd_'
+    )
+    extensions.activate_category('color')
+    assert list(extensions.active('color')) == list(
+        extensions.category('color')
+    )
+    assert len(extensions.active('greeting')) == 0
+    extensions.deactivate_category('color')
+    assert len(extensions.active('color')) == 0
+
+
+def test_activate_lazy(tmp_path: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    package = _lazy_package(tmp_path / 'package')
+    extensions = Extensions(
+        [ColorExtension],
+        {package.name: package},
+        'd_',
+        lazy=True
+    )
+    name = '@scope-lazy/package.extension.purple.PurpleColorExtension'
+    extensions.activate(name)
+    assert list(extensions.imports) == ['@scope-lazy/package.extension.purple']
+    instance = extensions.active('color')[name]
+    assert isinstance(instance, ColorExtension) is True
+    assert instance is extensions.instance(name)
+
+
+def _color_module(path: Path, cls_name: str, name: str) -> None:
+    path.write_text(
+        'from tests.ColorExtension import ColorExtension\n'
+        '\n'
+        '\n'
+        f'class {cls_name}(ColorExtension):\n'
+        f'    _name = "{name}"\n'
+    )
+
+
+def test_refresh(tmp_path: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    path = tmp_path / 'package'
+    (path / 'extensions').mkdir(parents=True)
+    (path / 'package.json').write_text(
+        '{"name": "@scope-refresh/package", "version": "0.0.1"}'
+    )
+    _color_module(path / 'extensions' / 'gray.py', 'GrayColor', 'gray')
+    _color_module(path / 'extensions' / 'purple.py', 'PurpleColor', 'purple')
+    _color_module(path / 'extensions' / 'teal.py', 'TealColor', 'teal')
+    package = LocalPackageHandler('@scope-refresh/package', path)
+    package.install()
+    extensions = Extensions([ColorExtension], {package.name: package}, 'd_')
+    prefix = '@scope-refresh/package.extension'
+    color = extensions.category('color')
+    extensions.activate(*color)
+    purple = extensions.instance(f'{prefix}.purple.PurpleColor')
+    teal = extensions.instance(f'{prefix}.teal.TealColor')
+    assert extensions.refresh() == {'reloaded': [], 'removed': []}
+
+    _color_module(path / 'extensions' / 'purple.py', 'PurpleColor', 'lavender')
+    _color_module(path / 'extensions' / 'orange.py', 'OrangeColor', 'orange')
+    (path / 'extensions' / 'gray.py').unlink()
+    assert extensions.refresh() == {
+        'reloaded': [f'{prefix}.orange', f'{prefix}.purple'],
+        'removed': [f'{prefix}.gray']
+    }
+    assert extensions.category('color') is color
+    assert list(color) == [
+        f'{prefix}.purple.PurpleColor',
+        f'{prefix}.teal.TealColor',
+        f'{prefix}.orange.OrangeColor'
+    ]
+    assert f'{prefix}.gray' not in sys.modules
+    assert sys.modules[f'{prefix}.purple'] is extensions.imports[
+        f'{prefix}.purple'
+    ]
+    assert extensions.instance(f'{prefix}.teal.TealColor') is teal
+    reloaded = extensions.instance(f'{prefix}.purple.PurpleColor')
+    assert reloaded is not purple
+    assert reloaded.name == 'lavender'
+    assert purple.active is False
+    assert list(extensions.active('color')) == [
+        f'{prefix}.purple.PurpleColor',
+        f'{prefix}.teal.TealColor'
+    ]
+
+
+class _Recorder(dict):
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.removed: List[str] = []
+
+    def __delitem__(self, name: str) -> None:
+        self.removed.append(name)
+        super().__delitem__(name)
+
+    def clear(self) -> None:
+        self.removed.extend(self)
+        super().clear()
+
+
+def test_refresh_keeps_unchanged(tmp_path: Path) -> None:
+    from tests.ColorExtension import ColorExtension
+
+    path = tmp_path / 'package'
+    (path / 'extensions').mkdir(parents=True)
+    (path / 'package.json').write_text(
+        '{"name": "@scope-refresh/package", "version": "0.0.1"}'
+    )
+    _color_module(path / 'extensions' / 'gray.py', 'GrayColor', 'gray')
+    _color_module(path / 'extensions' / 'teal.py', 'TealColor', 'teal')
+    package = LocalPackageHandler('@scope-refresh/package', path)
+    package.install()
+    extensions = Extensions([ColorExtension], {package.name: package}, 'd_')
+    prefix = '@scope-refresh/package.extension'
+    color = _Recorder(extensions.category('color'))
+    extensions._extensions['color'] = color
+    (path / 'extensions' / 'gray.py').unlink()
+    _color_module(path / 'extensions' / 'teal.py', 'TealColor', 'cyan')
+    extensions.refresh()
+    assert color.removed == [f'{prefix}.gray.GrayColor']
+    assert list(color) == [f'{prefix}.teal.TealColor']
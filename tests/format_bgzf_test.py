@@ -0,0 +1,132 @@
+"""Test tar packages split into indexed gzip blocks."""
+import gzip
+import shutil
+import subprocess  # noqa: S404
+import tarfile
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from dismantle.package import BgzfPackageFormat, PackageFormat
+from dismantle.package._bgzf import read_index
+
+FILES = {
+    'assets': None,
+    'package.json': '{"version": "0.0.1"}',
+    'assets/one.txt': 'one' * 100,
+    'assets/two.txt': 'two' * 100,
+    'extensions/three.py': 'three = 3\n',
+}
+
+
+@pytest.fixture()
+def src(tmp_path: Path, build: Callable[..., Path]) -> Path:
+    path = tmp_path / 'package.tar.bgz'
+    BgzfPackageFormat.compress(build(FILES, 'package.tar'), path, 64)
+    return path
+
+
+def test_inherits() -> None:
+    assert issubclass(BgzfPackageFormat, PackageFormat) is True
+
+
+def test_grasps() -> None:
+    assert BgzfPackageFormat.grasps('package.tar.bgz') is True
+    assert BgzfPackageFormat.grasps('file://package.tar.bgz') is True
+    assert BgzfPackageFormat.grasps('package.tar.gz') is False
+
+
+def test_compress_blocks(src: Path) -> None:
+    with open(src, 'rb') as archive:
+        index = read_index(archive)
+    assert index is not None
+    assert len(index['blocks']) > 1
+    assert set(index['members']) == {
+        'assets',
+        'package.json',
+        'assets/one.txt',
+        'assets/two.txt',
+        'extensions/three.py'
+    }
+
+
+def test_readable_as_tgz(src: Path) -> None:
+    with gzip.open(src) as body:
+        assert body.read()[:512] == src.with_suffix('').read_bytes()[:512]
+    with tarfile.open(src, 'r:gz') as archive:
+        assert 'assets/two.txt' in archive.getnames()
+
+
+@pytest.mark.skipif(shutil.which('tar') is None, reason='tar unavailable')
+def test_readable_by_tar(tmp_path: Path, src: Path) -> None:
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    subprocess.run(  # noqa: S603, S607
+        ['tar', 'xzf', str(src), '-C', str(dest)],
+        check=True
+    )
+    assert (dest / 'assets' / 'one.txt').read_bytes() == b'one' * 100
+
+
+@pytest.mark.parametrize('workers', [1, 4, None])
+def test_extract(tmp_path: Path, src: Path, workers: int) -> None:
+    dest = tmp_path / 'dest'
+    BgzfPackageFormat.extract(src, dest, workers=workers)
+    assert (dest / 'package.json').read_bytes() == b'{"version": "0.0.1"}'
+    assert (dest / 'assets' / 'two.txt').read_bytes() == b'two' * 100
+    assert (dest / 'extensions' / 'three.py').read_text() == 'three = 3\n'
+
+
+def test_extract_include_exclude(tmp_path: Path, src: Path) -> None:
+    dest = tmp_path / 'dest'
+    include = ['package.json', 'assets']
+    BgzfPackageFormat.extract(src, dest, include=include, exclude=['*/two*'])
+    assert (dest / 'package.json').exists() is True
+    assert (dest / 'assets' / 'one.txt').exists() is True
+    assert (dest / 'assets' / 'two.txt').exists() is False
+    assert (dest / 'extensions').exists() is False
+
+
+def test_extract_without_index(
+    tmp_path: Path,
+    build: Callable[..., Path]
+) -> None:
+    src = build({'package.json': '{}'}, 'plain.tar.bgz', 'w:gz')
+    BgzfPackageFormat.extract(src, tmp_path / 'dest')
+    assert (tmp_path / 'dest' / 'package.json').read_text() == '{}'
+    assert BgzfPackageFormat.read(src, 'package.json') == b'{}'
+
+
+def test_extract_invalid(tmp_path: Path) -> None:
+    src = tmp_path / 'invalid.tar.bgz'
+    src.write_bytes(b'not a bgz file')
+    with pytest.raises(ValueError, match='invalid bgz file'):
+        BgzfPackageFormat.extract(src, tmp_path / 'dest')
+
+
+def test_extract_not_supported(tmp_path: Path) -> None:
+    message = 'formatter only supports tar.bgz files'
+    with pytest.raises(ValueError, match=message):
+        BgzfPackageFormat.extract(tmp_path / 'package.tgz', tmp_path)
+
+
+def test_read(src: Path) -> None:
+    assert BgzfPackageFormat.read(src, 'assets/one.txt') == b'one' * 100
+    with pytest.raises(FileNotFoundError):
+        BgzfPackageFormat.read(src, 'missing.txt')
+    with pytest.raises(ValueError, match='not a regular file'):
+        BgzfPackageFormat.read(src, 'assets')
+
+
+def test_extract_stream(tmp_path: Path, src: Path) -> None:
+    with open(src, 'rb') as stream:
+        BgzfPackageFormat.extract_stream(stream, tmp_path / 'dest')
+    assert (tmp_path / 'dest' / 'assets' / 'one.txt').exists() is True
+
+
+def test_update(tmp_path: Path, src: Path) -> None:
+    changes = BgzfPackageFormat.update(src, tmp_path / 'dest')
+    assert 'package.json' in changes['written']
+    changes = BgzfPackageFormat.update(src, tmp_path / 'dest')
+    assert changes['written'] == []
@@ -0,0 +1,112 @@
+"""Test tar packages compressed using pluggable codecs."""
+import io
+from pathlib import Path
+from typing import Callable, Type
+
+import pytest
+
+from dismantle.package import (
+    CompressedTarPackageFormat,
+    PackageFormat,
+    Tbz2PackageFormat,
+    TxzPackageFormat,
+    TzstPackageFormat,
+    available_codecs,
+    register_codec
+)
+from dismantle.package._codecs import _codecs
+
+FORMATS = [
+    (TxzPackageFormat, 'package.tar.xz', 'w:xz'),
+    (Tbz2PackageFormat, 'package.tar.bz2', 'w:bz2')
+]
+
+
+def test_inherits() -> None:
+    assert issubclass(CompressedTarPackageFormat, PackageFormat) is True
+    assert issubclass(TxzPackageFormat, CompressedTarPackageFormat) is True
+
+
+def test_available_codecs() -> None:
+    assert {'bz2', 'xz'} <= set(available_codecs())
+
+
+@pytest.mark.parametrize(('package_format', 'name', 'mode'), FORMATS)
+def test_extract(
+    tmp_path: Path,
+    build: Callable[..., Path],
+    package_format: Type[CompressedTarPackageFormat],
+    name: str,
+    mode: str
+) -> None:
+    src = build(name=name, mode=mode)
+    assert package_format.grasps(src) is True
+    assert package_format.grasps(f'file://{src}') is True
+    package_format.extract(src, tmp_path / 'dest')
+    assert (tmp_path / 'dest' / 'package.json').read_text() == '{}'
+
+
+@pytest.mark.parametrize(('package_format', 'name', 'mode'), FORMATS)
+def test_extract_stream(
+    tmp_path: Path,
+    build: Callable[..., Path],
+    package_format: Type[CompressedTarPackageFormat],
+    name: str,
+    mode: str
+) -> None:
+    src = build(name=name, mode=mode)
+    with open(src, 'rb') as stream:
+        package_format.extract_stream(stream, tmp_path / 'dest')
+    assert (tmp_path / 'dest' / 'package.json').exists() is True
+
+
+def test_grasp_not_supported() -> None:
+    assert TxzPackageFormat.grasps('package.tar.bz2') is False
+    assert Tbz2PackageFormat.grasps('package.tbz2') is True
+    assert TzstPackageFormat.grasps('package.tar.zst') is True
+
+
+def test_extract_not_supported(tmp_path: Path) -> None:
+    message = 'formatter only supports .tar.xz files'
+    with pytest.raises(ValueError, match=message):
+        TxzPackageFormat.extract(tmp_path / 'package.zip', tmp_path)
+
+
+def test_extract_invalid(tmp_path: Path) -> None:
+    src = tmp_path / 'package.tar.xz'
+    src.write_bytes(b'invalid')
+    with pytest.raises(ValueError, match='invalid xz file'):
+        TxzPackageFormat.extract(src, tmp_path / 'dest')
+
+
+def test_register_codec(
+    tmp_path: Path,
+    build: Callable[..., Path]
+) -> None:
+    class PlainPackageFormat(CompressedTarPackageFormat):
+        codec = 'plain'
+        suffixes = ('.tar.plain',)
+
+    src = build(name='package.tar.plain', mode='w')
+    with pytest.raises(ValueError, match='unsupported compression codec'):
+        PlainPackageFormat.extract_stream(io.BytesIO(), tmp_path)
+    register_codec('plain', lambda stream: stream)
+    try:
+        PlainPackageFormat.extract(src, tmp_path / 'dest')
+    finally:
+        del _codecs['plain']
+    assert (tmp_path / 'dest' / 'package.json').exists() is True
+
+
+def test_zstd(
+    tmp_path: Path,
+    build: Callable[..., Path]
+) -> None:
+    zstandard = pytest.importorskip('zstandard')
+    build(name='package.tar')
+    compressor = zstandard.ZstdCompressor()
+    data = compressor.compress((tmp_path / 'package.tar').read_bytes())
+    src = tmp_path / 'package.tar.zst'
+    src.write_bytes(data)
+    TzstPackageFormat.extract(src, tmp_path / 'dest')
+    assert (tmp_path / 'dest' / 'package.json').exists() is True
@@ -56,3 +56,13 @@ def test_extract_create(datadir: Path) -> None:
     DirectoryPackageFormat.extract(src, dest)
     assert os.path.exists(dest) is True
     assert os.path.exists(dest / 'package.json') is True
+
+
+def test_extract_include(datadir: Path) -> None:
+    src = Path(datadir / 'directory_src')
+    (src / 'assets').mkdir()
+    (src / 'assets' / 'large.bin').write_bytes(b'')
+    dest = datadir / 'directory_created'
+    DirectoryPackageFormat.extract(src, dest, include=['package.json'])
+    assert os.path.exists(dest / 'package.json') is True
+    assert os.path.exists(dest / 'assets' / 'large.bin') is False
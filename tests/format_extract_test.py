@@ -0,0 +1,58 @@
+"""Test the extract signature shared by every package format."""
+from pathlib import Path
+from typing import Callable, Type
+
+import pytest
+
+from dismantle.package import (
+    BgzfPackageFormat,
+    DirectoryPackageFormat,
+    PackageFormat,
+    TarPackageFormat,
+    Tbz2PackageFormat,
+    TgzPackageFormat,
+    TxzPackageFormat,
+    TzstPackageFormat,
+    ZipPackageFormat
+)
+
+FORMATS = [
+    (DirectoryPackageFormat, 'package'),
+    (ZipPackageFormat, 'package.zip'),
+    (TarPackageFormat, 'package.tar'),
+    (TgzPackageFormat, 'package.tgz'),
+    (BgzfPackageFormat, 'package.tar.bgz'),
+    (TxzPackageFormat, 'package.tar.xz'),
+    (Tbz2PackageFormat, 'package.tar.bz2'),
+    (TzstPackageFormat, 'package.tar.zst'),
+]
+
+
+@pytest.fixture()
+def src(tmp_path: Path, build: Callable[..., Path], name: str) -> Path:
+    path = tmp_path / name
+    if path.name.endswith('.tar.bgz'):
+        BgzfPackageFormat.compress(build(name='plain.tar'), path)
+    elif path.name.endswith('.tar.zst'):
+        zstandard = pytest.importorskip('zstandard')
+        data = build(name='plain.tar').read_bytes()
+        path.write_bytes(zstandard.ZstdCompressor().compress(data))
+    else:
+        build(name=name)
+    return path
+
+
+@pytest.mark.parametrize(('package_format', 'name'), FORMATS)
+def test_extract_positional_include(
+    tmp_path: Path,
+    src: Path,
+    package_format: Type[PackageFormat],
+    name: str
+) -> None:
+    dest = tmp_path / 'dest'
+    package_format.extract(src, dest, ['package.json'])
+    files = [
+        path.relative_to(dest).as_posix()
+        for path in dest.rglob('*') if path.is_file()
+    ]
+    assert files == ['package.json']
@@ -1,5 +1,7 @@
 """Test tar file formats."""
+import io
 import os
+import tarfile
 from pathlib import Path
 
 import pytest
@@ -67,3 +69,43 @@ def test_extract_create(datadir: Path) -> None:
     TarPackageFormat.extract(src, dest)
     assert os.path.exists(dest) is True
     assert os.path.exists(dest / 'package.json') is True
+
+
+def test_extract_exclude(datadir: Path) -> None:
+    src = datadir / 'package.tar'
+    dest = datadir / 'directory_created'
+    TarPackageFormat.extract(src, dest, exclude=['package.json'])
+    assert os.path.exists(dest / 'package.json') is False
+
+
+def _write_tar(path: Path, members: dict) -> None:
+    with tarfile.open(path, 'w') as archive:
+        for name, (data, mtime) in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = mtime
+            archive.addfile(info, io.BytesIO(data))
+
+
+def test_update_changed_members(datadir: Path) -> None:
+    src = Path(datadir / 'update.tar')
+    dest = Path(datadir / 'directory_update')
+    _write_tar(src, {
+        'package.json': (b'{}', 1),
+        'same.txt': (b'same', 1),
+        'touched.txt': (b'same', 1),
+        'removed.txt': (b'removed', 1),
+    })
+    changes = TarPackageFormat.update(src, dest)
+    assert len(changes['written']) == 4
+    _write_tar(src, {
+        'package.json': (b'{}', 1),
+        'same.txt': (b'same', 1),
+        'touched.txt': (b'same', 2),
+        'added.txt': (b'added', 2),
+    })
+    changes = TarPackageFormat.update(src, dest)
+    assert changes['written'] == ['touched.txt', 'added.txt']
+    assert changes['removed'] == ['removed.txt']
+    assert (dest / 'added.txt').read_bytes() == b'added'
+    assert (dest / 'removed.txt').exists() is False
@@ -1,5 +1,6 @@
 """Test packages using a zip file format."""
 import os
+import zipfile
 from pathlib import Path
 
 import pytest
@@ -67,3 +68,76 @@ def test_extract_create(datadir: Path) -> None:
     ZipPackageFormat.extract(src, dest)
     assert os.path.exists(dest) is True
     assert os.path.exists(dest / 'package.json') is True
+
+
+def test_extract_parallel(datadir: Path) -> None:
+    src = datadir / 'large.zip'
+    with zipfile.ZipFile(src, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('empty/', '')
+        for index in range(40):
+            archive.writestr(f'folder{index % 3}/file{index}.txt', 'a' * index)
+    dest = Path(datadir / 'directory_parallel')
+    ZipPackageFormat.extract(src, dest, workers=4)
+    assert (dest / 'empty').is_dir() is True
+    for index in range(40):
+        path = dest / f'folder{index % 3}' / f'file{index}.txt'
+        assert path.read_text() == 'a' * index
+
+
+def test_extract_parallel_default(
+    datadir: Path,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ZipPackageFormat, 'workers', 2)
+    src = datadir / 'package.zip'
+    dest = datadir / 'directory_created'
+    ZipPackageFormat.extract(src, dest)
+    assert os.path.exists(dest / 'package.json') is True
+
+
+def test_extract_include_exclude(datadir: Path) -> None:
+    src = datadir / 'selected.zip'
+    with zipfile.ZipFile(src, 'w') as archive:
+        archive.writestr('package.json', '{}')
+        archive.writestr('extensions/one.py', '')
+        archive.writestr('extensions/two.txt', '')
+        archive.writestr('assets/large.bin', '')
+    dest = Path(datadir / 'directory_selected')
+    include = ['package.json', 'extensions/']
+    ZipPackageFormat.extract(src, dest, include=include, exclude=['*.txt'])
+    assert (dest / 'package.json').exists() is True
+    assert (dest / 'extensions' / 'one.py').exists() is True
+    assert (dest / 'extensions' / 'two.txt').exists() is False
+    assert (dest / 'assets').exists() is False
+
+
+def test_update_changed_members(datadir: Path) -> None:
+    src = datadir / 'update.zip'
+    dest = Path(datadir / 'directory_update')
+    with zipfile.ZipFile(src, 'w') as archive:
+        archive.writestr('package.json', '{}')
+        archive.writestr('same.txt', 'same')
+        archive.writestr('changed.txt', 'old')
+        archive.writestr('removed/file.txt', 'removed')
+    changes = ZipPackageFormat.update(src, dest)
+    assert len(changes['written']) == 4
+    assert changes['removed'] == []
+    (dest / 'same.txt').write_text('kept')
+    with zipfile.ZipFile(src, 'w') as archive:
+        archive.writestr('package.json', '{}')
+        archive.writestr('same.txt', 'same')
+        archive.writestr('changed.txt', 'new!')
+        archive.writestr('added.txt', 'added')
+    changes = ZipPackageFormat.update(src, dest)
+    assert changes['written'] == ['changed.txt', 'added.txt']
+    assert changes['removed'] == ['removed/file.txt']
+    assert (dest / 'same.txt').read_text() == 'kept'
+    assert (dest / 'changed.txt').read_text() == 'new!'
+    assert (dest / 'removed').exists() is False
+
+
+def test_update_invalid(datadir: Path) -> None:
+    src = Path(datadir / 'invalid.zip')
+    src.write_bytes(b'not a zip')
+    with pytest.raises(ValueError, match='invalid zip file'):
+        ZipPackageFormat.update(src, datadir / 'directory_invalid')
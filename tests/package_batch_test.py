@@ -0,0 +1,107 @@
+"""Test checking many remote packages for updates."""
+import threading
+import time
+
+import pytest
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from dismantle.package import HttpPackageHandler, check_outdated
+from dismantle.package._mirrors import stats
+from dismantle.transport import HttpPolicy, _http
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    stats.reset()
+    yield
+    stats.reset()
+
+
+def test_check_outdated(httpserver: HTTPServer) -> None:
+    httpserver.expect_request('/one.zip').respond_with_data('', 200)
+    httpserver.expect_request('/two.zip').respond_with_data('', 304)
+    httpserver.expect_request('/three.zip').respond_with_data('', 404)
+    packages = [
+        HttpPackageHandler(f'@scope-one/package-{name}', httpserver.url_for(
+            f'/{name}.zip'
+        )) for name in ('one', 'two', 'three')
+    ]
+    assert check_outdated(packages, workers=3) == {
+        '@scope-one/package-one': True,
+        '@scope-one/package-two': False,
+        '@scope-one/package-three': None
+    }
+    assert all(r.method == 'HEAD' for r, _ in httpserver.log)
+
+
+def test_check_outdated_rate_limited(httpserver: HTTPServer) -> None:
+    headers = {'Retry-After': '0'}
+    httpserver.expect_ordered_request('/one.zip').respond_with_data(
+        '',
+        429,
+        headers
+    )
+    httpserver.expect_ordered_request('/one.zip').respond_with_data('', 304)
+    src = httpserver.url_for('/one.zip')
+    packages = [HttpPackageHandler('@scope-one/package-one', src)]
+    assert check_outdated(packages) == {'@scope-one/package-one': False}
+    httpserver.check_assertions()
+
+
+def test_check_outdated_timeout(
+    httpserver: HTTPServer,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    handled = threading.Event()
+
+    def slow(request: Request) -> Response:
+        time.sleep(0.5)
+        handled.set()
+        return Response('', 304)
+
+    monkeypatch.setattr(_http, '_policy', HttpPolicy(retries=0))
+    httpserver.expect_request('/slow.zip').respond_with_handler(slow)
+    src = httpserver.url_for('/slow.zip')
+    packages = [HttpPackageHandler('@scope-one/package-one', src)]
+    result = check_outdated(packages, timeout=0.1)
+    assert result == {'@scope-one/package-one': None}
+    # let the server finish before the next test uses it
+    assert handled.wait(5)
+
+
+def test_check_outdated_empty() -> None:
+    assert check_outdated([]) == {}
+
+
+def test_check_outdated_per_host(httpserver: HTTPServer) -> None:
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def slow(request: Request) -> Response:
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return Response('', 304)
+
+    httpserver.expect_request('/slow.zip').respond_with_handler(slow)
+    src = httpserver.url_for('/slow.zip')
+    packages = [
+        HttpPackageHandler(f'@scope-one/package-{index}', src)
+        for index in range(4)
+    ]
+    result = check_outdated(packages, workers=4, per_host=1)
+    assert list(result.values()) == [False] * 4
+    assert peak[0] == 1
+
+
+def test_check(httpserver: HTTPServer) -> None:
+    httpserver.expect_request('/one.zip').respond_with_data('', 200)
+    src = httpserver.url_for('/one.zip')
+    package = HttpPackageHandler('@scope-one/package-one', src)
+    assert package.check() is True
+    assert [r.method for r, _ in httpserver.log] == ['HEAD']
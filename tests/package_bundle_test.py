@@ -0,0 +1,122 @@
+"""Test exporting and importing offline package bundles."""
+import io
+import json
+import os
+import tarfile
+
+import pytest
+from py._path.local import LocalPath
+
+from dismantle.cli import main
+from dismantle.package import (
+    LocalPackageHandler,
+    Lockfile,
+    export_bundle,
+    import_bundle
+)
+
+NAMES = ['@scope-one/package-one', '@scope-one/package-two']
+
+
+def install(datadir: LocalPath) -> Lockfile:
+    lockfile = Lockfile(datadir.join('dismantle.lock'))
+    for name in NAMES:
+        package = LocalPackageHandler(name, datadir.join(name))
+        lockfile.install(package, datadir.join('installed', name))
+    lockfile.save()
+    return lockfile
+
+
+def test_export_bundle(datadir: LocalPath) -> None:
+    lockfile = install(datadir)
+    cache = datadir.join('installed', NAMES[0], 'extensions', '__pycache__')
+    cache.ensure('green.cpython-311.pyc')
+    bundle = export_bundle(lockfile, datadir.join('bundle.tar'))
+    with tarfile.open(bundle) as archive:
+        names = archive.getnames()
+    assert names[0] == 'dismantle.lock'
+    assert 'packages/@scope-one/package-one/package.json' in names
+    assert 'packages/@scope-one/package-one/extensions/green.py' in names
+    assert not any('__pycache__' in name for name in names)
+
+
+def test_import_bundle(datadir: LocalPath) -> None:
+    bundle = export_bundle(install(datadir), datadir.join('bundle.tar'))
+    root = datadir.join('image')
+    lockfile = import_bundle(bundle, root)
+    assert sorted(lockfile) == NAMES
+    assert os.path.exists(root / NAMES[0] / 'extensions' / 'green.py')
+    assert [p for p in os.listdir(root) if p.startswith('.')] == []
+    frozen = Lockfile(root / 'dismantle.lock', frozen=True)
+    for name in NAMES:
+        package = LocalPackageHandler(name, datadir.join(name))
+        assert frozen.install(package) is True
+        assert package.path == str(root / name)
+
+
+def test_import_invalid_bundle(datadir: LocalPath) -> None:
+    bundle = datadir.join('bundle.tar')
+    with tarfile.open(bundle, 'w') as archive:
+        archive.add(datadir.join(NAMES[0]), 'packages/@scope-one/package-one')
+    with pytest.raises(ValueError, match='lockfile not found'):
+        import_bundle(bundle, datadir.join('image'))
+
+
+def test_import_unsafe_bundle(datadir: LocalPath) -> None:
+    bundle = datadir.join('bundle.tar')
+    export_bundle(install(datadir), bundle)
+    with tarfile.open(bundle, 'a') as archive:
+        info = tarfile.TarInfo('packages/../../escaped.txt')
+        info.size = 4
+        archive.addfile(info, io.BytesIO(b'oops'))
+    with pytest.raises(ValueError, match='unsafe path in bundle'):
+        import_bundle(bundle, datadir.join('image'))
+    assert os.path.exists(datadir.join('escaped.txt')) is False
+    assert os.listdir(datadir.join('image')) == []
+
+
+def _hostile_bundle(bundle: LocalPath, name: str, path: str) -> None:
+    entries = {name: {'name': name, 'version': '0.0.1', 'path': path}}
+    data = json.dumps({'version': 1, 'packages': entries}).encode()
+    with tarfile.open(bundle, 'w') as archive:
+        info = tarfile.TarInfo('dismantle.lock')
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+        info = tarfile.TarInfo('packages/hostile/package.json')
+        info.size = 2
+        archive.addfile(info, io.BytesIO(b'{}'))
+
+
+@pytest.mark.parametrize('name, path', [
+    ('../victim', 'packages/hostile'),
+    ('/victim', 'packages/hostile'),
+    ('@scope/../../victim', 'packages/hostile'),
+    ('@scope/.', 'packages/hostile'),
+    ('one/two', 'packages/hostile'),
+    ('one\\..\\victim', 'packages/hostile'),
+    ('hostile', 'packages/../../victim'),
+    ('hostile', 'elsewhere/hostile'),
+])
+def test_import_hostile_lockfile(
+    datadir: LocalPath,
+    name: str,
+    path: str
+) -> None:
+    victim = datadir.join('victim')
+    victim.ensure('keep.txt')
+    bundle = datadir.join('bundle.tar')
+    _hostile_bundle(bundle, name, path)
+    with pytest.raises(ValueError, match='unsafe package'):
+        import_bundle(bundle, datadir.join('image'))
+    assert victim.join('keep.txt').exists() is True
+    assert os.listdir(datadir.join('image')) == []
+
+
+def test_cli_bundle(datadir: LocalPath) -> None:
+    install(datadir)
+    lock_src = str(datadir.join('dismantle.lock'))
+    bundle = str(datadir.join('bundle.tar'))
+    root = str(datadir.join('image'))
+    assert main(['bundle', 'export', lock_src, bundle]) == 0
+    assert main(['bundle', 'import', bundle, root]) == 0
+    assert os.path.exists(os.path.join(root, 'dismantle.lock')) is True
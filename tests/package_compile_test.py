@@ -0,0 +1,78 @@
+"""Test compiling installed packages to bytecode."""
+import importlib.util
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from dismantle.package import LocalPackageHandler, _compile
+from dismantle.package._compile import compile_tree
+
+FILES = {
+    'extensions/module.py': 'value = 1\n',
+    'plugins/module.py': 'value = 1\n',
+    'assets/module.py': 'value = 1\n',
+    'package.json': '{"name": "@scope-one/package-one", "version": "0.0.1"}',
+}
+
+
+def cached(path: Path) -> Path:
+    return Path(importlib.util.cache_from_source(str(path)))
+
+
+def test_compile_tree(tmp_path: Path, build: Callable[..., Path]) -> None:
+    build(FILES)
+    assert compile_tree(tmp_path) is True
+    for folder in ['extensions', 'plugins']:
+        pyc = cached(tmp_path / folder / 'module.py')
+        # flags of 0b11 mark a hash based pyc checked against the source
+        assert int.from_bytes(pyc.read_bytes()[4:8], 'little') == 0b11
+    assert cached(tmp_path / 'assets' / 'module.py').exists() is False
+
+
+def test_compile_tree_pool(
+    tmp_path: Path,
+    build: Callable[..., Path],
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(_compile, 'POOL_THRESHOLD', 0)
+    build(FILES)
+    assert compile_tree(tmp_path, workers=2) is True
+    assert cached(tmp_path / 'extensions' / 'module.py').exists() is True
+
+
+def test_compile_tree_invalid(
+    tmp_path: Path,
+    build: Callable[..., Path]
+) -> None:
+    build(FILES)
+    (tmp_path / 'extensions' / 'broken.py').write_text('def broken(:\n')
+    assert compile_tree(tmp_path) is False
+    assert cached(tmp_path / 'extensions' / 'module.py').exists() is True
+
+
+def test_local_install_compiles(
+    tmp_path: Path,
+    build: Callable[..., Path]
+) -> None:
+    src = build(FILES, 'src')
+    package = LocalPackageHandler('@scope-one/package-one', src)
+    package.install(str(tmp_path / 'installed'))
+    installed = tmp_path / 'installed' / 'extensions' / 'module.py'
+    assert cached(installed).exists() is True
+    assert cached(src / 'extensions' / 'module.py').exists() is False
+
+
+def test_local_install_without_bytecode(
+    tmp_path: Path,
+    build: Callable[..., Path]
+) -> None:
+    src = build(FILES, 'src')
+    package = LocalPackageHandler(
+        '@scope-one/package-one',
+        src,
+        bytecode=False
+    )
+    package.install(str(tmp_path / 'installed'))
+    installed = tmp_path / 'installed' / 'extensions' / 'module.py'
+    assert cached(installed).exists() is False
@@ -0,0 +1,106 @@
+"""Test creating package handlers from index entries."""
+import pytest
+from py._path.local import LocalPath
+
+from dismantle.index import JsonFileIndexHandler
+from dismantle.package import (
+    DirectoryPackageFormat,
+    HttpPackageHandler,
+    LocalPackageHandler,
+    PackageFactory,
+    TgzPackageFormat,
+    ZipPackageFormat
+)
+
+
+def test_key() -> None:
+    assert PackageFactory.key('http://a.com/p.tar.gz?x=1') == (
+        'http',
+        '.tar.gz'
+    )
+    assert PackageFactory.key('file:///srv/package.zip') == ('file', '.zip')
+    assert PackageFactory.key('/srv/package') == ('file', '')
+
+
+def test_create_all(datadir: LocalPath) -> None:
+    index = JsonFileIndexHandler(datadir.join('index.json'))
+    factory = PackageFactory(root=datadir)
+    packages = factory.create_all(index)
+    assert list(packages.keys()) == [
+        '@scope-one/package-one',
+        '@scope-one/package-two'
+    ]
+    for package in packages.values():
+        assert isinstance(package, LocalPackageHandler)
+        assert package._format is DirectoryPackageFormat
+        assert package.install() is True
+    assert factory._dispatch == {
+        ('file', ''): (LocalPackageHandler, DirectoryPackageFormat)
+    }
+
+
+def test_create_archive(datadir: LocalPath) -> None:
+    factory = PackageFactory(root=datadir)
+    entry = {'name': '@scope-one/package-one', 'src': 'package.zip'}
+    package = factory.create(entry)
+    assert isinstance(package, LocalPackageHandler)
+    assert package._format is ZipPackageFormat
+    assert package.install(datadir.join('installed')) is True
+    assert package.version == '0.0.1'
+
+
+def test_create_mirrors() -> None:
+    factory = PackageFactory()
+    entry = {
+        'name': '@scope-one/package-one',
+        'version': '0.0.1',
+        'mirrors': [
+            'http://localhost:9090/package.tgz',
+            'http://127.0.0.1:9090/package.tgz'
+        ]
+    }
+    package = factory.create(entry)
+    assert isinstance(package, HttpPackageHandler)
+    assert package._format is TgzPackageFormat
+    assert package._mirrors == entry['mirrors']
+    assert package.version == '0.0.1'
+
+
+def test_create_missing_source() -> None:
+    factory = PackageFactory()
+    with pytest.raises(ValueError, match='no source provided'):
+        factory.create({'name': '@scope-one/package-one'})
+
+
+def test_create_unsupported(datadir: LocalPath) -> None:
+    factory = PackageFactory(root=datadir)
+    entry = {'name': '@scope-one/package-one', 'src': 'package.rar'}
+    with pytest.raises(FileNotFoundError, match='unable to process source'):
+        factory.create(entry)
+
+
+def test_cached_selection_missing(datadir: LocalPath) -> None:
+    factory = PackageFactory(root=datadir)
+    existing = {
+        'name': '@scope-one/package-one',
+        'path': '@scope-one/package-one'
+    }
+    missing = {
+        'name': '@scope-one/package-five',
+        'path': '@scope-one/package-five'
+    }
+    assert factory.create(existing)._format is DirectoryPackageFormat
+    with pytest.raises(FileNotFoundError, match='unable to process source'):
+        factory.create(missing)
+
+
+def test_create_suffixless() -> None:
+    factory = PackageFactory()
+    entry = {
+        'name': '@scope-one/package-one',
+        'src': 'http://localhost:9090/download?id=42'
+    }
+    package = factory.create(entry)
+    assert isinstance(package, HttpPackageHandler)
+    assert package._format is None
+    assert factory._dispatch == {('http', ''): (HttpPackageHandler, None)}
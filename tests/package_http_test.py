@@ -1,5 +1,6 @@
 """Test fetching a package from a remote server."""
 import os
+from pathlib import Path
 
 import pytest
 from py._path.local import LocalPath
@@ -13,8 +14,10 @@
     PackageHandler,
     TarPackageFormat,
     TgzPackageFormat,
-    ZipPackageFormat
+    ZipPackageFormat,
+    _handlers
 )
+from dismantle.package._manifest import read_manifest, write_manifest
 
 
 def test_inherits() -> None:
@@ -196,6 +199,72 @@ def test_verification_none(
     assert package.verify() is True
 
 
+def test_verification_installed(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.zip')
+    dest = datadir.join('package-verified')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    package = HttpPackageHandler(name, src)
+    package.install(dest)
+    assert 'package.json' in read_manifest(dest)['files']
+    assert package.verify() is True
+    os.unlink(dest.join('package.json'))
+    assert package.verify() is False
+
+
+def test_install_compiles_stage(
+    httpserver: HTTPServer,
+    datadir: LocalPath,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.zip')
+    dest = datadir.join('package-compiled')
+    compiled = []
+
+    def compile_tree(path: Path) -> bool:
+        compiled.append((Path(path), os.path.exists(dest)))
+        return True
+
+    monkeypatch.setattr(_handlers, 'compile_tree', compile_tree)
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    HttpPackageHandler(name, src).install(dest)
+    [(path, promoted)] = compiled
+    assert path.name.endswith('.staging') is True
+    assert promoted is False
+
+
+def test_install_records_stage(
+    httpserver: HTTPServer,
+    datadir: LocalPath,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.zip')
+    dest = datadir.join('package-recorded')
+    recorded = []
+
+    def record_files(path: Path, check: bool) -> dict:
+        recorded.append((Path(path), os.path.exists(dest)))
+        return {}
+
+    monkeypatch.setattr(_handlers, 'record_files', record_files)
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    HttpPackageHandler(name, src).install(dest)
+    [(path, promoted)] = recorded
+    assert path.name.endswith('.staging') is True
+    assert promoted is False
+
+
 def test_verification_value(
     httpserver: HTTPServer,
     datadir: LocalPath
@@ -374,3 +443,174 @@ def test_call_http_if_pkg_has_no_metadata(
     )
 
     assert http_pkg.install(f'{datadir}/@scope-one/package-one') is True
+
+
+def test_install_in_place(httpserver: HTTPServer, datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.zip')
+    dest = datadir.join('package-in-place.zip')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    package = HttpPackageHandler(name, src, in_place=True)
+    assert package.install(dest) is True
+    assert os.path.isfile(dest) is True
+    assert package.version == '0.0.1'
+    assert package.install(dest) is True
+    assert len(httpserver.log) == 1
+    package.uninstall()
+    assert os.path.exists(dest) is False
+
+
+def test_install_in_place_not_zip(httpserver: HTTPServer) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.tgz')
+    message = 'in place installs only support zip packages'
+    with pytest.raises(ValueError, match=message):
+        HttpPackageHandler(name, src, [TgzPackageFormat], in_place=True)
+
+
+def test_install_streaming(httpserver: HTTPServer, datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.tgz')
+    dest = datadir.join('package-streamed')
+    with open(datadir.join('package.tgz'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.tgz').respond_with_data(data)
+    package = HttpPackageHandler(
+        name,
+        src,
+        [TgzPackageFormat],
+        streaming=True
+    )
+    assert package.install(dest, '0.0.1') is True
+    assert os.path.exists(dest.join('package.json')) is True
+    assert package._updated is True
+    with open(package._cache, 'rb') as cached_package:
+        assert cached_package.read() == data
+
+
+def test_install_streaming_not_tar(httpserver: HTTPServer) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.zip')
+    message = 'streaming installs only support tar packages'
+    with pytest.raises(ValueError, match=message):
+        HttpPackageHandler(name, src, streaming=True)
+
+
+def test_install_incremental(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.zip')
+    dest = datadir.join('package-incremental')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    package = HttpPackageHandler(name, src, incremental=True)
+    assert package.install(dest) is True
+    manifest = read_manifest(dest)
+    assert 'package.json' in manifest['members']
+    manifest['members']['stale.txt'] = [5, 0]
+    write_manifest(dest, manifest)
+    dest.join('stale.txt').write('stale')
+    os.unlink(dest.join('package.json'))
+    package = HttpPackageHandler(name, src, incremental=True)
+    tree = os.stat(dest).st_ino
+    assert package.install(dest) is True
+    assert package.version == '0.0.1'
+    assert os.path.exists(dest.join('stale.txt')) is False
+    assert os.stat(dest).st_ino != tree
+    assert 'stale.txt' not in read_manifest(dest)['files']
+    assert package.verify() is True
+
+
+def test_install_incremental_links(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.zip')
+    dest = datadir.join('package-incremental')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    package = HttpPackageHandler(name, src, incremental=True)
+    assert package.install(dest) is True
+    manifest = read_manifest(dest)
+    manifest['members']['package.json'] = [0, 0]
+    write_manifest(dest, manifest)
+    dest.join('extra.txt').write('extra')
+    held = datadir.join('held.json')
+    os.link(dest.join('package.json'), held)
+    held.write('held')
+    extra = os.stat(dest.join('extra.txt')).st_ino
+    package = HttpPackageHandler(name, src, incremental=True)
+    assert package.install(dest) is True
+    assert held.read() == 'held'
+    assert dest.join('package.json').read() != 'held'
+    assert os.stat(dest.join('extra.txt')).st_ino == extra
+    assert package.verify() is True
+
+
+def test_install_incremental_streaming(httpserver: HTTPServer) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/package.tgz')
+    message = 'install modes can not be combined'
+    with pytest.raises(ValueError, match=message):
+        HttpPackageHandler(
+            name,
+            src,
+            [TgzPackageFormat],
+            streaming=True,
+            incremental=True
+        )
+
+
+def test_install_suffixless(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    src = f'{httpserver.url_for("/download")}?id=42'
+    dest = datadir.join('package-detected')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/download').respond_with_data(data)
+    package = HttpPackageHandler(name, src)
+    assert package._format is None
+    assert package.install(dest, '0.0.1') is True
+    assert package._format is ZipPackageFormat
+    assert package._cache.suffix == '.zip'
+    assert os.path.exists(dest.join('package.json')) is True
+
+
+def test_install_suffixless_streaming(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/download')
+    dest = datadir.join('package-detected')
+    with open(datadir.join('package.tgz'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/download').respond_with_data(data)
+    formats = [ZipPackageFormat, TgzPackageFormat]
+    package = HttpPackageHandler(name, src, formats, streaming=True)
+    assert package.install(dest, '0.0.1') is True
+    assert package._format is TgzPackageFormat
+    assert package._streamed is True
+    assert os.path.exists(dest.join('package.json')) is True
+
+
+def test_install_suffixless_unknown(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    src = httpserver.url_for('/download')
+    httpserver.expect_request('/download').respond_with_data('not a package')
+    package = HttpPackageHandler(name, src, [ZipPackageFormat])
+    with pytest.raises(ValueError, match='unable to detect the package'):
+        package.install(datadir.join('package-detected'))
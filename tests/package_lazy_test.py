@@ -0,0 +1,105 @@
+"""Test extracting package archive members on first access."""
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from dismantle.package import LazyArchive
+from dismantle.package._formats import selected
+
+MEMBERS = [
+    ('package.json', b'{"name": "package"}'),
+    ('extensions/one.py', b'one = 1'),
+    ('assets/large.bin', b'x' * 1024)
+]
+
+
+def _write_tar(src: Path, mode: str) -> None:
+    with tarfile.open(src, mode) as archive:
+        for name in ['assets', 'extensions']:
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            archive.addfile(info)
+        for name, data in MEMBERS:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+@pytest.fixture(params=['package.zip', 'package.tar', 'package.tgz'])
+def package(tmp_path: Path, request: pytest.FixtureRequest) -> Path:
+    src = tmp_path / request.param
+    if src.suffix == '.zip':
+        with zipfile.ZipFile(src, 'w') as archive:
+            for name, data in MEMBERS:
+                archive.writestr(name, data)
+    else:
+        _write_tar(src, 'w:gz' if src.suffix == '.tgz' else 'w')
+    return src
+
+
+def test_selected() -> None:
+    assert selected('extensions/one.py', ['extensions']) is True
+    assert selected('extensions/one.py', ['extensions/*.py']) is True
+    assert selected('assets/large.bin', ['extensions']) is False
+    assert selected('assets/large.bin', None, ['assets/']) is False
+    assert selected('package.json') is True
+
+
+def test_include_extracts_up_front(package: Path, tmp_path: Path) -> None:
+    dest = tmp_path / 'dest'
+    include = ['package.json', 'extensions']
+    with LazyArchive(package, dest, include) as archive:
+        assert 'extensions/one.py' in archive.extracted
+        assert 'package.json' in archive.extracted
+        assert (dest / 'extensions' / 'one.py').exists() is True
+        assert (dest / 'assets').exists() is False
+
+
+def test_extract_on_access(package: Path, tmp_path: Path) -> None:
+    dest = tmp_path / 'dest'
+    with LazyArchive(package, dest) as archive:
+        assert archive.extracted == []
+        assert 'assets/large.bin' in archive
+        assert archive.is_dir('assets') is True
+        assert archive.is_dir('package.json') is False
+        assert archive.read_bytes('assets/large.bin') == b'x' * 1024
+        assert archive.extracted == ['assets/large.bin']
+        with archive.open('package.json') as meta:
+            assert meta.read() == '{"name": "package"}'
+
+
+def test_directory_access(package: Path, tmp_path: Path) -> None:
+    dest = tmp_path / 'dest'
+    with LazyArchive(package, dest) as archive:
+        assert archive.path('extensions') == dest / 'extensions'
+        assert (dest / 'extensions' / 'one.py').exists() is True
+
+
+def test_missing_member(package: Path, tmp_path: Path) -> None:
+    with LazyArchive(package, tmp_path / 'dest') as archive:
+        with pytest.raises(FileNotFoundError, match='missing.py not found'):
+            archive.path('missing.py')
+        with pytest.raises(ValueError, match='only be opened for reading'):
+            archive.open('package.json', 'w')
+
+
+def test_tar_archive(tmp_path: Path) -> None:
+    meta = tmp_path / 'package.json'
+    meta.write_text('{}')
+    src = tmp_path / 'package.tar'
+    with tarfile.open(src, 'w') as archive:
+        archive.add(str(meta), 'package.json')
+    with LazyArchive(src, tmp_path / 'dest') as archive:
+        assert archive.names() == ['package.json']
+        assert archive.read_text('package.json') == '{}'
+
+
+def test_invalid_archive(tmp_path: Path) -> None:
+    src = tmp_path / 'invalid.zip'
+    src.write_text('invalid')
+    with pytest.raises(ValueError, match='invalid package archive'):
+        LazyArchive(src, tmp_path / 'dest')
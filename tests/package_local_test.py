@@ -10,8 +10,10 @@
     PackageHandler,
     TarPackageFormat,
     TgzPackageFormat,
-    ZipPackageFormat
+    ZipPackageFormat,
+    verify_installs
 )
+from dismantle.package._manifest import read_manifest
 
 
 def test_inherits() -> None:
@@ -63,6 +65,14 @@ def test_subclass_correct(datadir: LocalPath) -> None:
     assert isinstance(package, PackageHandler) is True
 
 
+def test_update_meta(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    package = LocalPackageHandler(name, datadir.join(name))
+    package.update_meta({'name': name, 'description': 'one'})
+    assert package.description == 'one'
+    assert package.name == name
+
+
 def test_install_no_destination(datadir: LocalPath) -> None:
     name = '@scope-one/package-one'
     src = datadir.join(name)
@@ -146,6 +156,19 @@ def test_verification_none(datadir: LocalPath) -> None:
     assert package.verify() is True
 
 
+def test_verification_installed(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    src = datadir.join(name)
+    dest = datadir.join('package-verified')
+    package = LocalPackageHandler(name, src)
+    package.install(dest)
+    assert 'package.json' in read_manifest(dest)['files']
+    assert verify_installs([dest])[str(dest)]['missing'] == []
+    assert package.verify() is True
+    os.unlink(dest.join('package.json'))
+    assert package.verify() is False
+
+
 def test_verification_value(datadir: LocalPath) -> None:
     name = '@scope-one/package-one'
     src = datadir.join(name)
@@ -0,0 +1,135 @@
+"""Test locking and staged installs of packages."""
+import os
+import threading
+
+import pytest
+from py._path.local import LocalPath
+from pytest_httpserver import HTTPServer
+
+from dismantle.package import FileLock, HttpPackageHandler, ZipPackageFormat
+from dismantle.package._locking import promote, staging
+
+
+def test_lock_excludes(tmpdir: LocalPath) -> None:
+    lock_file = tmpdir.join('package.lock')
+    with FileLock(lock_file) as lock:
+        assert lock.locked is True
+        with pytest.raises(TimeoutError):
+            FileLock(lock_file, timeout=0.1).acquire()
+    assert lock.locked is False
+    with FileLock(lock_file, timeout=0.1) as lock:
+        assert lock.locked is True
+
+
+def test_install_replaces_tree(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('package-staged')
+    dest.mkdir()
+    dest.join('stale.txt').write('stale')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    package = HttpPackageHandler(name, httpserver.url_for('/package.zip'))
+    assert package.install(dest) is True
+    assert os.path.exists(dest / 'package.json') is True
+    assert os.path.exists(dest / 'stale.txt') is False
+    assert sorted(os.listdir(datadir)) == ['package-staged', 'package.zip']
+
+
+def test_failed_install_keeps_tree(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('package-broken')
+    dest.mkdir()
+    dest.join('package.json').write('{}')
+    httpserver.expect_request('/broken.zip').respond_with_data(b'broken')
+    package = HttpPackageHandler(name, httpserver.url_for('/broken.zip'))
+    with pytest.raises(ValueError, match='invalid zip file'):
+        package.install(dest)
+    assert dest.join('package.json').read() == '{}'
+    assert sorted(os.listdir(datadir)) == ['package-broken', 'package.zip']
+
+
+def test_concurrent_install_fetches_once(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('package-concurrent')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_oneshot_request('/package.zip').respond_with_data(data)
+    src = httpserver.url_for('/package.zip')
+    packages = [
+        HttpPackageHandler(name, src, [ZipPackageFormat]) for _ in range(4)
+    ]
+    errors = []
+
+    def install(package: HttpPackageHandler) -> None:
+        package._meta['version'] = '0.0.1'
+        try:
+            package.install(dest)
+        except Exception as error:  # noqa: B902
+            errors.append(error)
+
+    threads = [threading.Thread(target=install, args=(p,)) for p in packages]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all(package.installed for package in packages)
+    assert sum(package._updated for package in packages) == 1
+    httpserver.check_assertions()
+
+
+def test_staging_mode(tmpdir: LocalPath) -> None:
+    target = tmpdir.join('package')
+    mask = os.umask(0o022)
+    try:
+        with staging(target) as stage:
+            assert stage.stat().st_mode & 0o777 == 0o755
+    finally:
+        os.umask(mask)
+    assert os.stat(target).st_mode & 0o777 == 0o755
+
+
+def test_promote_failure_restores_tree(tmpdir: LocalPath) -> None:
+    target = tmpdir.join('package')
+    target.mkdir()
+    target.join('package.json').write('{}')
+    with pytest.raises(FileNotFoundError):
+        promote(tmpdir.join('missing'), target)
+    assert target.join('package.json').read() == '{}'
+    assert sorted(os.listdir(tmpdir)) == ['package']
+
+
+def test_staging_promote_failure(
+    tmpdir: LocalPath,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    target = tmpdir.join('package')
+
+    def fail(stage, target) -> None:
+        raise OSError('promote failed')
+
+    monkeypatch.setattr('dismantle.package._locking.promote', fail)
+    with pytest.raises(OSError, match='promote failed'):
+        with staging(target) as stage:
+            assert stage.is_dir() is True
+    assert os.listdir(tmpdir) == []
+
+
+def test_staging_sweeps_stale(tmpdir: LocalPath) -> None:
+    target = tmpdir.join('package')
+    tmpdir.join('.package.1234.staging').ensure(dir=True)
+    tmpdir.join('.package.5678.retired').ensure('package.json')
+    tmpdir.join('.other.1234.staging').ensure(dir=True)
+    with staging(target) as stage:
+        stage.joinpath('package.json').write_text('{}')
+    assert sorted(os.listdir(tmpdir)) == ['.other.1234.staging', 'package']
@@ -0,0 +1,131 @@
+"""Test installing packages using a lockfile."""
+import json
+
+import pytest
+from py._path.local import LocalPath
+from pytest_httpserver import HTTPServer
+
+from dismantle.package import HttpPackageHandler, LocalPackageHandler, Lockfile
+
+
+def test_frozen_missing(datadir: LocalPath) -> None:
+    with pytest.raises(FileNotFoundError, match='lockfile not found'):
+        Lockfile(datadir.join('dismantle.lock'), frozen=True)
+
+
+def test_unsupported_version(datadir: LocalPath) -> None:
+    lock_src = datadir.join('dismantle.lock')
+    lock_src.write(json.dumps({'version': 0, 'packages': {}}))
+    with pytest.raises(ValueError, match='unsupported lockfile version'):
+        Lockfile(lock_src)
+
+
+def test_record_and_save(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('installed')
+    lockfile = Lockfile(datadir.join('dismantle.lock'))
+    package = LocalPackageHandler(name, datadir.join(name))
+    assert lockfile.install(package, dest) is True
+    lockfile.save()
+    with open(datadir.join('dismantle.lock')) as lock_file:
+        data = json.load(lock_file)
+    entry = data['packages'][name]
+    assert entry['version'] == '0.0.1'
+    assert entry['path'] == str(dest)
+    assert entry['digest'] is None
+    assert lockfile.matches(name) is True
+    assert lockfile.packages() == data['packages']
+
+
+def test_record_not_installed(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    lockfile = Lockfile(datadir.join('dismantle.lock'))
+    package = LocalPackageHandler(name, datadir.join(name))
+    with pytest.raises(ValueError, match='only installed packages'):
+        lockfile.record(package)
+
+
+def test_install_requires_path(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    lockfile = Lockfile(datadir.join('dismantle.lock'))
+    package = LocalPackageHandler(name, datadir.join(name))
+    with pytest.raises(ValueError, match='no install path provided'):
+        lockfile.install(package)
+
+
+def test_frozen_adopts(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('installed')
+    lockfile = Lockfile(datadir.join('dismantle.lock'))
+    lockfile.install(LocalPackageHandler(name, datadir.join(name)), dest)
+    lockfile.save()
+    frozen = Lockfile(datadir.join('dismantle.lock'), frozen=True)
+    package = LocalPackageHandler(name, datadir.join(name))
+    assert frozen.install(package) is True
+    assert package.installed is True
+    assert package.path == str(dest)
+    assert package.version == '0.0.1'
+
+
+def test_frozen_mismatch(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('installed')
+    lockfile = Lockfile(datadir.join('dismantle.lock'))
+    lockfile.install(LocalPackageHandler(name, datadir.join(name)), dest)
+    lockfile.save()
+    dest.join('package.json').write(json.dumps({
+        'name': name,
+        'version': '0.2.0'
+    }))
+    frozen = Lockfile(datadir.join('dismantle.lock'), frozen=True)
+    package = LocalPackageHandler(name, datadir.join(name))
+    with pytest.raises(ValueError, match='does not match the lockfile'):
+        frozen.install(package)
+    assert package.installed is False
+
+
+def test_frozen_makes_no_requests(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('installed')
+    src = httpserver.url_for('/package.zip')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_oneshot_request('/package.zip').respond_with_data(data)
+    lockfile = Lockfile(datadir.join('dismantle.lock'))
+    lockfile.install(HttpPackageHandler(name, src), dest)
+    lockfile.save()
+    assert lockfile[name]['digest'].startswith('sha256:')
+    assert lockfile[name]['src'] == src
+    requests_made = len(httpserver.log)
+    frozen = Lockfile(datadir.join('dismantle.lock'), frozen=True)
+    package = HttpPackageHandler(name, src)
+    assert frozen.install(package) is True
+    assert package.version == '0.0.1'
+    assert len(httpserver.log) == requests_made
+
+
+def test_record_discards_stale_digest(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    lock_src = datadir.join('dismantle.lock')
+    lock_src.write(json.dumps({
+        'version': 1,
+        'packages': {name: {'name': name, 'digest': 'sha256:stale'}}
+    }))
+    lockfile = Lockfile(lock_src)
+    package = LocalPackageHandler(name, datadir.join(name))
+    package.install(datadir.join('installed'))
+    assert lockfile.record(package)['digest'] is None
+
+
+def test_adopt(datadir: LocalPath) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('installed')
+    LocalPackageHandler(name, datadir.join(name)).install(dest)
+    package = LocalPackageHandler(name, datadir.join(name))
+    assert package.adopt(dest) is True
+    assert package.installed is True
+    assert package.path == str(dest)
+    assert package.version == '0.0.1'
@@ -0,0 +1,125 @@
+"""Test recording and verifying the files of installed trees."""
+import hashlib
+import os
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from dismantle.package import verify_install, verify_installs
+from dismantle.package._manifest import (
+    MANIFEST_NAME,
+    read_manifest,
+    record_files,
+    write_manifest
+)
+
+FILES = {
+    'package.json': '{}',
+    'extensions/one.py': 'one = 1\n',
+    'extensions/__pycache__/one.pyc': b'',
+}
+
+
+@pytest.fixture()
+def tree(build: Callable[..., Path]) -> Callable[..., Path]:
+    def factory(name: str = '.') -> Path:
+        path = build(FILES, name)
+        record_files(path)
+        return path
+    return factory
+
+
+def test_record_files(tmp_path: Path, tree: Callable[..., Path]) -> None:
+    tree()
+    files = read_manifest(tmp_path)['files']
+    assert sorted(files) == ['extensions/one.py', 'package.json']
+    assert files['package.json']['size'] == 2
+    assert len(files['package.json']['sha256']) == 64
+    assert MANIFEST_NAME not in files
+
+
+def test_record_files_keeps_members(tmp_path: Path) -> None:
+    (tmp_path / 'package.json').write_text('{}')
+    record_files(tmp_path)
+    manifest = read_manifest(tmp_path)
+    manifest['members'] = {'package.json': [2, 0]}
+    write_manifest(tmp_path, manifest)
+    record_files(tmp_path)
+    assert read_manifest(tmp_path)['members'] == {'package.json': [2, 0]}
+
+
+def test_verify_intact(tmp_path: Path, tree: Callable[..., Path]) -> None:
+    tree()
+    assert verify_install(tmp_path) == {'missing': [], 'modified': []}
+
+
+def test_verify_missing(tmp_path: Path, tree: Callable[..., Path]) -> None:
+    tree()
+    (tmp_path / 'extensions' / 'one.py').unlink()
+    report = verify_install(tmp_path)
+    assert report['missing'] == ['extensions/one.py']
+
+
+def test_verify_modified_size(
+    tmp_path: Path,
+    tree: Callable[..., Path]
+) -> None:
+    tree()
+    (tmp_path / 'package.json').write_text('{"name": "changed"}')
+    assert verify_install(tmp_path)['modified'] == ['package.json']
+
+
+def test_verify_modified_content(
+    tmp_path: Path,
+    tree: Callable[..., Path]
+) -> None:
+    tree()
+    path = tmp_path / 'extensions' / 'one.py'
+    path.write_text('one = 2\n')
+    os.utime(path, ns=(0, 0))
+    assert verify_install(tmp_path)['modified'] == ['extensions/one.py']
+
+
+def test_verify_touched(tmp_path: Path, tree: Callable[..., Path]) -> None:
+    tree()
+    os.utime(tmp_path / 'package.json', ns=(0, 0))
+    assert verify_install(tmp_path) == {'missing': [], 'modified': []}
+
+
+def test_verify_deep(tmp_path: Path, tree: Callable[..., Path]) -> None:
+    tree()
+    path = tmp_path / 'package.json'
+    stat = path.stat()
+    path.write_text('[]')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert verify_install(tmp_path)['modified'] == []
+    assert verify_install(tmp_path, deep=True)['modified'] == ['package.json']
+
+
+def test_verify_without_manifest(tmp_path: Path) -> None:
+    report = verify_install(tmp_path)
+    assert report['missing'] == [MANIFEST_NAME]
+
+
+def test_verify_installs(tmp_path: Path, tree: Callable[..., Path]) -> None:
+    one = tree('one')
+    two = tree('two')
+    (two / 'package.json').unlink()
+    reports = verify_installs([one, two], workers=2)
+    assert reports[str(one)] == {'missing': [], 'modified': []}
+    assert reports[str(two)]['missing'] == ['package.json']
+
+
+def test_record_files_check(tmp_path: Path) -> None:
+    (tmp_path / 'package.json').write_text('{}')
+    digest = hashlib.sha256(b'{}').hexdigest()
+    shipped = {'size': 2, 'sha256': digest}
+    write_manifest(tmp_path, {'files': {
+        'package.json': shipped,
+        'extensions/__pycache__/one.pyc': shipped
+    }})
+    record_files(tmp_path, check=True)
+    write_manifest(tmp_path, {'files': {'missing.txt': shipped}})
+    with pytest.raises(ValueError, match='missing.txt'):
+        record_files(tmp_path, check=True)
@@ -0,0 +1,118 @@
+"""Test mirror selection and failover for remote packages."""
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from py._path.local import LocalPath
+from pytest_httpserver import HTTPServer
+
+from dismantle.package import HttpPackageHandler, MirrorStats, TgzPackageFormat
+from dismantle.package._mirrors import stats
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    stats.reset()
+    yield
+    stats.reset()
+
+
+def test_rank_prefers_fastest() -> None:
+    mirrors = MirrorStats()
+    urls = ['http://slow/a.zip', 'http://fast/a.zip', 'http://new/a.zip']
+    mirrors.record(urls[0], 2.0, True)
+    mirrors.record(urls[1], 0.1, True)
+    assert mirrors.rank(urls) == [urls[2], urls[1], urls[0]]
+
+
+def test_rank_demotes_failing() -> None:
+    mirrors = MirrorStats()
+    urls = ['http://broken/a.zip', 'http://slow/a.zip']
+    mirrors.record(urls[0], 0.1, False)
+    mirrors.record(urls[0], 0.1, False)
+    mirrors.record(urls[1], 5.0, True)
+    assert mirrors.get(urls[0]).healthy is False
+    assert mirrors.rank(urls) == [urls[1], urls[0]]
+
+
+def test_invalid_mirror() -> None:
+    name = '@scope-one/package-one'
+    mirrors = ['http://localhost/package.zip', 'ftp://localhost/package.zip']
+    with pytest.raises(ValueError, match='invalid handler format'):
+        HttpPackageHandler(name, mirrors)
+
+
+def test_install_fails_over(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('package-mirror')
+    with open(datadir.join('package.zip'), 'rb') as pkg_file:
+        data = pkg_file.read()
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    broken = 'http://127.0.0.1:1/package.zip'
+    working = httpserver.url_for('/package.zip')
+    package = HttpPackageHandler(name, [broken, working])
+    assert package.install(dest) is True
+    assert os.path.exists(dest / 'package.json') is True
+    assert package.mirrors == [working, broken]
+
+
+def _tgz(datadir: LocalPath) -> bytes:
+    body = io.BytesIO()
+    with zipfile.ZipFile(datadir.join('package.zip')) as source:
+        with tarfile.open(fileobj=body, mode='w:gz') as archive:
+            for name in source.namelist():
+                data = source.read(name)
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    return body.getvalue()
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_install_corrupt_mirror_fails_over(
+    httpserver: HTTPServer,
+    datadir: LocalPath,
+    streaming: bool
+) -> None:
+    name = '@scope-one/package-one'
+    dest = datadir.join('package-mirror')
+    data = _tgz(datadir)
+    httpserver.expect_request('/corrupt.tgz').respond_with_data(data[:-64])
+    httpserver.expect_request('/package.tgz').respond_with_data(data)
+    corrupt = httpserver.url_for('/corrupt.tgz')
+    working = httpserver.url_for('/package.tgz').replace(
+        '127.0.0.1',
+        'localhost'
+    )
+    package = HttpPackageHandler(
+        name,
+        [corrupt, working],
+        [TgzPackageFormat],
+        streaming=streaming
+    )
+    assert package.install(dest) is True
+    assert sorted(os.listdir(dest)) == sorted(
+        ['.dismantle-manifest.json'] + zipfile.ZipFile(
+            datadir.join('package.zip')
+        ).namelist()
+    )
+    assert package.mirrors == [working, corrupt]
+
+
+def test_outdated_fails_over(httpserver: HTTPServer) -> None:
+    name = '@scope-one/package-one'
+    httpserver.expect_request('/missing.zip').respond_with_data('', 404)
+    httpserver.expect_request('/package.zip').respond_with_data('', 304)
+    missing = httpserver.url_for('/missing.zip')
+    working = httpserver.url_for('/package.zip').replace(
+        '127.0.0.1',
+        'localhost'
+    )
+    package = HttpPackageHandler(name, [missing, working], hedge=0.5)
+    assert package.outdated is False
+    assert package.mirrors == [working, missing]
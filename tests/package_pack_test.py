@@ -0,0 +1,215 @@
+"""Test building package archives from a package directory."""
+import hashlib
+import importlib.util
+import json
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from pytest_httpserver import HTTPServer
+
+from dismantle.cli import main
+from dismantle.package import (
+    BgzfPackageFormat,
+    HttpPackageHandler,
+    TarPackageFormat,
+    ZipPackageFormat,
+    pack
+)
+from dismantle.package._manifest import MANIFEST_NAME, read_manifest
+
+FILES = {
+    'package.json': json.dumps({
+        'name': '@scope-one/package-one',
+        'version': '0.0.1'
+    }),
+    'extensions/one.py': 'one = 1\n',
+    'extensions/__pycache__/one.pyc': b'',
+    'assets/image.bin': b'\x00' * 64,
+    'README.md': 'readme',
+    '.git/HEAD': 'ref',
+}
+
+
+@pytest.fixture()
+def src(build: Callable[..., Path]) -> Path:
+    return build(FILES, 'src')
+
+
+def test_pack_zip_order(tmp_path: Path, src: Path) -> None:
+    dest = pack(src, tmp_path / 'package.zip')
+    with zipfile.ZipFile(dest) as archive:
+        names = archive.namelist()
+    assert names == [
+        'package.json',
+        'extensions/one.py',
+        'README.md',
+        'assets/image.bin',
+        MANIFEST_NAME
+    ]
+
+
+def test_pack_manifest(tmp_path: Path, src: Path) -> None:
+    dest = pack(src, tmp_path / 'package.tar')
+    with tarfile.open(dest) as archive:
+        manifest = json.load(archive.extractfile(MANIFEST_NAME))
+    entry = manifest['files']['assets/image.bin']
+    assert entry['size'] == 64
+    assert entry['sha256'] == hashlib.sha256(b'\x00' * 64).hexdigest()
+    assert MANIFEST_NAME not in manifest['files']
+    assert 'package.json' in manifest['files']
+
+
+def test_pack_keeps_package_manifest(tmp_path: Path, src: Path) -> None:
+    (src / 'manifest.json').write_text('{"user": true}')
+    dest = pack(src, tmp_path / 'package.zip')
+    with zipfile.ZipFile(dest) as archive:
+        assert archive.read('manifest.json') == b'{"user": true}'
+
+
+def test_pack_manifest_clash(tmp_path: Path, src: Path) -> None:
+    (src / MANIFEST_NAME).write_text('{}')
+    with pytest.raises(ValueError, match='reserved for the manifest'):
+        pack(src, tmp_path / 'package.zip')
+    assert (tmp_path / 'package.zip').exists() is False
+
+
+def test_pack_level(tmp_path: Path, src: Path) -> None:
+    stored = pack(src, tmp_path / 'stored.zip', level=0)
+    compressed = pack(src, tmp_path / 'compressed.zip', level=9)
+    with zipfile.ZipFile(stored) as archive:
+        size = archive.getinfo('assets/image.bin').compress_size
+    with zipfile.ZipFile(compressed) as archive:
+        assert archive.getinfo('assets/image.bin').compress_size < size
+
+
+def _serve(httpserver: HTTPServer, path: Path) -> str:
+    httpserver.expect_request('/package.zip').respond_with_data(
+        path.read_bytes()
+    )
+    return httpserver.url_for('/package.zip')
+
+
+def test_install_checks_manifest(
+    httpserver: HTTPServer,
+    tmp_path: Path,
+    src: Path
+) -> None:
+    url = _serve(httpserver, pack(src, tmp_path / 'package.zip'))
+    dest = tmp_path / 'installed'
+    package = HttpPackageHandler('@scope-one/package-one', url)
+    assert package.install(str(dest)) is True
+    assert 'README.md' in read_manifest(dest)['files']
+    assert package.verify() is True
+
+
+def test_install_rejects_tampered(
+    httpserver: HTTPServer,
+    tmp_path: Path,
+    src: Path
+) -> None:
+    packed = pack(src, tmp_path / 'package.zip')
+    tampered = tmp_path / 'tampered.zip'
+    with zipfile.ZipFile(packed) as source:
+        with zipfile.ZipFile(tampered, 'w') as target:
+            for info in source.infolist():
+                data = source.read(info)
+                if info.filename == 'README.md':
+                    data = b'README'
+                target.writestr(info, data)
+    url = _serve(httpserver, tampered)
+    dest = tmp_path / 'installed'
+    package = HttpPackageHandler('@scope-one/package-one', url)
+    with pytest.raises(ValueError, match='README.md'):
+        package.install(str(dest))
+    assert dest.exists() is False
+
+
+@pytest.mark.parametrize('name', [
+    'package.zip',
+    'package.tar',
+    'package.tgz',
+    'package.tar.gz',
+    'package.tar.bgz'
+])
+def test_pack_formats(tmp_path: Path, src: Path, name: str) -> None:
+    dest = pack(src, tmp_path / name)
+    assert dest.is_file() is True
+    assert not list(tmp_path.glob(f'.{name}.*'))
+
+
+def test_pack_extract(tmp_path: Path, src: Path) -> None:
+    ZipPackageFormat.extract(pack(src, tmp_path / 'a.zip'), tmp_path / 'a')
+    TarPackageFormat.extract(pack(src, tmp_path / 'b.tar'), tmp_path / 'b')
+    BgzfPackageFormat.extract(
+        pack(src, tmp_path / 'c.tar.bgz'),
+        tmp_path / 'c'
+    )
+    for folder in ['a', 'b', 'c']:
+        path = tmp_path / folder / 'extensions' / 'one.py'
+        assert path.read_text() == 'one = 1\n'
+        assert (tmp_path / folder / '.git').exists() is False
+
+
+def test_pack_bytecode(tmp_path: Path, src: Path) -> None:
+    dest = pack(src, tmp_path / 'package.zip', bytecode=True)
+    cached = importlib.util.cache_from_source('extensions/one.py')
+    with zipfile.ZipFile(dest) as archive:
+        names = archive.namelist()
+        data = archive.read(cached)
+    assert names.index(cached) < names.index('README.md')
+    # flags of 0b11 mark a hash based pyc checked against the source
+    assert int.from_bytes(data[4:8], 'little') == 0b11
+
+
+def test_pack_sourceless(tmp_path: Path, src: Path) -> None:
+    (src / 'extensions' / 'one.pyc').write_bytes(b'stale')
+    (src / 'extensions' / 'two.cpython-311.pyc').write_bytes(b'code')
+    dest = pack(src, tmp_path / 'package.zip')
+    with zipfile.ZipFile(dest) as archive:
+        names = archive.namelist()
+    assert 'extensions/two.cpython-311.pyc' in names
+    assert names.index('extensions/two.cpython-311.pyc') < names.index(
+        'README.md'
+    )
+    assert 'extensions/one.pyc' not in names
+
+
+def test_pack_bytecode_invalid(tmp_path: Path, src: Path) -> None:
+    (src / 'extensions' / 'broken.py').write_text('def broken(:\n')
+    with pytest.raises(ValueError, match='unable to compile'):
+        pack(src, tmp_path / 'package.zip', bytecode=True)
+
+
+def test_pack_missing_package(tmp_path: Path, src: Path) -> None:
+    (src / 'package.json').unlink()
+    message = 'package.json not found in package directory'
+    with pytest.raises(FileNotFoundError, match=message):
+        pack(src, tmp_path / 'package.zip')
+
+
+def test_pack_invalid_package(tmp_path: Path, src: Path) -> None:
+    (src / 'package.json').write_text(json.dumps({'name': 'one'}))
+    with pytest.raises(ValueError, match='meta file missing version'):
+        pack(src, tmp_path / 'package.zip')
+
+
+def test_pack_unsupported_format(tmp_path: Path, src: Path) -> None:
+    with pytest.raises(ValueError, match='packages can only be packed'):
+        pack(src, tmp_path / 'package.rar')
+
+
+def test_pack_into_source(src: Path) -> None:
+    pack(src, src / 'package.zip')
+    dest = pack(src, src / 'package.zip')
+    with zipfile.ZipFile(dest) as archive:
+        assert 'package.zip' not in archive.namelist()
+
+
+def test_cli_pack(tmp_path: Path, src: Path) -> None:
+    dest = tmp_path / 'package.tgz'
+    assert main(['pack', str(src), str(dest), '--bytecode']) == 0
+    with tarfile.open(dest) as archive:
+        assert archive.getnames()[0] == 'package.json'
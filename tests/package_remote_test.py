@@ -0,0 +1,105 @@
+"""Test inspecting remote zip packages using range requests."""
+import json
+import os
+import zipfile
+
+import pytest
+from py._path.local import LocalPath
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from dismantle.package import HttpPackageHandler, TgzPackageFormat
+
+META = {'name': '@scope-one/package-one', 'version': '0.0.2'}
+
+
+def build_package(path: LocalPath) -> bytes:
+    with zipfile.ZipFile(path, 'w') as package:
+        package.writestr('package.json', json.dumps(META))
+        package.writestr('extensions/green.py', 'GREEN = True\n')
+        package.writestr('assets/large.bin', os.urandom(1024 * 1024))
+    with open(path, 'rb') as pkg_file:
+        return pkg_file.read()
+
+
+def serve_ranges(httpserver: HTTPServer, uri: str, data: bytes) -> None:
+    def handler(request: Request) -> Response:
+        response = Response(data, mimetype='application/zip')
+        return response.make_conditional(
+            request,
+            accept_ranges=True,
+            complete_length=len(data)
+        )
+    httpserver.expect_request(uri).respond_with_handler(handler)
+
+
+def test_inspect_files(httpserver: HTTPServer, datadir: LocalPath) -> None:
+    data = build_package(datadir.join('package.zip'))
+    serve_ranges(httpserver, '/package.zip', data)
+    src = httpserver.url_for('/package.zip')
+    package = HttpPackageHandler(META['name'], src)
+    with package.inspect() as archive:
+        assert archive.files == {
+            'package.json': len(json.dumps(META)),
+            'extensions/green.py': 13,
+            'assets/large.bin': 1024 * 1024
+        }
+        assert archive.read('extensions/green.py') == b'GREEN = True\n'
+        assert archive.received < 64 * 1024
+
+
+def test_fetch_metadata(httpserver: HTTPServer, datadir: LocalPath) -> None:
+    data = build_package(datadir.join('package.zip'))
+    serve_ranges(httpserver, '/package.zip', data)
+    src = httpserver.url_for('/package.zip')
+    package = HttpPackageHandler(META['name'], src)
+    assert package.fetch_metadata() == META
+    assert package.installed is False
+
+
+def test_fetch_metadata_name_mismatch(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    data = build_package(datadir.join('package.zip'))
+    serve_ranges(httpserver, '/package.zip', data)
+    src = httpserver.url_for('/package.zip')
+    package = HttpPackageHandler('@scope-one/package-two', src)
+    message = 'meta name does not match provided package name'
+    with pytest.raises(ValueError, match=message):
+        package.fetch_metadata()
+
+
+def test_ranges_unsupported(
+    httpserver: HTTPServer,
+    datadir: LocalPath
+) -> None:
+    data = build_package(datadir.join('package.zip'))
+    httpserver.expect_request('/package.zip').respond_with_data(data)
+    src = httpserver.url_for('/package.zip')
+    package = HttpPackageHandler(META['name'], src)
+    assert package.fetch_metadata() == META
+
+
+def test_invalid_zip(httpserver: HTTPServer) -> None:
+    serve_ranges(httpserver, '/package.zip', b'not a zip file')
+    src = httpserver.url_for('/package.zip')
+    package = HttpPackageHandler(META['name'], src)
+    with pytest.raises(ValueError, match='invalid zip file'):
+        package.inspect()
+
+
+def test_notfound(httpserver: HTTPServer) -> None:
+    httpserver.no_handler_status_code = 404
+    src = httpserver.url_for('/notfound.zip')
+    package = HttpPackageHandler(META['name'], src)
+    with pytest.raises(FileNotFoundError):
+        package.inspect()
+
+
+def test_unsupported_format(httpserver: HTTPServer) -> None:
+    src = httpserver.url_for('/package.tgz')
+    package = HttpPackageHandler(META['name'], src, [TgzPackageFormat])
+    message = 'remote inspection only supports zip packages'
+    with pytest.raises(ValueError, match=message):
+        package.inspect()
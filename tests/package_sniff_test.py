@@ -0,0 +1,45 @@
+"""Test detecting package formats from their contents."""
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+from dismantle.package import (
+    TarPackageFormat,
+    Tbz2PackageFormat,
+    TgzPackageFormat,
+    TxzPackageFormat,
+    TzstPackageFormat,
+    ZipPackageFormat
+)
+from dismantle.package._sniff import detect_format, sniff
+
+
+def test_sniff_compressed() -> None:
+    assert sniff(b'\x1f\x8b\x08\x00') is TgzPackageFormat
+    assert sniff(b'\xfd7zXZ\x00\x00') is TxzPackageFormat
+    assert sniff(b'BZh91AY') is Tbz2PackageFormat
+    assert sniff(b'\x28\xb5\x2f\xfd\x00') is TzstPackageFormat
+    assert sniff(b'') is None
+    assert sniff(b'{"name": "package"}') is None
+
+
+def test_sniff_archives() -> None:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w') as archive:
+        archive.writestr('package.json', '{}')
+    assert sniff(data.getvalue()) is ZipPackageFormat
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w') as archive:
+        info = tarfile.TarInfo('package.json')
+        archive.addfile(info, io.BytesIO())
+    assert sniff(data.getvalue()) is TarPackageFormat
+
+
+def test_detect_format_cached(tmp_path: Path) -> None:
+    src = tmp_path / 'download'
+    src.write_bytes(b'\x1f\x8b\x08\x00')
+    assert detect_format(src, 'digest-one') is TgzPackageFormat
+    src.write_bytes(b'BZh91AY')
+    assert detect_format(src, 'digest-one') is TgzPackageFormat
+    assert detect_format(src) is Tbz2PackageFormat
@@ -0,0 +1,52 @@
+"""Test reading downloads while hashing and caching them."""
+import io
+import tarfile
+from hashlib import md5
+from pathlib import Path
+
+import pytest
+
+from dismantle.package import TarPackageFormat
+from dismantle.package._stream import HashingReader
+
+
+def test_reader_hashes_and_tees() -> None:
+    sink = io.BytesIO()
+    reader = HashingReader([b'abc', b'', b'defg'], sink)
+    assert reader.read(2) == b'ab'
+    assert reader.read() == b'cdefg'
+    assert reader.read() == b''
+    assert sink.getvalue() == b'abcdefg'
+    assert reader.received == 7
+    assert reader.hexdigest() == md5(b'abcdefg').hexdigest()
+
+
+def test_reader_drain() -> None:
+    sink = io.BytesIO()
+    reader = HashingReader([b'abc', b'def'], sink)
+    assert reader.read(1) == b'a'
+    reader.drain()
+    assert sink.getvalue() == b'abcdef'
+    assert reader.hexdigest() == md5(b'abcdef').hexdigest()
+
+
+def test_extract_stream(tmp_path: Path) -> None:
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w') as archive:
+        info = tarfile.TarInfo('package.json')
+        info.size = 2
+        archive.addfile(info, io.BytesIO(b'{}'))
+    body = data.getvalue()
+    chunks = [body[i:i + 100] for i in range(0, len(body), 100)]
+    sink = io.BytesIO()
+    reader = HashingReader(chunks, sink)
+    TarPackageFormat.extract_stream(reader, tmp_path)
+    reader.drain()
+    assert (tmp_path / 'package.json').read_text() == '{}'
+    assert sink.getvalue() == body
+
+
+def test_extract_stream_invalid(tmp_path: Path) -> None:
+    reader = HashingReader([b'invalid' * 100])
+    with pytest.raises(ValueError, match='invalid tar stream'):
+        TarPackageFormat.extract_stream(reader, tmp_path)
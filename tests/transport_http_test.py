@@ -0,0 +1,114 @@
+"""Test timeouts, retries, and hedging of http requests."""
+import time
+
+import pytest
+import requests
+from pytest_httpserver import HTTPServer
+from werkzeug import Request, Response
+
+from dismantle.transport import HttpPolicy, RetryBudget, hedge, request
+
+
+def test_retry_budget() -> None:
+    budget = RetryBudget(ratio=0.5, reserve=1)
+    assert budget.withdraw() is True
+    assert budget.withdraw() is False
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw() is True
+
+
+def test_delay_is_bounded() -> None:
+    policy = HttpPolicy(backoff=1, backoff_max=2)
+    for attempt in range(5):
+        assert 0 <= policy.delay(attempt) <= 2
+    assert policy.delay(0, 1.5) == 1.5
+    assert policy.delay(0, 10) == 2
+
+
+def test_request_retries_status(httpserver: HTTPServer) -> None:
+    httpserver.expect_ordered_request('/index.json').respond_with_data(
+        '',
+        503
+    )
+    httpserver.expect_ordered_request('/index.json').respond_with_data(
+        '{}',
+        200
+    )
+    policy = HttpPolicy(backoff=0)
+    req = request('GET', httpserver.url_for('/index.json'), policy=policy)
+    assert req.status_code == 200
+    httpserver.check_assertions()
+
+
+def test_request_closes_retried(httpserver: HTTPServer) -> None:
+    httpserver.expect_ordered_request('/index.json').respond_with_data(
+        'busy',
+        503
+    )
+    httpserver.expect_ordered_request('/index.json').respond_with_data(
+        '{}',
+        200
+    )
+    responses = []
+    with requests.Session() as session:
+        send = session.request
+
+        def record(*args, **kwargs) -> requests.Response:
+            responses.append(send(*args, **kwargs))
+            return responses[-1]
+
+        session.request = record
+        policy = HttpPolicy(backoff=0)
+        url = httpserver.url_for('/index.json')
+        request('GET', url, session, policy, stream=True)
+    assert [req.status_code for req in responses] == [503, 200]
+    assert responses[0].raw.closed is True
+    assert responses[1].raw.closed is False
+
+
+def test_request_returns_final_status(httpserver: HTTPServer) -> None:
+    httpserver.expect_request('/index.json').respond_with_data('', 503)
+    policy = HttpPolicy(retries=1, backoff=0)
+    req = request('GET', httpserver.url_for('/index.json'), policy=policy)
+    assert req.status_code == 503
+    assert len(httpserver.log) == 2
+
+
+def test_request_respects_budget(httpserver: HTTPServer) -> None:
+    httpserver.expect_request('/index.json').respond_with_data('', 503)
+    budget = RetryBudget(ratio=0, reserve=0)
+    policy = HttpPolicy(backoff=0, budget=budget)
+    req = request('GET', httpserver.url_for('/index.json'), policy=policy)
+    assert req.status_code == 503
+    assert len(httpserver.log) == 1
+
+
+def test_request_timeout(httpserver: HTTPServer) -> None:
+    def slow(request: Request) -> Response:
+        time.sleep(0.5)
+        return Response('{}', 200)
+
+    httpserver.expect_request('/index.json').respond_with_handler(slow)
+    policy = HttpPolicy(read_timeout=0.1, retries=0)
+    with pytest.raises(requests.Timeout):
+        request('GET', httpserver.url_for('/index.json'), policy=policy)
+
+
+def test_hedge_uses_fastest_response() -> None:
+    def call(url: str) -> str:
+        if url == 'slow':
+            time.sleep(1)
+        return url
+
+    start = time.monotonic()
+    assert hedge(call, ['slow', 'fast'], 0.05) == 'fast'
+    assert time.monotonic() - start < 1
+
+
+def test_hedge_raises_last_error() -> None:
+    def call(url: str) -> str:
+        raise FileNotFoundError(url)
+
+    with pytest.raises(FileNotFoundError, match='second'):
+        hedge(call, ['first', 'second'], 0.05)
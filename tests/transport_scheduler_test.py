@@ -0,0 +1,83 @@
+"""Test the download scheduler."""
+import threading
+import time
+
+import pytest
+import requests
+from pytest_httpserver import HTTPServer
+
+from dismantle.transport import DownloadScheduler, Priority, TokenBucket
+
+
+def test_priority_order() -> None:
+    scheduler = DownloadScheduler(workers=1)
+    gate = threading.Event()
+    order = []
+    scheduler.submit('http://one', gate.wait)
+    futures = [
+        scheduler.submit('http://one', lambda p=p: order.append(p), p)
+        for p in (Priority.BACKGROUND, Priority.NORMAL, Priority.INDEX)
+    ]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert order == [Priority.INDEX, Priority.NORMAL, Priority.BACKGROUND]
+    scheduler.shutdown()
+
+
+def test_per_host_limit() -> None:
+    scheduler = DownloadScheduler(workers=4, per_host=1)
+    lock = threading.Lock()
+    running = {'now': 0, 'peak': 0}
+
+    def call() -> None:
+        with lock:
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+        time.sleep(0.02)
+        with lock:
+            running['now'] -= 1
+
+    futures = [scheduler.submit('http://one/a', call) for _ in range(4)]
+    other = scheduler.submit('http://two/a', lambda: 'done')
+    assert other.result(timeout=5) == 'done'
+    for future in futures:
+        future.result(timeout=5)
+    assert running['peak'] == 1
+    scheduler.shutdown()
+
+
+def test_errors_are_returned() -> None:
+    scheduler = DownloadScheduler()
+
+    def call() -> None:
+        raise FileNotFoundError('missing')
+
+    with pytest.raises(FileNotFoundError, match='missing'):
+        scheduler.submit('http://one', call).result(timeout=5)
+    scheduler.shutdown()
+    with pytest.raises(ValueError, match='has been shut down'):
+        scheduler.submit('http://one', call)
+
+
+def test_token_bucket_throttles() -> None:
+    bucket = TokenBucket(1000, 100)
+    start = time.monotonic()
+    bucket.consume(100)
+    bucket.consume(100)
+    assert time.monotonic() - start >= 0.09
+
+
+def test_stream_stats(httpserver: HTTPServer) -> None:
+    httpserver.expect_request('/package.zip').respond_with_data(b'x' * 4096)
+    scheduler = DownloadScheduler(bandwidth=1024 * 1024)
+    url = httpserver.url_for('/package.zip')
+    req = requests.get(url, stream=True, timeout=5)
+    body = b''.join(scheduler.stream(req, 1024))
+    assert body == b'x' * 4096
+    stats = scheduler.stats()
+    assert stats['bytes'] == 4096
+    assert stats['throughput'] > 0
+    assert stats['queued'] == 0
+    assert stats['in_flight'] == 0
+    scheduler.shutdown()